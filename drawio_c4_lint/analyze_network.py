@@ -1,41 +1,101 @@
 import os
-import networkx as nx
-from drawio_c4_lint.c4_lint import C4Lint
+from functools import partial
+from drawio_c4_lint.c4_lint import configure_logging
+from drawio_c4_lint.c4_model import C4Model
+from drawio_c4_lint.c4_lint_on_directory import find_drawio_files, map_in_pool
+from drawio_c4_lint.diagram_model import distinct_system_names, may_contain_c4, read_pages
 
-def extract_systems_and_connections(xml_file):
-    lint = C4Lint(xml_file)
-    systems = {elem.get('id'): elem.get('c4Name') for elem in lint.root.findall(".//object[@c4Type='Software System']")}
-    connections = [(systems[elem.get('source')], systems[elem.get('target')]) for elem in lint.root.findall(".//mxCell[@source][@target]") if elem.get('source') in systems and elem.get('target') in systems]
-    return systems.values(), connections
+def extract_pages(xml_file):
+    """(is_c4, Software System names, connections) over every page, like LintResult.system_names().
 
-def analyze_network(directory):
-    system_names = set()
+    A page that cannot be parsed is left out; raises only when no page can be.
+    """
+    pages = read_pages(xml_file)
+    is_c4 = False
+    page_systems = []
     connections = []
+    failures = []
+    for page in pages:
+        try:
+            model = C4Model.from_diagram_model(page.model(), xml_file)
+        except Exception as e:
+            failures.append(e)
+            continue
+        systems, page_connections = model.systems_and_connections()
+        is_c4 = is_c4 or model.is_c4
+        page_systems.append(systems)
+        connections.extend(page_connections)
+    if len(failures) == len(pages):
+        raise failures[0]
+    return is_c4, distinct_system_names(page_systems), connections
+
+def extract_systems_and_connections(xml_file):
+    # parse only, network analysis does not need the lint rules
+    _, systems, connections = extract_pages(xml_file)
+    return systems, connections
+
+def extract_file(file_path, prescreen=True):
+    """Picklable (file_path, is_c4, system names, connections, failure) for one diagram.
+
+    Files that may_contain_c4 rules out are not parsed unless prescreen is False.
+    """
+    if prescreen and not may_contain_c4(file_path):
+        return file_path, False, [], [], None
+    try:
+        is_c4, systems, connections = extract_pages(file_path)
+    except Exception as e:
+        return file_path, False, [], [], str(e)
+    return file_path, is_c4, systems, connections, None
 
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.drawio'):
-                file_path = os.path.join(root, file)
-                try:
-                    lint = C4Lint(file_path)
-                    if lint.is_c4():
-                        systems, system_connections = extract_systems_and_connections(file_path)
-                        system_names.update(systems)
-                        connections.extend(system_connections)
-                        print(f"File: {file}")
-                        print(f"Systems: {list(systems)}\n")
-
-                except Exception as e:
-                    print(f"Failed to process {file_path}: {e}")
+def iter_extracts(file_paths, workers=1, chunksize=None, cache=None, prescreen=True, **lint_kwargs):
+    # files with a cached lint result reuse its systems and connections, the rest are only parsed;
+    # lint_kwargs are the options the cached results were linted with, see LintCache.bind
+    file_paths = list(file_paths)
+    cached = set()
+    if cache is not None:
+        cache.bind(**lint_kwargs)
+        cached = {file_path for file_path in file_paths if file_path in cache}
+    fresh = map_in_pool(partial(extract_file, prescreen=prescreen),
+                        [p for p in file_paths if p not in cached], workers, chunksize)
+    for file_path in file_paths:
+        data = cache.get(file_path) if file_path in cached else None
+        if data is not None:
+            system_names = distinct_system_names([data['systems']] + [page['systems'] for page in data['pages']])
+            yield (file_path, data['is_c4'], system_names,
+                   [tuple(connection) for connection in data['connections']], None)
+        else:
+            yield next(fresh) if file_path not in cached else extract_file(file_path, prescreen)
 
+def analyze_network(directory, workers=1, chunksize=None, cache=None, prescreen=True, **lint_kwargs):
+    import networkx as nx
     graph = nx.Graph()
-    graph.add_edges_from(connections)
+    system_names = set()
+    connections = []
+
+    for file_path, is_c4, systems, file_connections, failure in iter_extracts(
+            find_drawio_files(directory), workers=workers, chunksize=chunksize, cache=cache,
+            prescreen=prescreen, **lint_kwargs):
+        if failure is not None:
+            print(f"Failed to process {file_path}: {failure}")
+        elif is_c4:
+            system_names.update(systems)
+            connections.extend(file_connections)
+            graph.add_edges_from(file_connections)
+            print(f"File: {os.path.basename(file_path)}")
+            print(f"Systems: {systems}\n")
 
     return graph, system_names, connections
 
-if __name__ == "__main__":
-    directory_path = 'C:\\Solutions\\Python\\drawio_c4_lint\\c4_github_examples'  # Update this path to your specific top level directory
-    graph, system_names, connections = analyze_network(directory_path)
+def main(argv=None):
+    import argparse
+    import networkx as nx
+    parser = argparse.ArgumentParser(description="Build the system landscape from all C4 draw.io diagrams below a directory.")
+    parser.add_argument('directory', help="top level directory to search for .drawio files")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="number of worker processes, 0 for one per core (default: 1)")
+    args = parser.parse_args(argv)
+    configure_logging()
+    graph, system_names, connections = analyze_network(args.directory, workers=args.workers or None)
     print(f"Nodes (Systems): {len(graph.nodes)}")
     print(f"Edges (Connections): {len(graph.edges)}")
     if len(graph.nodes) == 0:
@@ -49,3 +109,6 @@ if __name__ == "__main__":
             print("Systems in each connected component:")
             for component in nx.connected_components(graph):
                 print(component)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import os
+import sqlite3
+from drawio_c4_lint.c4_lint import configure_logging
+from drawio_c4_lint.c4_lint_on_directory import find_drawio_files, map_in_pool
+from drawio_c4_lint.diagram_model import read_pages
+from drawio_c4_lint.lint_cache import file_sha256
+from drawio_c4_lint.relationships import RelationshipResolver
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    is_c4 INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS elements (
+    file_path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    element_id TEXT,
+    c4_type TEXT,
+    name TEXT COLLATE NOCASE,
+    description TEXT,
+    technology TEXT
+);
+CREATE TABLE IF NOT EXISTS relationships (
+    file_path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    relationship_id TEXT,
+    source_name TEXT COLLATE NOCASE,
+    target_name TEXT COLLATE NOCASE,
+    description TEXT,
+    technology TEXT COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS elements_name ON elements(name);
+CREATE INDEX IF NOT EXISTS elements_file ON elements(file_path);
+CREATE INDEX IF NOT EXISTS relationships_source ON relationships(source_name);
+CREATE INDEX IF NOT EXISTS relationships_target ON relationships(target_name);
+CREATE INDEX IF NOT EXISTS relationships_technology ON relationships(technology);
+CREATE INDEX IF NOT EXISTS relationships_file ON relationships(file_path);
+"""
+# files.sha256 of a file that could not be extracted, which has no rows until it changes
+FAILED_SHA = ''
+
+
+def extract_architecture(file_path):
+    """Picklable (file_path, sha256, is_c4, elements, relationships, failure) for every page of one diagram.
+
+    A page that cannot be parsed is left out; the file only fails when none of its pages can be.
+    """
+    try:
+        sha = file_sha256(file_path)
+        pages = read_pages(file_path)
+    except Exception as e:
+        return file_path, None, False, [], [], str(e)
+    is_c4 = False
+    elements = []
+    relationships = []
+    failures = []
+    for page in pages:
+        try:
+            model = page.model()
+        except Exception as e:
+            failures.append(str(e))
+            continue
+        is_c4 = is_c4 or model.has_c4_objects()
+        _extract_page(model, elements, relationships)
+    if len(failures) == len(pages):
+        return file_path, None, False, [], [], failures[0]
+    return file_path, sha, is_c4, elements, relationships, None
+
+
+def _extract_page(model, elements, relationships):
+    resolver = RelationshipResolver(model)
+    for elem in model.objects:
+        c4_type = elem.get('c4Type', '').strip()
+        if c4_type == 'Relationship':
+            cell = model.cells_by_id.get(elem.get('id'))
+            if cell is None:
+                continue
+            # endpoints attached to a child of an element count for the element
+            ends = [resolver.resolve(cell.get(end))[1] if cell.get(end) is not None else None
+                    for end in ('source', 'target')]
+            if ends[0] is None or ends[1] is None:
+                continue
+            relationships.append((elem.get('id'), ends[0].get('c4Name', '').strip(), ends[1].get('c4Name', '').strip(),
+                                  elem.get('c4Description', '').strip(), elem.get('c4Technology', '').strip()))
+        elif c4_type:
+            elements.append((elem.get('id'), c4_type, elem.get('c4Name', '').strip(),
+                             elem.get('c4Description', '').strip(), elem.get('c4Technology', '').strip()))
+
+
+class ArchitectureIndex:
+    """SQLite index of the C4 elements and relationships across a diagram estate.
+
+    update() only re-extracts files whose mtime or size changed and whose
+    content hash differs from the stored one, and drops files that are gone.
+    A file that fails keeps no rows and is not retried until it changes.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def update(self, directory, workers=1, chunksize=None):
+        """Bring the index up to date with directory; returns (updated, unchanged, removed, failed) paths."""
+        failed = []
+        directory = os.path.abspath(directory)
+        stored = {path: (sha, mtime_ns, size) for path, sha, mtime_ns, size in
+                  self.connection.execute("SELECT path, sha256, mtime_ns, size FROM files")}
+        stats = {}
+        unchanged = []
+        candidates = []
+        for file_path in find_drawio_files(directory):
+            stat = os.stat(file_path)
+            stats[file_path] = (stat.st_mtime_ns, stat.st_size)
+            entry = stored.get(file_path)
+            if entry is None or entry[1:] != stats[file_path]:
+                candidates.append(file_path)
+            elif entry[0] == FAILED_SHA:
+                failed.append(file_path)
+            else:
+                unchanged.append(file_path)
+
+        updated = []
+        with self.connection:
+            for file_path, sha, is_c4, elements, relationships, failure in map_in_pool(
+                    extract_architecture, candidates, workers, chunksize):
+                mtime_ns, size = stats[file_path]
+                if failure is not None:
+                    # its old rows would otherwise still answer queries
+                    self._replace_file(file_path, FAILED_SHA, mtime_ns, size, False, [], [])
+                    failed.append(file_path)
+                    continue
+                entry = stored.get(file_path)
+                if entry is not None and entry[0] == sha:
+                    # touched but not changed
+                    self.connection.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?",
+                                            (mtime_ns, size, file_path))
+                    unchanged.append(file_path)
+                    continue
+                self._replace_file(file_path, sha, mtime_ns, size, is_c4, elements, relationships)
+                updated.append(file_path)
+
+            prefix = os.path.join(directory, '')
+            removed = [path for path in stored if path.startswith(prefix) and path not in stats]
+            self.connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+        return updated, unchanged, removed, failed
+
+    def _replace_file(self, file_path, sha, mtime_ns, size, is_c4, elements, relationships):
+        self.connection.execute("DELETE FROM files WHERE path = ?", (file_path,))
+        self.connection.execute("INSERT INTO files VALUES (?, ?, ?, ?, ?)", (file_path, sha, mtime_ns, size, int(is_c4)))
+        self.connection.executemany("INSERT INTO elements VALUES (?, ?, ?, ?, ?, ?)",
+                                    [(file_path, *element) for element in elements])
+        self.connection.executemany("INSERT INTO relationships VALUES (?, ?, ?, ?, ?, ?)",
+                                    [(file_path, *relationship) for relationship in relationships])
+
+    def elements(self, c4_type=None):
+        """Distinct element names, optionally of one c4Type such as 'Software System' or 'Person'."""
+        if c4_type is None:
+            rows = self.connection.execute("SELECT DISTINCT name FROM elements ORDER BY name")
+        else:
+            rows = self.connection.execute("SELECT DISTINCT name FROM elements WHERE c4_type = ? ORDER BY name",
+                                           (c4_type,))
+        return [name for name, in rows]
+
+    def diagrams_mentioning(self, name):
+        rows = self.connection.execute(
+            "SELECT DISTINCT file_path FROM elements WHERE name = ? ORDER BY file_path", (name,))
+        return [file_path for file_path, in rows]
+
+    def neighbours(self, name):
+        """Names of the elements that have a relationship to or from name."""
+        rows = self.connection.execute(
+            "SELECT target_name FROM relationships WHERE source_name = ? "
+            "UNION SELECT source_name FROM relationships WHERE target_name = ? ORDER BY 1", (name, name))
+        return [neighbour for neighbour, in rows]
+
+    def technologies(self):
+        """(technology, relationship count) pairs, most used first."""
+        return self.connection.execute(
+            "SELECT technology, COUNT(*) FROM relationships WHERE technology != '' "
+            "GROUP BY technology ORDER BY COUNT(*) DESC, technology").fetchall()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Query a persistent index of C4 draw.io diagrams.")
+    parser.add_argument('--db', default='architecture_index.sqlite', help="index database (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    update = commands.add_parser('update', help="index new and changed diagrams below a directory")
+    update.add_argument('directory')
+    update.add_argument('-j', '--workers', type=int, default=1,
+                        help="number of worker processes, 0 for one per core (default: 1)")
+    commands.add_parser('systems', help="list Software Systems")
+    commands.add_parser('persons', help="list Persons")
+    mentions = commands.add_parser('mentions', help="diagrams that contain an element")
+    mentions.add_argument('name')
+    neighbours = commands.add_parser('neighbours', help="elements with a relationship to or from an element")
+    neighbours.add_argument('name')
+    commands.add_parser('technologies', help="technologies used on relationships")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    with ArchitectureIndex(args.db) as index:
+        if args.command == 'update':
+            updated, unchanged, removed, failed = index.update(args.directory, workers=args.workers or None)
+            for file_path in failed:
+                print(f"Failed to index {file_path}")
+            print(f"{len(updated)} updated, {len(unchanged)} unchanged, {len(removed)} removed, {len(failed)} failed")
+        elif args.command == 'systems':
+            print('\n'.join(index.elements('Software System')))
+        elif args.command == 'persons':
+            print('\n'.join(index.elements('Person')))
+        elif args.command == 'mentions':
+            print('\n'.join(index.diagrams_mentioning(args.name)))
+        elif args.command == 'neighbours':
+            print('\n'.join(index.neighbours(args.name)))
+        elif args.command == 'technologies':
+            for technology, count in index.technologies():
+                print(f"{count:6d}  {technology}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Startup-time benchmark for the directory linter command line entry point.
+
+Runs ``python -X importtime -m drawio_c4_lint.c4_lint_on_directory --help``
+a few times and compares the best total import time with a budget:
+
+    python -m drawio_c4_lint.benchmarks.startup --runs 5 --budget-ms 80
+
+Exits non-zero when the budget is exceeded or when one of the modules the
+linter only loads on demand shows up at startup.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ENTRY_POINT = 'drawio_c4_lint.c4_lint_on_directory'
+STARTUP_BUDGET_MS = 80
+# only imported by the code paths that need them, never just to start the CLI
+LAZY_MODULES = ('pandas', 'networkx', 'lxml', 'difflib', 'json', 'concurrent.futures', 'multiprocessing')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure_import_time(module=ENTRY_POINT, args=('--help',)):
+    """Return (total microseconds, {module name: cumulative microseconds}) for one interpreter start."""
+    command = [sys.executable, '-X', 'importtime', '-m', module, *args]
+    process = subprocess.run(command, capture_output=True, text=True, cwd=PROJECT_ROOT)
+    total = 0
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+        # top level imports are indented by a single space, nested ones by two more per level
+        if len(name) - len(name.lstrip()) == 1:
+            total += int(cumulative)
+    return total, modules
+
+
+def loaded_lazy_modules(modules):
+    return sorted(name for name in modules
+                  if any(name == lazy or name.startswith(lazy + '.') for lazy in LAZY_MODULES))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument('--top', type=int, default=10, help="slowest modules to list")
+    args = parser.parse_args(argv)
+
+    best_total, best_modules = None, None
+    for _ in range(args.runs):
+        total, modules = measure_import_time()
+        if best_total is None or total < best_total:
+            best_total, best_modules = total, modules
+
+    print(f"{ENTRY_POINT} import time: {best_total / 1000:.1f} ms "
+          f"(best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    for name, cumulative in sorted(best_modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    lazy = loaded_lazy_modules(best_modules)
+    if lazy:
+        print(f"FAIL: modules that should load lazily were imported at startup: {', '.join(lazy)}")
+        failed = True
+    if best_total / 1000 > args.budget_ms:
+        print("FAIL: startup import time is over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Benchmark suite for parsing, every lint rule, Structurizr export, directory batches and bulk encoding.
+
+Synthetic diagrams (see benchmarks.synthetic) are generated into a temporary
+directory, every benchmark reports the best wall time of a few repeats and
+the peak traced memory of one extra run:
+
+    python -m drawio_c4_lint.benchmarks.suite --cells 100 1000 10000 --save-baseline baseline.json
+    python -m drawio_c4_lint.benchmarks.suite --cells 100 1000 10000 --baseline baseline.json
+
+Exits non-zero when a benchmark is slower than its baseline by more than
+--max-slowdown.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from drawio_c4_lint.benchmarks.synthetic import generate_corpus, generate_diagram
+from drawio_c4_lint.c4_lint import C4Lint
+from drawio_c4_lint.c4_lint_on_directory import lint_drawio_files
+from drawio_c4_lint.diagram_model import DiagramModel
+from drawio_c4_lint.drawio import drawio_serialization
+from drawio_c4_lint.known_applications import read_application_names
+from drawio_c4_lint.rules import RULES, run_rules, select_rules
+
+KNOWN_APPLICATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'applications.csv')
+MAX_SLOWDOWN = 1.25
+# timings below this are too noisy to flag as regressions
+MIN_COMPARED_SECONDS = 0.001
+
+
+def measure(function, repeat=3):
+    """Return (best seconds, peak traced bytes) for function(), the peak comes from one extra traced call."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def _run_rule(lint, name):
+    lint.diagnostics = []
+    lint.c4_object_count = 0
+    lint.non_c4_object_count = 0
+    run_rules(lint, select_rules([name]))
+
+
+def _export_structurizr(lint):
+    lint._facts = None
+    lint._structurizr_json = None
+    return lint.to_structurizr()
+
+
+def diagram_benchmarks(path, label, repeat=3):
+    """{name: (seconds, peak bytes)} for parsing, each rule and Structurizr export of one diagram."""
+    results = {f'parse[{label}]': measure(lambda: DiagramModel.from_file(path), repeat)}
+    lint = C4Lint(path, known_applications=KNOWN_APPLICATIONS, rules=[])
+    for name in RULES:
+        results[f'rule:{name}[{label}]'] = measure(lambda: _run_rule(lint, name), repeat)
+    results[f'structurizr[{label}]'] = measure(lambda: _export_structurizr(lint), repeat)
+    results[f'lint[{label}]'] = measure(lambda: C4Lint(path, known_applications=KNOWN_APPLICATIONS), repeat)
+    return results
+
+
+def batch_benchmark(directory, label, workers=1, repeat=1):
+    def lint_directory():
+        lint_drawio_files(directory, workers=workers, stream=io.StringIO(), keep_results=False,
+                          known_applications=KNOWN_APPLICATIONS)
+    return {f'batch[{label}]': measure(lint_directory, repeat)}
+
+
+def codec_benchmarks(payloads, label, workers=None, repeat=3):
+    """Encoding and decoding many diagram payloads call by call and with the threaded batch functions."""
+    encoded = [drawio_serialization.encode_diagram_data(payload) for payload in payloads]
+    threads = f"{workers or 'all'} threads"
+    return {
+        f'encode[{label}]': measure(lambda: [drawio_serialization.encode_diagram_data(p) for p in payloads], repeat),
+        f'encode_many[{label}, {threads}]': measure(
+            lambda: list(drawio_serialization.encode_many(payloads, workers)), repeat),
+        f'decode[{label}]': measure(lambda: [drawio_serialization.decode_diagram_data(p) for p in encoded], repeat),
+        f'decode_many[{label}, {threads}]': measure(
+            lambda: list(drawio_serialization.decode_many(encoded, workers)), repeat),
+    }
+
+
+def run_suite(cells=(100, 1000, 10000), batch_files=20, batch_cells=1000, workers=1, repeat=3, codec_payloads=100,
+              codec_cells=500, **diagram_options):
+    diagram_options.setdefault('known_applications', read_application_names(KNOWN_APPLICATIONS))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in cells:
+            for compressed in (True, False):
+                label = f"{size} cells {'compressed' if compressed else 'plain'}"
+                directory = os.path.join(tmp, label)
+                path, = generate_corpus(directory, files=1, cells=size, compressed=compressed, **diagram_options)
+                results.update(diagram_benchmarks(path, label, repeat))
+        if batch_files:
+            directory = os.path.join(tmp, 'batch')
+            generate_corpus(directory, files=batch_files, cells=batch_cells, **diagram_options)
+            label = f"{batch_files}x{batch_cells} cells, {workers or 'all'} workers"
+            results.update(batch_benchmark(directory, label, workers, max(1, repeat // 2)))
+    if codec_payloads:
+        import lxml.etree as etree
+        payloads = [etree.tostring(generate_diagram(codec_cells, seed=seed, **diagram_options), encoding='unicode')
+                    for seed in range(codec_payloads)]
+        results.update(codec_benchmarks(payloads, f"{codec_payloads}x{codec_cells} cells", workers, repeat))
+    return results
+
+
+def compare(results, baseline, max_slowdown=MAX_SLOWDOWN):
+    """Names of the benchmarks that got slower than baseline by more than max_slowdown."""
+    return [name for name, (seconds, _) in results.items()
+            if name in baseline and baseline[name][0] >= MIN_COMPARED_SECONDS
+            and seconds > baseline[name][0] * max_slowdown]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cells', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="diagram sizes to benchmark (default: 100 1000 10000)")
+    parser.add_argument('--batch-files', type=int, default=20, help="diagrams in the batch benchmark, 0 to skip")
+    parser.add_argument('--batch-cells', type=int, default=1000)
+    parser.add_argument('--codec-payloads', type=int, default=100,
+                        help="diagrams in the bulk encode/decode benchmark, 0 to skip")
+    parser.add_argument('--codec-cells', type=int, default=500)
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="processes for the batch and threads for the bulk encode/decode benchmark, "
+                             "0 for all cores")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--relationship-ratio', type=float, default=0.5)
+    parser.add_argument('--known-app-rate', type=float, default=0.5)
+    parser.add_argument('--baseline', default=None, help="JSON results of an earlier run to compare with")
+    parser.add_argument('--save-baseline', default=None, help="write the results to this JSON file")
+    parser.add_argument('--max-slowdown', type=float, default=MAX_SLOWDOWN)
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.cells, args.batch_files, args.batch_cells, args.workers or None, args.repeat,
+                        args.codec_payloads, args.codec_cells, error_rate=args.error_rate, relationship_ratio=args.relationship_ratio,
+                        known_app_rate=args.known_app_rate)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    for name, (seconds, peak) in results.items():
+        line = f"  {seconds * 1000:10.2f} ms  {peak / 2 ** 20:8.2f} MiB  {name}"
+        if name in baseline:
+            line += f"  ({seconds / baseline[name][0]:.2f}x baseline)"
+        print(line)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    slower = compare(results, baseline, args.max_slowdown)
+    for name in slower:
+        print(f"FAIL: {name} is more than {args.max_slowdown:.2f}x slower than the baseline")
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Synthetic C4 diagrams of configurable size for benchmarking the linter.
+
+    python -m drawio_c4_lint.benchmarks.synthetic out_dir --files 20 --cells 10000 --plain
+
+Diagrams are built with the drawio helpers, so they look like the ones the
+linter sees in practice: C4 ``object`` wrappers around ``mxCell`` vertices
+and edges on a "Default" layer, compressed or plain XML.
+"""
+import argparse
+import os
+import random
+from lxml import etree
+from drawio_c4_lint.drawio.drawio_shapes import create_line, create_rectangle
+from drawio_c4_lint.drawio.drawio_utils import (IdAllocator, create_layer, encode_and_save_to_file, get_diagram_root,
+                                                save_to_file)
+
+ELEMENT_TYPES = (('Software System', 0.6), ('Container', 0.2), ('Person', 0.2))
+# the properties the required-attributes rule checks
+REQUIRED = {
+    'Software System': ('c4Name', 'c4Description'),
+    'Container': ('c4Name', 'c4Description'),
+    'Person': ('c4Name', 'c4Description'),
+    'Relationship': ('c4Description', 'c4Technology'),
+}
+STYLES = {
+    'Software System': 'rounded=1;whiteSpace=wrap;html=1;fillColor=#1061B0;fontColor=#ffffff;metaEdit=1;',
+    'Container': 'rounded=1;whiteSpace=wrap;html=1;fillColor=#23A2D9;fontColor=#ffffff;metaEdit=1;',
+    'Person': 'html=1;shape=mxgraph.c4.person2;fillColor=#083F75;fontColor=#ffffff;metaEdit=1;',
+    'Relationship': 'endArrow=blockThin;html=1;endFill=1;strokeColor=#828282;metaEdit=1;',
+}
+TECHNOLOGIES = ('HTTPS', 'JDBC', 'gRPC', 'Kafka', 'SFTP', 'AMQP')
+COLUMNS = 50
+
+
+def _c4_object(c4_type, element_id, attributes, cell, rng, error_rate):
+    obj = etree.Element('object')
+    obj.set('placeholders', '1')
+    obj.set('label', '%c4Name%')
+    obj.set('c4Type', c4_type)
+    for name, value in attributes.items():
+        obj.set(name, value)
+    if rng.random() < error_rate:
+        # drop one required property, which the required-attributes rule reports
+        del obj.attrib[rng.choice(REQUIRED[c4_type])]
+    obj.set('id', element_id)
+    del cell.attrib['id']
+    obj.append(cell)
+    return obj
+
+
+def generate_diagram(cells=1000, relationship_ratio=0.5, error_rate=0.05, known_app_rate=0.5,
+                     known_applications=(), seed=0):
+    """Return an mxGraphModel with about ``cells`` C4 elements and relationships.
+
+    relationship_ratio is relationships per element, error_rate the fraction
+    of objects missing a required property and known_app_rate the fraction of
+    Software Systems named after an entry of known_applications.
+    """
+    rng = random.Random(seed)
+    mxGraphModel = get_diagram_root()
+    # seeded too, so that the same arguments give the same file
+    ids = IdAllocator.for_model(mxGraphModel, seed)
+    root = mxGraphModel[0]
+    layer = create_layer('Default', ids=ids)
+    root.append(layer)
+    layer_id = layer.get('id')
+
+    element_count = max(1, round(cells / (1 + relationship_ratio)))
+    types = [c4_type for c4_type, _ in ELEMENT_TYPES]
+    weights = [weight for _, weight in ELEMENT_TYPES]
+    element_ids = []
+    for i in range(element_count):
+        c4_type = rng.choices(types, weights)[0]
+        element_id = f'e-{i}'
+        if c4_type == 'Software System' and known_applications and rng.random() < known_app_rate:
+            name = rng.choice(known_applications)
+        else:
+            name = f'{c4_type} {i}'
+        attributes = {'c4Name': name, 'c4Description': f'Description of {name}'}
+        if c4_type == 'Container':
+            attributes['c4Technology'] = rng.choice(TECHNOLOGIES)
+        x, y = (i % COLUMNS) * 260, (i // COLUMNS) * 160
+        cell = create_rectangle(layer_id, x, y, 240, 120, style=STYLES[c4_type], ids=ids)
+        root.append(_c4_object(c4_type, element_id, attributes, cell, rng, error_rate))
+        element_ids.append(element_id)
+
+    for i in range(cells - element_count if element_count > 1 else 0):
+        source, target = rng.sample(element_ids, 2)
+        cell = create_line(layer_id, 0, 0, 0, 0, 160, 0, style=STYLES['Relationship'], ids=ids)
+        cell.set('source', source)
+        cell.set('target', target)
+        attributes = {'c4Description': f'Calls {i}', 'c4Technology': rng.choice(TECHNOLOGIES)}
+        root.append(_c4_object('Relationship', f'r-{i}', attributes, cell, rng, error_rate))
+    return mxGraphModel
+
+
+def write_diagram(mxGraphModel, filename, compressed=True):
+    if compressed:
+        encode_and_save_to_file(mxGraphModel, filename)
+    else:
+        save_to_file(mxGraphModel, filename)
+
+
+def generate_corpus(directory, files=10, cells=1000, compressed=True, seed=0, **diagram_options):
+    """Write ``files`` synthetic diagrams below directory and return their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f'C4 L1 Synthetic {i:05d}.drawio')
+        write_diagram(generate_diagram(cells, seed=seed + i, **diagram_options), path, compressed)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory')
+    parser.add_argument('--files', type=int, default=10)
+    parser.add_argument('--cells', type=int, default=1000, help="C4 elements plus relationships per diagram")
+    parser.add_argument('--plain', action='store_true', help="write plain XML instead of compressed diagrams")
+    parser.add_argument('--relationship-ratio', type=float, default=0.5)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--known-app-rate', type=float, default=0.5)
+    parser.add_argument('--known-applications', default=None, help="CSV to take known application names from")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    known_applications = ()
+    if args.known_applications:
+        from drawio_c4_lint.known_applications import read_application_names
+        known_applications = read_application_names(args.known_applications)
+    paths = generate_corpus(args.directory, args.files, args.cells, compressed=not args.plain, seed=args.seed,
+                            relationship_ratio=args.relationship_ratio, error_rate=args.error_rate,
+                            known_app_rate=args.known_app_rate, known_applications=known_applications)
+    print(f"Wrote {len(paths)} diagrams to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
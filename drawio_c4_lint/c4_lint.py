@@ -1,67 +1,87 @@
-import os.path
-import xml.etree.ElementTree as ET
-import lxml.etree as etree
-import json
+import io
 import logging
-import re
-import os
-import drawio.drawio_serialization
-import pandas as pd
-import difflib
+from time import perf_counter
+from drawio_c4_lint.c4_model import C4Model
+from drawio_c4_lint.diagnostics import Diagnostic, ReadableProperties, messages_by_category
+from drawio_c4_lint.diagram_model import DiagramModel, DiagramPage
+from drawio_c4_lint.profiling import LintStats, timed_call
+from drawio_c4_lint.known_applications import KnownApplicationsMatcher, get_known_applications
+from drawio_c4_lint.rules import DEFAULT_PROFILE, run_rules, select_rules
 
 
 
 #TODO need to distinguish objects and other mxGraph cell elements in the XML and include them as a 3rd count in the summary
 
-# Set up logging
-logging.basicConfig(
-    handlers=[
-        logging.StreamHandler()
-    ],
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)-8s] %(name)s %(funcName)s: %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-
 logger = logging.getLogger(__name__)
 
+
+def configure_logging(level=logging.INFO):
+    # called by the command line entry points, importing the linter leaves logging alone
+    logging.basicConfig(
+        handlers=[
+            logging.StreamHandler()
+        ],
+        level=level,
+        format='%(asctime)s [%(levelname)-8s] %(name)s %(funcName)s: %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+
 class XMLParseException(Exception):
     pass
 
 class C4Lint:
-    def __init__(self, xml_file, output_text_description_file=False, include_ids=False, structurizr=False, known_applications=[]):
+    def __init__(self, xml_file, output_text_description_file=False, include_ids=False, structurizr=False, known_applications=[],
+                 rules=None, disabled_rules=(), profile=DEFAULT_PROFILE, collect_stats=False, content=None,
+                 max_decoded_size=None, page=0):
+        # content: the diagram as bytes, parsed instead of reading xml_file, which then only names it
+        # page: index, id or name of the page to lint, or a DiagramPage that has already been read
         logger.debug((f"Initializing C4Lint with xml_file: {xml_file}, "))
-        self.errors = {'Systems': [], 'Actors': [], 'Relationships': [], 'Other': []}
-        self.warnings = {'Systems': [], 'Actors': [], 'Relationships': [], 'Other': []}
+        start = perf_counter()
+        # per-phase and per-rule timers and counters, None unless collect_stats is set
+        self.stats = LintStats() if collect_stats else None
         self.objects = {'Systems': [], 'Actors': [], 'Relationships': [], 'Other': []}
+        # one Diagnostic per reported error or warning, errors and warnings render them on demand;
+        # setting it also drops the rendered messages
+        self.diagnostics = []
         self.c4_object_count = 0
         self.non_c4_object_count = 0
         self.xml_file = xml_file
         self.output_text_description_file = output_text_description_file
         self.include_ids = include_ids
-        self.root = self.parse_xml(xml_file)
+        self.model = None
+        # derived once from the model on first use, see invalidate()
+        self._facts = None
+        self._structurizr_json = None
+        self._report = None
+        self._c4_model = None
+        self.max_decoded_size = max_decoded_size
+        # kept apart from the model so that they survive release_tree()
+        self.page_index = None
+        self.page_id = None
+        self.page_name = None
+        self.root = timed_call(self.stats, 'parse', self.parse_xml, xml_file, content, page)
         self.linted = False
-        self.known_applications = self.load_known_applications(known_applications) if known_applications else []
+        if isinstance(known_applications, KnownApplicationsMatcher):
+            self.matcher = known_applications
+        elif known_applications:
+            self.matcher = get_known_applications(known_applications)
+        else:
+            self.matcher = KnownApplicationsMatcher([])
+        self.known_applications = self.matcher.names
         self.structurizr = structurizr
-        self.lint()
+        self.profile = profile
+        self.rules = select_rules(rules, disabled_rules, profile)
+        timed_call(self.stats, 'rules', self.run_rules)
+        if self.stats is not None:
+            self.stats.add_time('lint', perf_counter() - start)
 
     def load_known_applications(self, csv_path):
-        logger.debug(f"Loading known strings from {csv_path}")
-        df = pd.read_csv(csv_path)
-        known_strings = df['Business Application Name'].dropna().tolist()
-        return known_strings
-
-    def match_strings(self, input_string, known_strings):
-        input_string_lower = input_string.lower()
-        known_strings_lower = [s.lower() for s in known_strings]
-
-        # Exact match
-        if input_string_lower in known_strings_lower:
-            return [input_string]
+        return get_known_applications(csv_path).names
 
-        # Fuzzy match
-        matches = difflib.get_close_matches(input_string_lower, known_strings_lower, n=3, cutoff=0.0)
-        return matches
+    def match_strings(self, input_string, known_strings=None):
+        matcher = self.matcher if known_strings is None else KnownApplicationsMatcher(known_strings)
+        return matcher.match(input_string, self.stats)
 
     def find_parent(self, element, tree):
         for parent in tree.iter():
@@ -70,99 +90,21 @@ class C4Lint:
                     return parent
         return None
 
-    def parse_xml(self, xml_file):
+    def parse_xml(self, xml_file, content=None, page=0):
         logger.debug(f"Parsing XML file: {xml_file}")
         try:
-            tree = etree.parse(xml_file)
-            xml_data = tree.findall('.//diagram')[0]
-            # sometimes the "plain xml" files create with drawio desktop will still have the text
-            # attribute in them with '\n ' as content so we need to check for that as well
-            if hasattr(xml_data, 'text') and not xml_data.text.isspace():
-                try:
-                    xml_string = drawio.drawio_serialization.decode_diagram_data(xml_data.text)
-                    return ET.fromstring(xml_string)
-                except Exception:
-                    pass
+            if isinstance(page, DiagramPage):
+                self.model = DiagramModel.from_page(page, self.stats, self.max_decoded_size)
             else:
-                xml_data = xml_data.find('.//mxGraphModel')
-            xml_string = ET.tostring(xml_data, encoding='utf-8').decode('utf-8')
-            return ET.fromstring(xml_string)
+                source = xml_file if content is None else io.BytesIO(content)
+                self.model = DiagramModel.from_file(source, self.stats, self.max_decoded_size, page)
         except Exception as e:
-            error_message = f"Error parsing XML file: {xml_file}, {str(e)}"
-            self.errors['Other'].append(error_message)
-            raise XMLParseException(error_message)
-
-    def check_all_systems_connected(self):
-        logger.debug("Checking all systems are connected")
-        systems = {elem.get('id'): elem for elem in self.root.findall(".//object[@c4Type!='Relationship']")}
-
-        def find_connected_systems(self):
-            results = set()
-            objects = self.root.findall(".//object")
-            for obj in objects:
-                mxcell = obj.find(".//mxCell")
-                if mxcell is not None:
-                    if 'source' in mxcell.attrib or 'target' in mxcell.attrib:
-                        # at least one leg is connected
-                        if 'source' in mxcell.attrib and 'target' in mxcell.attrib:
-                            results.add(mxcell.attrib['source'])
-                            results.add(mxcell.attrib['target'])
-                        else:
-                            self.errors['Relationships'].append(
-                                # TODO - include a test case
-                                f"ERROR: {obj.attrib['c4Description']} -- one leg disconnected")
-
-            return results
-
-        systems_with_at_least_one_connection = find_connected_systems(self)
-
-        for system_id, system_details in systems.items():
-            if system_id not in systems_with_at_least_one_connection:
-                self.errors['Systems'].append(f"ERROR: Software System (c4Name: {system_details.attrib['c4Name']}, c4Type: {system_details.attrib['c4Type']}, id {system_id}) is not connected by any relationship.")
-
-
-    def check_c4_objects(self):
-        logger.debug("Checking C4 objects")
-        required_attribs = {'c4Name', 'c4Description', 'c4Type', 'c4Technology'}
-        objects_found = False
-
-        for elem in self.root.findall(".//object"):
-            objects_found = True
-            elem_attribs = set(elem.attrib.keys())
-            c4_type = elem.attrib.get('c4Type', '').strip()
-
-            if c4_type == "Relationship":
-                self.c4_object_count += 1
-                self.check_required_attributes(elem, {'c4Description', 'c4Technology'}, category='Relationships', is_relationship=True)
-            elif 'c4Type' in elem_attribs:
-                self.c4_object_count += 1
-                # ToDo this looks like flimsy logic. Need to refactor. Both and add the type lookup by colour
-                # parent = self.find_parent(elem, self.root)
-                # self.objects['Systems'].append(self.parse_fill_color(parent.attrib.get('style', '')))
-                if c4_type == 'Software System':
-                    category = 'Systems'
-                    system_name = elem.attrib.get('c4Name', '').strip()
-                    if not system_name:
-                        self.errors['Systems'].append(f"ERROR: 'c4Name' property missing ---  {self.get_readable_properties(elem)}")
-                        continue
-                    matches = self.match_strings(system_name, self.known_applications)
-                    if not matches:
-                        self.errors['Systems'].append(f"ERROR: '{system_name}' not found in known strings")
-                    if not system_name in matches:
-                        self.warnings['Systems'].append(f"WARN: '{system_name}' not found in known strings. Suggestions {matches}")
-                elif c4_type == 'Person':
-                    category = 'Actors'
-                else:
-                    category = 'Other'
-
-
-                self.check_required_attributes(elem, {'c4Name', 'c4Description', 'c4Type'}, category=category)
-            else:
-                if elem_attribs.isdisjoint(required_attribs):
-                    self.non_c4_object_count += 1
-                    self.errors['Other'].append(f"ERROR: Non-C4 element found. Label: {elem.attrib.get('label', 'No label')}")
-        if not objects_found:
-            self.errors['Other'].append("ERROR: No elements of type Object found.")
+            diagnostic = self.report('C4000', 'Other', (xml_file, str(e)))
+            raise XMLParseException(diagnostic.message) from e
+        self.page_index = self.model.page.index
+        self.page_id = self.model.page.id
+        self.page_name = self.model.page.name
+        return self.model.root
 
     def parse_fill_color(style):
         parts = style.split(';')
@@ -177,102 +119,181 @@ class C4Lint:
         else:
             return 'Other'
 
-    def check_required_attributes(self, elem, required_attribs, category, is_relationship=False):
-        missing_attribs = [attrib for attrib in required_attribs if not elem.attrib.get(attrib, '').strip()]
-        if missing_attribs:
-            readable_properties = self.get_readable_properties(elem)
-            missing_descr = ', '.join(missing_attribs)
-            error_message = f"ERROR: '{missing_descr}' property missing ---  {readable_properties}"
-            if self.include_ids:
-                error_message += f" (mxCell id: {elem.attrib.get('id')})"
-            self.errors[category].append(error_message)
+    def report(self, code, category, args=(), element_id=None, severity='error'):
+        """Record a finding; the only way to add one, as it also drops the rendered messages."""
+        diagnostic = Diagnostic(code, severity, category, element_id, args)
+        self._diagnostics.append(diagnostic)
+        self._rendered = {}
+        return diagnostic
 
-    def get_readable_properties(self, elem):
-        props = {k: v.replace('\n', ' ') for k, v in elem.attrib.items() if v.strip() and k not in {'label', 'placeholders', 'id'}}
-        readable_props = ', '.join(f"{k}: {v}" for k, v in props.items())
-        return readable_props or "No additional properties"
+    @property
+    def diagnostics(self):
+        return self._diagnostics
 
-    def is_c4(self):
-        required_attribs = {'c4Name', 'c4Description', 'c4Type', 'c4Technology'}
-        for elem in self.root.findall(".//object"):
-            elem_attribs = set(elem.attrib.keys())
-            if not elem_attribs.isdisjoint(required_attribs):
-                return True
-        return False
+    @diagnostics.setter
+    def diagnostics(self, diagnostics):
+        self._diagnostics = diagnostics
+        # severity -> messages by category, see _messages()
+        self._rendered = {}
 
-    def has_errors(self):
-        if not self.linted:
-            self.lint()
-        return any(self.errors.values())
+    @property
+    def errors(self):
+        return self._messages('error')
 
     @property
-    def error_count(self):
-        if not self.linted:
-            raise RuntimeError("Use .lint() method first")
-        return sum(len(errors) for errors in self.errors.values())
+    def warnings(self):
+        return self._messages('warning')
 
-    def lint(self):
-        if self.linted:
-            return self.errors
+    def _messages(self, severity):
+        # rendered once and kept until report() or a new diagnostics list, which render them again
+        messages = self._rendered.get(severity)
+        if messages is None:
+            messages = self._rendered[severity] = messages_by_category(self._diagnostics, severity)
+        return messages
 
-        self.check_c4_objects()
-        self.check_all_systems_connected()
-        self.check_filename_format()
-        self.linted = True
-        return self.errors
+    def get_readable_properties(self, elem):
+        return str(ReadableProperties(elem.attrib.items()))
 
-    def to_structurizr(self):
+    def diagram_facts(self):
+        """C4-ness and the Structurizr elements and relationships, computed in one pass over the objects."""
+        if self._facts is not None:
+            return self._facts
+        required_attribs = {'c4Name', 'c4Description', 'c4Type', 'c4Technology'}
+        is_c4 = False
         elements = []
         relationships = []
-        for elem in self.root.findall(".//object"):
-            c4_type = elem.attrib.get("c4Type", "").strip()
+        for elem in self.model.objects:
+            attrib = elem.attrib
+            if not is_c4 and not required_attribs.isdisjoint(attrib.keys()):
+                is_c4 = True
+            c4_type = attrib.get("c4Type", "").strip()
             if c4_type == "Relationship":
+                # the endpoints live on the wrapped mxCell, not on the <object>
+                cell = self.model.cells_by_id.get(attrib.get("id"))
                 relationships.append({
-                    "source": elem.attrib.get("source", ""),
-                    "target": elem.attrib.get("target", ""),
-                    "description": elem.attrib.get("c4Description", "").replace("\n", " "),
-                    "technology": elem.attrib.get("c4Technology", "")
+                    "source": cell.get("source", "") if cell is not None else "",
+                    "target": cell.get("target", "") if cell is not None else "",
+                    "description": attrib.get("c4Description", "").replace("\n", " "),
+                    "technology": attrib.get("c4Technology", "")
                 })
             else:
                 elements.append({
-                    "id": elem.attrib.get("id", ""),
-                    "name": elem.attrib.get("c4Name", ""),
-                    "description": elem.attrib.get("c4Description", "").replace("\n", " "),
+                    "id": attrib.get("id", ""),
+                    "name": attrib.get("c4Name", ""),
+                    "description": attrib.get("c4Description", "").replace("\n", " "),
                     "type": c4_type,
-                    "technology": elem.attrib.get("c4Technology", "")
+                    "technology": attrib.get("c4Technology", "")
                 })
-        return json.dumps({"elements": elements, "relationships": relationships}, indent=2)
+        self._facts = {'is_c4': is_c4, 'elements': elements, 'relationships': relationships}
+        return self._facts
+
+    def invalidate(self):
+        """Drop everything derived from the tree, findings included; call after mutating self.root.
+
+        The rules run again on the next access to the findings or the report.
+        """
+        if self.model is None:
+            raise RuntimeError("The tree has been released, see release_tree()")
+        self.model.reindex()
+        self.diagnostics = []
+        self.objects = {category: [] for category in self.objects}
+        self.c4_object_count = 0
+        self.non_c4_object_count = 0
+        self.linted = False
+        self._facts = None
+        self._structurizr_json = None
+        self._report = None
+        self._c4_model = None
+
+    def c4_model(self):
+        """The compact C4Model of the diagram, which outlives release_tree()."""
+        if self._c4_model is None:
+            self._c4_model = C4Model.from_diagram_model(self.model, self.xml_file)
+        return self._c4_model
+
+    def release_tree(self):
+        """Derive everything the results need and drop the parsed tree.
+
+        Afterwards errors, reports, Structurizr output and c4_model() still
+        work, but rules can no longer be run and invalidate() is unavailable.
+        """
+        self.run_rules()
+        self.diagram_facts()
+        self.c4_model()
+        self.root = None
+        self.model = None
+
+    def is_c4(self):
+        return self.diagram_facts()['is_c4']
+
+    def has_errors(self):
+        if not self.linted:
+            self.lint()
+        return any(diagnostic.severity == 'error' for diagnostic in self.diagnostics)
+
+    @property
+    def error_count(self):
+        self.run_rules()
+        return sum(diagnostic.severity == 'error' for diagnostic in self.diagnostics)
 
-    def check_filename_format(self):
-        file = os.path.basename(self.xml_file)
-        filename_pattern = r"C4 L[01234] .*?.drawio"
-        if not re.match(filename_pattern, file):
-            self.errors['Other'].append(f"ERROR: Filename '{self.xml_file}' does not match expected format 'C4 L<x> <system name>.drawio'")
+    def run_rules(self):
+        if self.linted:
+            return
+        if self.model is None:
+            raise RuntimeError("The tree has been released, see release_tree()")
+        logger.debug(f"Running rules: {', '.join(rule.name for rule in self.rules)}")
+        run_rules(self, self.rules)
+        self.linted = True
+
+    def lint(self):
+        self.run_rules()
+        return self.errors
 
+    def structurizr_model(self):
+        facts = self.diagram_facts()
+        return {"elements": facts['elements'], "relationships": facts['relationships']}
+
+    def to_structurizr(self):
+        if self._structurizr_json is None:
+            self._structurizr_json = timed_call(self.stats, 'structurizr', self._dump_structurizr)
+        return self._structurizr_json
+
+    def _dump_structurizr(self):
+        import json
+        return json.dumps(self.structurizr_model(), indent=2)
 
     def __str__(self):
-        if not self.linted:
-            return "Use .lint() on the object to perform linting."
+        self.run_rules()
+        if self._report is None:
+            self._report = timed_call(self.stats, 'report', self.format_report)
+        return self._report
+
+    def format_report(self):
+        self.run_rules()
+        # rendered once here, the diagnostics carry no text until a report is asked for
+        errors = self.errors
+        warnings = self.warnings
+
         def format_errors():
             error_messages = ''
             for category in ['Systems', 'Actors', 'Relationships', 'Other']:
-                if self.errors[category]:
+                if errors[category]:
                     error_messages += f"\n\n  === {category} ===\n" + '\n'.join(
-                        f"  {error}" for error in self.errors[category])
+                        f"  {error}" for error in errors[category])
             return error_messages
 
         def format_warnings():
             warning_messages = ''
             for category in ['Systems', 'Actors', 'Relationships', 'Other']:
-                if self.errors[category]:
+                if errors[category]:
                     warning_messages += f"\n\n  === {category} ===\n" + '\n'.join(
-                        f"  {warning}" for warning in self.warnings[category])
+                        f"  {warning}" for warning in warnings[category])
             return warning_messages
 
         def format_objects(objects):
             object_messages = ''
             for category in objects:
-                if self.errors[category] or self.warnings[category]:
+                if errors[category] or warnings[category]:
                     object_messages += f"\n\n  === {category} ===\n" + '\n'.join(
                         f"  {object}" for o in self.objects[category])
             return error_messages
@@ -286,7 +307,9 @@ class C4Lint:
 
         output = (f"{60 * '#'}\n"
                   f"C4 Linter Input: {self.xml_file}\n"
-                  f"Include IDs in errors: {'Enabled' if self.include_ids else 'Disabled'}")
+                  f"Page: {self.page_name} (id {self.page_id})\n"
+                  f"Include IDs in errors: {'Enabled' if self.include_ids else 'Disabled'}\n"
+                  f"Profile: {self.profile}")
 
         if not self.linted:
             self.lint()
@@ -294,7 +317,7 @@ class C4Lint:
         if not self.is_c4():
             return f"{output}  No C4 objects found. No linting performed.\n"
 
-        if any(self.errors.values()) or any(self.warnings.values()) or any(self.objects.values()):
+        if any(errors.values()) or any(warnings.values()) or any(self.objects.values()):
             error_messages = format_errors()
             warning_messages = format_warnings()
             systems = format_objects(['Systems'])
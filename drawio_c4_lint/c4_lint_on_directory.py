@@ -1,18 +1,431 @@
+import io
 import os
-from drawio_c4_lint.c4_lint import C4Lint
+import sys
+from collections import Counter, deque
+from functools import partial
+from itertools import chain, groupby, islice
+from time import perf_counter
+from drawio_c4_lint.c4_lint import C4Lint, configure_logging
+from drawio_c4_lint.diagnostics import DIAGNOSTIC_CODES, MESSAGES, Diagnostic, count_codes, messages_by_category
+from drawio_c4_lint.diagram_model import (count_pages, distinct_system_names, iter_page_xml, may_contain_c4,
+                                          merge_page_systems, page_from_xml, read_pages)
+from drawio_c4_lint.known_applications import get_known_applications
+from drawio_c4_lint.profiling import BatchStats, LintStats
+from drawio_c4_lint.rules import DEFAULT_PROFILE, PROFILES, check_rule_names, cross_page_diagnostics
 
-def lint_drawio_files(directory):
+# chunks submitted per worker process before the first result is waited for
+IN_FLIGHT_CHUNKS = 4
+# items per chunk when map_in_pool cannot tell how many items there are
+LAZY_CHUNKSIZE = 16
+
+
+class LintResult:
+    """Picklable outcome of linting one file, built in the worker and consumed by the parent.
+
+    A file with several pages is linted page by page and the page results are
+    combined with from_pages; ``pages`` holds one summary record per page.
+    """
+
+    def __init__(self, file_path, is_c4=False, c4_object_count=0, non_c4_object_count=0, report='', failure=None,
+                 systems=None, connections=None, profile=DEFAULT_PROFILE, diagnostics=None, stats=None, pages=None):
+        self.file_path = file_path
+        self.is_c4 = is_c4
+        self.c4_object_count = c4_object_count
+        self.non_c4_object_count = non_c4_object_count
+        self.report = report
+        self.failure = failure
+        # Software System names by id and (source name, target name) pairs, for network analysis;
+        # a multi-page file has the names of each page in its page records, see system_names()
+        self.systems = systems or {}
+        self.connections = connections or []
+        self.profile = profile
+        # one Diagnostic per finding, see C4Lint.report
+        self.diagnostics = diagnostics or []
+        # LintStats.to_dict() of the lint when it collected stats, otherwise None
+        self.stats = stats
+        # {'index', 'id', 'name', 'is_c4', 'error_count', 'warning_count', 'failure', 'systems'} per linted page
+        self.pages = pages or []
+
+    @classmethod
+    def from_lint(cls, lint, render_report=True):
+        """The result of a C4Lint; render_report=False leaves out the text report, which only TextWriter prints."""
+        is_c4 = lint.is_c4()
+        systems, connections = lint.c4_model().systems_and_connections()
+        # rendered before the stats are copied so that they include the report
+        report = str(lint) if is_c4 and render_report else ''
+        diagnostics = list(lint.diagnostics)
+        page = {'index': lint.page_index, 'id': lint.page_id, 'name': lint.page_name, 'is_c4': is_c4,
+                'error_count': sum(diagnostic.severity == 'error' for diagnostic in diagnostics),
+                'warning_count': sum(diagnostic.severity == 'warning' for diagnostic in diagnostics),
+                'failure': None, 'systems': systems}
+        return cls(lint.xml_file,
+                   is_c4=is_c4,
+                   c4_object_count=lint.c4_object_count,
+                   non_c4_object_count=lint.non_c4_object_count,
+                   report=report,
+                   systems=systems,
+                   connections=connections,
+                   profile=lint.profile,
+                   diagnostics=diagnostics,
+                   stats=lint.stats.to_dict() if lint.stats is not None else None,
+                   pages=[page])
+
+    @classmethod
+    def from_pages(cls, file_path, page_results, render_report=True):
+        """One result for a multi-page file from the results of its pages, in page order.
+
+        Diagnostics are attributed to their page and the cross-page checks
+        run on the pages' Software Systems. The file only counts as failed
+        when none of its pages could be linted.
+        """
+        result = cls(file_path, profile=page_results[0].profile)
+        reports = []
+        stats = None
+        for page_result in page_results:
+            page = page_result.pages[0]
+            result.pages.append(page)
+            if page_result.failure is not None:
+                result.diagnostics.append(Diagnostic('C4000', 'error', 'Other', None,
+                                                     (file_path, page['failure']), page['id']))
+                reports.append(f"Failed to lint page {page['name']} (id {page['id']}) of {file_path}: "
+                               f"{page['failure']}\n")
+                continue
+            result.is_c4 = result.is_c4 or page_result.is_c4
+            result.c4_object_count += page_result.c4_object_count
+            result.non_c4_object_count += page_result.non_c4_object_count
+            result.connections.extend(page_result.connections)
+            result.diagnostics.extend(diagnostic.on_page(page['id']) for diagnostic in page_result.diagnostics)
+            if page_result.is_c4 and page_result.report:
+                reports.append(page_result.report)
+            if page_result.stats is not None:
+                stats = stats or LintStats()
+                stats.merge(LintStats.from_dict(page_result.stats))
+        if all(page['failure'] is not None for page in result.pages):
+            result.failure = '; '.join(page_result.failure for page_result in page_results)
+            result.diagnostics = []
+            return result
+        result.systems = merge_page_systems(page['systems'] for page in result.pages)
+        cross_page = cross_page_diagnostics((page, page['systems']) for page in result.pages)
+        if cross_page:
+            result.diagnostics.extend(cross_page)
+            reports.append(f"{60 * '#'}\nC4 Linter Input: {file_path}\nCross-page checks\n"
+                           + ''.join(f"  {diagnostic.message}\n" for diagnostic in cross_page))
+        result.report = '\n'.join(reports) if render_report else ''
+        result.stats = stats.to_dict() if stats is not None else None
+        return result
+
+    def to_dict(self):
+        data = dict(vars(self))
+        data['diagnostics'] = [diagnostic.to_json() for diagnostic in self.diagnostics]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data['connections'] = [tuple(connection) for connection in data.get('connections', [])]
+        data['diagnostics'] = [Diagnostic.from_json(diagnostic) for diagnostic in data.get('diagnostics', [])]
+        return cls(**data)
+
+    def system_names(self):
+        """Distinct Software System names over every page, also those a later page renamed."""
+        return distinct_system_names([self.systems] + [page['systems'] for page in self.pages])
+
+    @property
+    def errors(self):
+        return messages_by_category(self.diagnostics, 'error')
+
+    @property
+    def warnings(self):
+        return messages_by_category(self.diagnostics, 'warning')
+
+    @property
+    def error_count(self):
+        return sum(diagnostic.severity == 'error' for diagnostic in self.diagnostics)
+
+    @property
+    def warning_count(self):
+        return sum(diagnostic.severity == 'warning' for diagnostic in self.diagnostics)
+
+
+def find_drawio_files(directory):
+    # sorted so that serial and parallel runs report files in the same order
+    drawio_files = []
     for root, dirs, files in os.walk(directory):
-        for file in files:
+        dirs.sort()
+        for file in sorted(files):
             if file.endswith('.drawio'):
-                file_path = os.path.join(root, file)
-                try:
-                    lint = C4Lint(file_path)
-                    if lint.is_c4():
-                        print(lint)
-                except Exception as e:
-                    print(f"Failed to initialize C4Lint for {file_path}: {e}")
+                drawio_files.append(os.path.join(root, file))
+    return drawio_files
+
+
+def lint_file(file_path, page=None, prescreen=False, render_report=True, **lint_kwargs):
+    """LintResult of every page of file_path combined, or of a single page given its index, id or name.
+
+    With prescreen=True a whole file that may_contain_c4 rules out is not
+    parsed at all and gets an empty non-C4 result. render_report=False skips
+    the text report for output that does not print it.
+    """
+    if prescreen and page is None and lint_kwargs.get('content') is None and not may_contain_c4(file_path):
+        return LintResult(file_path, profile=lint_kwargs.get('profile', DEFAULT_PROFILE))
+    if page is not None:
+        return _lint_page(file_path, page, lint_kwargs, render_report)
+    content = lint_kwargs.pop('content', None)
+    start = perf_counter()
+    try:
+        pages = read_pages(file_path if content is None else io.BytesIO(content))
+    except Exception as e:
+        return LintResult(file_path, failure=MESSAGES['C4000'].format(file_path, e),
+                          profile=lint_kwargs.get('profile', DEFAULT_PROFILE))
+    read_seconds = perf_counter() - start
+    if len(pages) == 1:
+        result = _lint_page(file_path, pages[0], lint_kwargs, render_report)
+    else:
+        result = LintResult.from_pages(file_path, [_lint_page(file_path, diagram_page, lint_kwargs, render_report)
+                                                  for diagram_page in pages], render_report)
+    if result.stats is not None:
+        # the pages were read here, outside of the lints
+        stats = LintStats.from_dict(result.stats)
+        stats.add_time('parse', read_seconds)
+        stats.add_time('lint', read_seconds)
+        result.stats = stats.to_dict()
+    return result
+
+
+def _lint_page(file_path, page, lint_kwargs, render_report=True):
+    try:
+        lint = C4Lint(file_path, page=page, **lint_kwargs)
+    except Exception as e:
+        record = {'index': page, 'id': None, 'name': None, 'is_c4': False, 'error_count': 0, 'warning_count': 0,
+                  'failure': str(e.__cause__ or e), 'systems': {}}
+        if hasattr(page, 'element'):
+            record.update(index=page.index, id=page.id, name=page.name)
+        elif isinstance(page, str):
+            record['index'] = None
+        return LintResult(file_path, failure=str(e), profile=lint_kwargs.get('profile', DEFAULT_PROFILE),
+                          pages=[record])
+    return LintResult.from_lint(lint, render_report)
+
+
+def lint_unit(unit, **lint_kwargs):
+    """lint_file for a (file path, page) work unit, page None for the whole file or a page of iter_page_xml."""
+    file_path, page = unit
+    if page is not None:
+        page = page_from_xml(*page)
+    return lint_file(file_path, page=page, **lint_kwargs)
+
+
+def iter_lint_results(file_paths, workers=1, chunksize=None, cache=None, **lint_kwargs):
+    """Yield a LintResult per file, in the order of file_paths.
+
+    workers=1 lints in-process, workers=None uses one process per core.
+    Files found in the optional LintCache are not sent to the workers; the
+    cache must have been opened for lint_kwargs, see LintCache.bind.
+    """
+    file_paths = list(file_paths)
+    if cache is None:
+        yield from _lint_files(file_paths, workers, chunksize, **lint_kwargs)
+        return
+
+    cache.bind(**lint_kwargs)
+    cached = {file_path for file_path in file_paths if file_path in cache}
+    fresh = _lint_files([p for p in file_paths if p not in cached], workers, chunksize, **lint_kwargs)
+    for file_path in file_paths:
+        # cached results are loaded one at a time, as they are yielded
+        data = cache.get(file_path) if file_path in cached else None
+        if data is not None:
+            yield LintResult.from_dict(data)
+            continue
+        # an entry that went away since the check is linted here
+        result = next(fresh) if file_path not in cached else lint_file(file_path, **lint_kwargs)
+        if result.failure is None:
+            cache.put(file_path, result.to_dict())
+        yield result
+
+
+def _lint_files(file_paths, workers, chunksize, **lint_kwargs):
+    if workers == 1:
+        # one read per file, its pages are linted one after the other
+        for file_path in file_paths:
+            yield lint_file(file_path, **lint_kwargs)
+        return
+
+    # every page of a multi-page file is a unit of its own, so that its pages are linted in parallel;
+    # units are made as the pool takes them, and a page unit carries the XML of its page alone
+    prescreen = lint_kwargs.get('prescreen', False)
+    # (file path, whole file) of the units handed out, in order, until their results come back
+    keys = deque()
+
+    def units():
+        for file_path in file_paths:
+            for page in _page_units(file_path, prescreen):
+                keys.append((file_path, page is None))
+                yield file_path, page
+
+    known_applications = lint_kwargs.get('known_applications')
+    initializer, initargs = None, ()
+    if isinstance(known_applications, str):
+        # loaded here so forked workers share it copy-on-write; spawned workers load it once each
+        get_known_applications(known_applications)
+        initializer, initargs = get_known_applications, (known_applications,)
+    results = map_in_pool(partial(lint_unit, **lint_kwargs), units(), workers, chunksize,
+                          initializer=initializer, initargs=initargs)
+    for (file_path, whole), group in groupby(results, key=lambda result: keys.popleft()):
+        if whole:
+            yield from group
+        else:
+            yield LintResult.from_pages(file_path, list(group), lint_kwargs.get('render_report', True))
+
+
+def _page_units(file_path, prescreen=False):
+    try:
+        multi_page = count_pages(file_path) > 1 and (not prescreen or may_contain_c4(file_path))
+    except OSError:
+        multi_page = False
+    if multi_page:
+        try:
+            return list(iter_page_xml(file_path))
+        except Exception:
+            pass
+    # unreadable, single page and screened out files are linted whole, lint_file reports or skips them
+    return [None]
+
+
+def _map_chunk(worker, chunk):
+    return [worker(item) for item in chunk]
+
+
+def map_in_pool(worker, items, workers=1, chunksize=None, initializer=None, initargs=()):
+    """Yield worker(item) for every item in order, on a process pool unless workers == 1.
+
+    workers=None uses one process per core; results are yielded as soon as
+    they are available, so callers can consume them incrementally. items
+    may be a generator: it is only consumed as far as the few chunks per
+    worker that are in flight at a time.
+    """
+    count = len(items) if hasattr(items, '__len__') else None
+    items = iter(items)
+    head = list(islice(items, 2))
+    if workers == 1 or len(head) <= 1:
+        for item in chain(head, items):
+            yield worker(item)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        # a few chunks per worker keeps the pool busy without paying IPC per file
+        chunksize = max(1, count // (workers * 4)) if count is not None else LAZY_CHUNKSIZE
+    items = chain(head, items)
+    chunks = iter(lambda: list(islice(items, chunksize)), [])
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(_map_chunk, worker, chunk))
+            if len(in_flight) >= IN_FLIGHT_CHUNKS * workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def lint_drawio_files(directory, workers=1, chunksize=None, cache=None, output_format='text', stream=None,
+                      keep_results=True, code_counts=None, batch_stats=None, **lint_kwargs):
+    """Lint every .drawio file below directory and write each result as soon as it is available.
+
+    output_format is one of report_writers.WRITERS ('text', 'jsonl', 'sarif').
+    Pass keep_results=False to stream without collecting the results, and a
+    Counter as code_counts to tally diagnostic codes across the whole corpus.
+    A profiling.BatchStats as batch_stats sums the per-file stats, which the
+    lints only collect when collect_stats=True is passed as well.
+    """
+    from drawio_c4_lint.report_writers import WRITERS
+    writer = WRITERS[output_format](stream or sys.stdout)
+    results = []
+    try:
+        lint_kwargs.setdefault('render_report', output_format == 'text')
+        for result in iter_lint_results(find_drawio_files(directory), workers=workers, chunksize=chunksize,
+                                        cache=cache, **lint_kwargs):
+            writer.write(result)
+            if code_counts is not None:
+                count_codes(result.diagnostics, code_counts)
+                if result.failure is not None:
+                    code_counts['C4000'] += 1
+            if batch_stats is not None:
+                batch_stats.add(result)
+            if keep_results:
+                results.append(result)
+    finally:
+        writer.close()
+    return results
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Lint all C4 draw.io diagrams below a directory.")
+    parser.add_argument('directory', help="top level directory to search for .drawio files")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="number of worker processes, 0 for one per core (default: 1)")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="files handed to a worker at a time (default: derived from the file count)")
+    parser.add_argument('--known-applications', default=None,
+                        help="CSV of known business applications to check Software System names against")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="'fast' runs only the cheap structural rules, 'full' runs everything (default: full)")
+    parser.add_argument('--rules', default=None,
+                        help="comma separated rules to run (default: all registered rules)")
+    parser.add_argument('--disable', default='',
+                        help="comma separated rules to skip")
+    parser.add_argument('--cache-dir', default=None,
+                        help="reuse results of unchanged files from this directory")
+    parser.add_argument('--format', choices=('text', 'jsonl', 'sarif'), default='text',
+                        help="output format (default: text)")
+    parser.add_argument('-o', '--output', default=None, help="write to this file instead of stdout")
+    parser.add_argument('--top-codes', type=int, default=0, metavar='N',
+                        help="print the N most frequent diagnostic codes across all files to stderr")
+    parser.add_argument('--stats', action='store_true',
+                        help="time every phase and rule and print totals and the slowest files to stderr")
+    parser.add_argument('--no-prescreen', action='store_true',
+                        help="parse every file, also those without any C4 attribute in them (which are "
+                             "otherwise skipped unparsed, so their XML errors are not reported)")
+    args = parser.parse_args(argv)
+    configure_logging()
+    lint_kwargs = {'profile': args.profile, 'prescreen': not args.no_prescreen}
+    if args.known_applications:
+        lint_kwargs['known_applications'] = args.known_applications
+    if args.rules:
+        lint_kwargs['rules'] = args.rules.split(',')
+    if args.disable:
+        lint_kwargs['disabled_rules'] = tuple(args.disable.split(','))
+    try:
+        check_rule_names(lint_kwargs.get('rules', ()))
+        check_rule_names(lint_kwargs.get('disabled_rules', ()))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.stats:
+        lint_kwargs['collect_stats'] = True
+    code_counts = Counter() if args.top_codes else None
+    batch_stats = BatchStats() if args.stats else None
+    stream = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        if args.cache_dir:
+            from drawio_c4_lint.lint_cache import LintCache
+            # the fingerprint is taken from the options lint_drawio_files lints with
+            with LintCache(args.cache_dir) as cache:
+                lint_drawio_files(args.directory, workers=args.workers or None, chunksize=args.chunksize, cache=cache,
+                                  output_format=args.format, stream=stream, keep_results=False,
+                                  code_counts=code_counts, batch_stats=batch_stats, **lint_kwargs)
+        else:
+            lint_drawio_files(args.directory, workers=args.workers or None, chunksize=args.chunksize,
+                              output_format=args.format, stream=stream, keep_results=False,
+                              code_counts=code_counts, batch_stats=batch_stats, **lint_kwargs)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    if code_counts is not None:
+        for code, count in code_counts.most_common(args.top_codes):
+            print(f"{count:8d}  {code}  {DIAGNOSTIC_CODES[code]}", file=sys.stderr)
+    if batch_stats is not None:
+        print(batch_stats.format_summary(), file=sys.stderr)
+
 
 if __name__ == "__main__":
-    directory_path = 'C:\\Solutions\\Python\\drawio_c4_lint\\c4_github_examples'  # Update this path to your specific top level directory
-    lint_drawio_files(directory_path)
+    main()
@@ -0,0 +1,134 @@
+import sys
+from drawio_c4_lint.diagram_model import DiagramModel, read_pages
+
+
+def _intern(value):
+    return sys.intern(value) if value is not None else None
+
+
+class C4Element:
+    """Immutable C4 element or relationship extracted from a diagram.
+
+    Strings are interned, so the types, technologies and names that repeat
+    across thousands of diagrams are stored once. Plain mxGraph edges without
+    a C4 wrapper are kept too, with ``c4_type`` None, because they still
+    connect elements.
+    """
+    __slots__ = ('id', 'c4_type', 'name', 'description', 'technology', 'source', 'target', 'parent')
+
+    def __init__(self, id, c4_type, name=None, description=None, technology=None, source=None, target=None,
+                 parent=None):
+        for slot, value in zip(self.__slots__, (id, c4_type, name, description, technology, source, target, parent)):
+            object.__setattr__(self, slot, _intern(value))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return C4Element, self.fields()
+
+    def fields(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __eq__(self, other):
+        return isinstance(other, C4Element) and self.fields() == other.fields()
+
+    def __hash__(self):
+        return hash(self.fields())
+
+    def __repr__(self):
+        return f"C4Element({self.id!r}, {self.c4_type!r}, {self.name!r})"
+
+    @property
+    def is_edge(self):
+        return self.source is not None or self.target is not None
+
+
+class C4Model:
+    """Compact, tree-free model of one page of a diagram; from_pages models every page of a file.
+
+    Holds only what corpus-wide analysis needs, so thousands of diagrams can
+    be kept in memory (or sent between processes) without their DOM.
+    """
+    __slots__ = ('file_path', 'is_c4', 'elements', 'page_id', 'page_name', '_by_id')
+
+    def __init__(self, file_path, is_c4, elements, page_id=None, page_name=None):
+        object.__setattr__(self, 'file_path', file_path)
+        object.__setattr__(self, 'is_c4', is_c4)
+        object.__setattr__(self, 'elements', tuple(elements))
+        object.__setattr__(self, 'page_id', page_id)
+        object.__setattr__(self, 'page_name', page_name)
+        object.__setattr__(self, '_by_id', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return C4Model, (self.file_path, self.is_c4, self.elements, self.page_id, self.page_name)
+
+    def __len__(self):
+        return len(self.elements)
+
+    @classmethod
+    def from_diagram_model(cls, model, file_path=None):
+        elements = []
+        for elem, cell in model.cells:
+            c4_type = elem.get('c4Type') if elem.tag == 'object' else None
+            source = target = parent = None
+            if cell is not None:
+                source = cell.get('source')
+                target = cell.get('target')
+                parent = cell.get('parent')
+            if c4_type is None and source is None and target is None:
+                continue
+            elements.append(C4Element(elem.get('id'), c4_type.strip() if c4_type is not None else None,
+                                      elem.get('c4Name'), elem.get('c4Description'), elem.get('c4Technology'),
+                                      source, target, parent))
+        page = model.page
+        return cls(file_path, model.has_c4_objects(), elements,
+                   page.id if page is not None else None, page.name if page is not None else None)
+
+    @classmethod
+    def from_file(cls, xml_file, page=0):
+        """Model of one page of xml_file, by index or by page id or name."""
+        return cls.from_diagram_model(DiagramModel.from_file(xml_file, page=page), xml_file)
+
+    @classmethod
+    def from_pages(cls, xml_file):
+        """Models of every page of xml_file, in page order."""
+        return [cls.from_diagram_model(page.model(), xml_file) for page in read_pages(xml_file)]
+
+    def element(self, element_id):
+        if self._by_id is None:
+            object.__setattr__(self, '_by_id', {element.id: element for element in self.elements})
+        return self._by_id.get(element_id)
+
+    def of_type(self, c4_type):
+        return [element for element in self.elements if element.c4_type == c4_type]
+
+    def edges(self):
+        return [element for element in self.elements if element.is_edge]
+
+    def systems_and_connections(self):
+        """Software System names by id and the (source name, target name) pairs connecting them."""
+        systems = {element.id: element.name for element in self.of_type('Software System')}
+        connections = [(systems[element.source], systems[element.target]) for element in self.edges()
+                       if element.source in systems and element.target in systems]
+        return systems, connections
+
+
+def extract_c4_model(file_path):
+    """Picklable (file_path, C4Models of every page, failure) for one diagram, no models on failure."""
+    try:
+        return file_path, C4Model.from_pages(file_path), None
+    except Exception as e:
+        return file_path, [], str(e)
+
+
+def load_c4_models(file_paths, workers=1, chunksize=None):
+    """Yield extract_c4_model for every file in order, see map_in_pool for workers and chunksize."""
+    from drawio_c4_lint.c4_lint_on_directory import map_in_pool
+    yield from map_in_pool(extract_c4_model, file_paths, workers, chunksize)
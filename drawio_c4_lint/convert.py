@@ -0,0 +1,167 @@
+"""Convert draw.io files between compressed and plain XML pages.
+
+    python -m drawio_c4_lint.convert --to plain diagrams/
+    python -m drawio_c4_lint.convert --to compressed -j 0 "C4 L1 Shop.drawio" "C4 L2 Shop.drawio"
+
+Every page of a file is converted and all mxfile and diagram attributes are
+kept, as are the XML declaration, top-level comments and the layout of pages
+that are already in the target format. Files already in the target format
+are recognised from their raw bytes and left untouched, converted files are
+replaced atomically.
+"""
+import logging
+import mmap
+import os
+import re
+import sys
+import zlib
+from functools import partial
+from drawio_c4_lint.c4_lint import configure_logging
+from drawio_c4_lint.c4_lint_on_directory import find_drawio_files, map_in_pool
+from drawio_c4_lint.drawio import drawio_serialization
+from drawio_c4_lint.file_utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('plain', 'compressed')
+STRATEGIES = {
+    'default': zlib.Z_DEFAULT_STRATEGY,
+    'filtered': zlib.Z_FILTERED,
+    'huffman': zlib.Z_HUFFMAN_ONLY,
+    'rle': zlib.Z_RLE,
+    'fixed': zlib.Z_FIXED,
+}
+# a page start tag and what follows it: '</' for an empty page, '<' for plain XML, anything else is compressed
+PAGE_CONTENT = re.compile(rb'<diagram\b([^>]*)>\s*(</|<|[^<\s])?')
+
+
+def page_formats(data):
+    """'plain' or 'compressed' for every non-empty page in the raw bytes of a file, without parsing it."""
+    formats = []
+    for match in PAGE_CONTENT.finditer(data):
+        attributes, content = match.groups()
+        if attributes.endswith(b'/') or content is None or content == b'</':
+            continue
+        formats.append('plain' if content == b'<' else 'compressed')
+    return formats
+
+
+def needs_conversion(data, target):
+    return any(page_format != target for page_format in page_formats(data))
+
+
+def _inflate_page(diagram, max_decoded_size=None):
+    import lxml.etree as etree
+    parser = etree.XMLPullParser(events=())
+    for chunk in drawio_serialization.iter_decoded_chunks(diagram.text, max_decoded_size):
+        parser.feed(chunk)
+    graph = parser.close()
+    diagram.text = None
+    diagram.append(graph)
+    # only the inflated page is laid out, the rest of the file keeps its whitespace
+    etree.indent(diagram, space='  ', level=sum(1 for _ in diagram.iterancestors()))
+
+
+def _deflate_page(diagram, graph, level, strategy):
+    import lxml.etree as etree
+    xml = etree.tostring(graph, encoding='unicode', with_tail=False)
+    data = drawio_serialization.encode_diagram_data(xml, level, strategy)
+    diagram.remove(graph)
+    diagram.text = data.decode('ascii')
+
+
+def convert_tree(root, target, level=zlib.Z_DEFAULT_COMPRESSION, strategy=zlib.Z_DEFAULT_STRATEGY,
+                 max_decoded_size=None):
+    """Convert every page of a parsed mxfile in place, returns the number of pages changed."""
+    changed = 0
+    for diagram in root.iter('diagram'):
+        graph = diagram.find('mxGraphModel')
+        if target == 'plain' and graph is None and diagram.text and not diagram.text.isspace():
+            _inflate_page(diagram, max_decoded_size)
+            changed += 1
+        elif target == 'compressed' and graph is not None:
+            _deflate_page(diagram, graph, level, strategy)
+            changed += 1
+    if changed and root.get('compressed') is not None:
+        # draw.io writes the format of the file here when it knows it
+        root.set('compressed', 'true' if target == 'compressed' else 'false')
+    return changed
+
+
+def _screen(path, target):
+    """(needs conversion, has an XML declaration) from the raw bytes of path, mapped rather than read."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return False, False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return needs_conversion(data, target), data[:64].lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'<?xml')
+
+
+def convert_file(path, target, level=zlib.Z_DEFAULT_COMPRESSION, strategy=zlib.Z_DEFAULT_STRATEGY,
+                 max_decoded_size=None, dry_run=False):
+    """Convert the pages of the file at path to target, returns 'converted' or 'skipped'."""
+    import lxml.etree as etree
+    if target not in FORMATS:
+        raise ValueError(f"Unknown format: {target}")
+    convert, declaration = _screen(path, target)
+    if not convert:
+        return 'skipped'
+    # libxml2's default size limits stay on, compressed pages are bounded by max_decoded_size
+    tree = etree.parse(path)
+    if not convert_tree(tree.getroot(), target, level, strategy, max_decoded_size):
+        return 'skipped'
+    if not dry_run:
+        write_atomic(path, etree.tostring(tree, encoding='UTF-8', xml_declaration=declaration) + b'\n')
+    return 'converted'
+
+
+def convert_unit(path, target, **options):
+    """(path, status, error) of convert_file, with status 'failed' instead of an exception."""
+    try:
+        return path, convert_file(path, target, **options), None
+    except Exception as e:
+        return path, 'failed', str(e)
+
+
+def convert_files(paths, target, workers=1, chunksize=None, **options):
+    """Yield (path, status, error) for every .drawio file in paths, which may also name directories."""
+    files = []
+    for path in paths:
+        files.extend(find_drawio_files(path) if os.path.isdir(path) else [path])
+    yield from map_in_pool(partial(convert_unit, target=target, **options), files, workers, chunksize)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', help=".drawio files and directories to search for them")
+    parser.add_argument('--to', choices=FORMATS, required=True, dest='target', help="format to write")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="worker processes, 0 for one per core (default: 1)")
+    parser.add_argument('--level', type=int, default=zlib.Z_DEFAULT_COMPRESSION,
+                        help="deflate level 0-9 for compressed pages (default: zlib's)")
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='default',
+                        help="deflate strategy for compressed pages")
+    parser.add_argument('--max-decoded-size', type=int, default=None,
+                        help="refuse compressed pages that inflate to more bytes than this")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="only list the files that would be converted, exit 1 if there are any")
+    args = parser.parse_args(argv)
+    configure_logging()
+    counts = {'converted': 0, 'skipped': 0, 'failed': 0}
+    for path, status, error in convert_files(args.paths, args.target, workers=args.workers or None,
+                                             level=args.level, strategy=STRATEGIES[args.strategy],
+                                             max_decoded_size=args.max_decoded_size, dry_run=args.dry_run):
+        counts[status] += 1
+        if status == 'failed':
+            logger.error(f"Could not convert {path}: {error}")
+        elif status == 'converted':
+            print(path)
+    verb = 'to convert' if args.dry_run else 'converted'
+    print(f"{counts['converted']} {verb}, {counts['skipped']} already {args.target}, {counts['failed']} failed",
+          file=sys.stderr)
+    return 1 if counts['failed'] or (args.dry_run and counts['converted']) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
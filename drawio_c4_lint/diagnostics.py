@@ -0,0 +1,125 @@
+from collections import Counter
+
+# diagnostic code -> short description, the codes are stable identifiers for machine readable output
+DIAGNOSTIC_CODES = {
+    'C4000': "Diagram could not be parsed",
+    'C4001': "Required C4 property missing",
+    'C4002': "Non-C4 element",
+    'C4003': "No elements of type object",
+    'C4004': "Software System not in known applications",
+    'C4005': "Software System name differs from known applications",
+    'C4006': "Relationship with one leg disconnected",
+    'C4007': "Software System not connected by any relationship",
+    'C4008': "Relationship endpoint does not exist",
+    'C4009': "Relationship connects an element to itself",
+    'C4010': "Relationship attached to a non-C4 shape",
+    'C4011': "Relationship attached to a child of an element",
+    'C4012': "Filename does not match 'C4 L<x> <system name>.drawio'",
+    'C4013': "Software System id named differently on two pages",
+}
+
+# diagnostic code -> str.format template, filled with Diagnostic.args when the message is rendered
+MESSAGES = {
+    'C4000': "Error parsing XML file: {0}, {1}",
+    'C4001': "ERROR: '{0}' property missing ---  {1}{2}",
+    'C4002': "ERROR: Non-C4 element found. Label: {0}",
+    'C4003': "ERROR: No elements of type Object found.",
+    'C4004': "ERROR: '{0}' not found in known strings",
+    'C4005': "WARN: '{0}' not found in known strings. Suggestions {1}",
+    'C4006': "ERROR: {0} -- one leg disconnected",
+    'C4007': "ERROR: Software System (c4Name: {0}, c4Type: {1}, id {2}) is not connected by any relationship.",
+    'C4008': "ERROR: Relationship '{0}' (id {1}) {2} '{3}' does not exist in the diagram.",
+    'C4009': "ERROR: Relationship '{0}' (id {1}) connects '{2}' to itself.",
+    'C4010': "ERROR: Relationship '{0}' (id {1}) {2} is attached to a non-C4 shape (id {3}).",
+    'C4011': "WARN: Relationship '{0}' (id {1}) {2} is attached to a child (id {3}) of '{4}' "
+             "rather than to the element itself.",
+    'C4012': "ERROR: Filename '{0}' does not match expected format 'C4 L<x> <system name>.drawio'",
+    'C4013': "ERROR: Software System id {0} is named '{1}' on page '{2}' but '{3}' on page '{4}'.",
+}
+
+
+class ReadableProperties:
+    """An element's attributes, joined into 'name: value' text only when formatted."""
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = tuple(items)
+
+    def __str__(self):
+        props = {k: v.replace('\n', ' ') for k, v in self.items if v.strip() and k not in {'label', 'placeholders', 'id'}}
+        readable_props = ', '.join(f"{k}: {v}" for k, v in props.items())
+        return readable_props or "No additional properties"
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+
+class Diagnostic:
+    """One finding: the rule's code, severity, category, element id and message arguments.
+
+    The message text is only rendered from MESSAGES when ``message`` is read.
+    ``page`` is the id of the page of a multi-page file the finding is on.
+    """
+    __slots__ = ('code', 'severity', 'category', 'element_id', 'args', 'page')
+
+    def __init__(self, code, severity, category, element_id=None, args=(), page=None):
+        self.code = code
+        self.severity = severity
+        self.category = category
+        self.element_id = element_id
+        self.args = args
+        self.page = page
+
+    @property
+    def message(self):
+        return MESSAGES[self.code].format(*self.args)
+
+    def __repr__(self):
+        return f"Diagnostic({self.code!r}, {self.severity!r}, {self.category!r}, {self.element_id!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Diagnostic) and self.to_json() == other.to_json()
+
+    def __reduce__(self):
+        # lazy arguments are rendered when the diagnostic leaves the process
+        return Diagnostic.from_json, (self.to_json(),)
+
+    def on_page(self, page):
+        """A copy of the diagnostic attributed to the page with id page."""
+        return Diagnostic(self.code, self.severity, self.category, self.element_id, self.args, page)
+
+    def to_dict(self):
+        data = {'code': self.code, 'severity': self.severity, 'category': self.category,
+                'element_id': self.element_id, 'message': self.message}
+        if self.page is not None:
+            data['page'] = self.page
+        return data
+
+    def to_json(self):
+        """JSON-able list that from_json turns back into an equal diagnostic."""
+        data = [self.code, self.severity, self.category, self.element_id,
+                [str(arg) if isinstance(arg, ReadableProperties) else arg for arg in self.args]]
+        if self.page is not None:
+            data.append(self.page)
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        code, severity, category, element_id, args, *page = data
+        return cls(code, severity, category, element_id, tuple(args), *page)
+
+
+def messages_by_category(diagnostics, severity):
+    """{category: [message, ...]} for the diagnostics of one severity, rendered in report order."""
+    messages = {'Systems': [], 'Actors': [], 'Relationships': [], 'Other': []}
+    for diagnostic in diagnostics:
+        if diagnostic.severity == severity:
+            messages[diagnostic.category].append(diagnostic.message)
+    return messages
+
+
+def count_codes(diagnostics, counter=None):
+    """Add the diagnostics to a Counter of codes; no message is rendered."""
+    counter = Counter() if counter is None else counter
+    counter.update(diagnostic.code for diagnostic in diagnostics)
+    return counter
@@ -0,0 +1,277 @@
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+C4_ATTRIBUTES = {'c4Name', 'c4Description', 'c4Type', 'c4Technology'}
+PAGE_START_TAG = re.compile(rb'<diagram[\s>/]')
+# any of C4_ATTRIBUTES, in plain XML and in the percent-encoded XML of a compressed page alike
+C4_MARKER = re.compile(rb'c4(?:Type|Name|Description|Technology)')
+C4_MARKER_OVERLAP = len('c4Description') - 1
+# the text of a page that does not start with an element, i.e. a compressed page
+COMPRESSED_PAGE_TEXT = re.compile(rb'<diagram\b(?:[^>]*[^/>])?>\s*([^<\s][^<]*)')
+
+
+class DiagramPage:
+    """One ``<diagram>`` of a file; a compressed page stays encoded until it is modelled."""
+    __slots__ = ('index', 'id', 'name', 'element')
+
+    def __init__(self, index, id, name, element):
+        self.index = index
+        self.id = id
+        self.name = name
+        self.element = element
+
+    def __repr__(self):
+        return f"DiagramPage({self.index!r}, {self.id!r}, {self.name!r})"
+
+    def matches(self, page):
+        """True for the page's index or, given a string, its id or name."""
+        if isinstance(page, str):
+            return page == self.id or page == self.name
+        return page == self.index
+
+    def model(self, stats=None, max_decoded_size=None):
+        return DiagramModel.from_page(self, stats, max_decoded_size)
+
+    def __reduce__(self):
+        # pickled as the XML of the page alone, so a worker process does not read the file again
+        import lxml.etree as etree
+        return page_from_xml, (self.index, self.id, self.name, etree.tostring(self.element, with_tail=False))
+
+
+def page_from_xml(index, id, name, xml):
+    """The DiagramPage of a page's XML bytes, see iter_page_xml."""
+    import lxml.etree as etree
+    return DiagramPage(index, id, name, etree.fromstring(xml))
+
+
+def iter_pages(xml_file):
+    """DiagramPage for every page of xml_file in file order, read one at a time."""
+    import lxml.etree as etree
+    for index, (_, elem) in enumerate(etree.iterparse(xml_file, events=('end',), tag='diagram')):
+        yield DiagramPage(index, elem.get('id'), elem.get('name'), elem)
+
+
+def iter_page_xml(xml_file):
+    """(index, id, name, XML bytes) for every page of xml_file in file order, for page_from_xml.
+
+    Each page's tree is freed once it is serialised, so only the bytes of
+    the pages still in use are held, which also pickle as they are.
+    """
+    import lxml.etree as etree
+    for index, (_, elem) in enumerate(etree.iterparse(xml_file, events=('end',), tag='diagram')):
+        page = (index, elem.get('id'), elem.get('name'), etree.tostring(elem, with_tail=False))
+        elem.clear()
+        yield page
+
+
+def read_pages(xml_file):
+    pages = list(iter_pages(xml_file))
+    if not pages:
+        raise ValueError("No diagram element found")
+    return pages
+
+
+def merge_page_systems(page_systems):
+    """One {system id: name} for the {system id: name} of every page of a file, in page order.
+
+    A Software System keeps the name of the first page it is on; see
+    distinct_system_names for the names it has on every page.
+    """
+    merged = {}
+    for systems in page_systems:
+        for system_id, name in systems.items():
+            merged.setdefault(system_id, name)
+    return merged
+
+
+def distinct_system_names(page_systems):
+    """Every Software System name in the {system id: name} of the pages, once each and in page order."""
+    return list(dict.fromkeys(name for systems in page_systems for name in systems.values()))
+
+
+def count_pages(file_path):
+    """Number of pages of a file, counted on the raw bytes without parsing it."""
+    count = 0
+    tail = b''
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            data = tail + block
+            count += len(PAGE_START_TAG.findall(data))
+            # shorter than a match, so a tag is never counted twice but can span blocks
+            tail = data[-8:]
+    return count
+
+
+def may_contain_c4(file_path, max_decoded_size=None):
+    """False when no page of the file can hold a C4 object, decided without parsing it.
+
+    The file is searched through mmap for a C4 attribute name; compressed
+    pages are inflated chunk by chunk only until the first one turns up. A
+    file that cannot be read, or a page that cannot be inflated, counts as a
+    candidate so that the lint reports it.
+    """
+    import mmap
+    try:
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if C4_MARKER.search(data):
+                    return True
+                return any(_inflates_to_c4(match.group(1), max_decoded_size)
+                           for match in COMPRESSED_PAGE_TEXT.finditer(data))
+    except (OSError, ValueError):
+        return True
+
+
+def _inflates_to_c4(data, max_decoded_size=None):
+    from drawio_c4_lint.drawio import drawio_serialization
+    tail = b''
+    try:
+        for chunk in drawio_serialization.iter_inflated_chunks(data, max_decoded_size):
+            if C4_MARKER.search(tail + chunk):
+                return True
+            tail = chunk[-C4_MARKER_OVERLAP:]
+    except Exception:
+        return True
+    return False
+
+
+class DiagramModel:
+    """Indexed view of one page of a draw.io diagram.
+
+    Every ``object`` and ``mxCell`` of the page is indexed once, so the lint
+    checks can look things up instead of walking the tree again.
+    """
+
+    def __init__(self):
+        self.root = None
+        # the DiagramPage the model was built from
+        self.page = None
+        self._reset()
+
+    def _reset(self):
+        # (element, mxCell) for every object and top level mxCell in document order;
+        # element is the <object> wrapper or the mxCell itself, mxCell is None for an empty object
+        self.cells = []
+        # objects in document order, and the same objects keyed by id
+        self.objects = []
+        self.objects_by_id = {}
+        # graph cells keyed by id; for <object> wrappers this is the inner mxCell
+        self.cells_by_id = {}
+        # (owner element, source id, target id) for every cell with at least one leg
+        self.edges = []
+        # cell id -> mxGraph parent id
+        self.parent_map = {}
+        # stripped c4Type -> objects, objects without a c4Type attribute live under None
+        self.by_type = {}
+
+    @classmethod
+    def from_file(cls, xml_file, stats=None, max_decoded_size=None, page=0):
+        """Parse one page of xml_file, by index or by page id or name.
+
+        Pages before it are read but not inflated. A LintStats passed as stats
+        collects inflate time and bytes. Compressed pages are inflated and
+        parsed in a stream and rejected with DiagramTooLargeError once they
+        pass max_decoded_size bytes (drawio_serialization.MAX_DECODED_SIZE by
+        default).
+        """
+        for diagram_page in iter_pages(xml_file):
+            if diagram_page.matches(page):
+                return cls.from_page(diagram_page, stats, max_decoded_size)
+        if page == 0:
+            raise ValueError("No diagram element found")
+        raise ValueError(f"No page {page!r} found")
+
+    @classmethod
+    def from_page(cls, page, stats=None, max_decoded_size=None):
+        """Index a DiagramPage, inflating it first when it is compressed."""
+        model = cls()
+        model.page = page
+        graph = page.element.find('mxGraphModel')
+        if graph is not None:
+            model.root = graph
+            for elem in graph.iter('object', 'mxCell'):
+                model._add_cell(elem)
+        else:
+            # sometimes the "plain xml" files create with drawio desktop will still have the text
+            # attribute in them with '\n ' as content, _add_compressed checks for that as well
+            model._add_compressed(page.element, stats, max_decoded_size)
+        return model
+
+    def reindex(self):
+        """Rebuild the indexes from self.root after the tree has been mutated."""
+        self._reset()
+        for elem in self.root.iter('object', 'mxCell'):
+            self._add_cell(elem)
+
+    def _add_compressed(self, diagram, stats=None, max_decoded_size=None):
+        if diagram.text and not diagram.text.isspace():
+            import lxml.etree as etree
+            from drawio_c4_lint.drawio import drawio_serialization
+            chunks = drawio_serialization.iter_decoded_chunks(diagram.text, max_decoded_size)
+            if stats is not None:
+                from drawio_c4_lint.profiling import timed_iter
+                chunks = timed_iter(chunks, stats, 'inflate', 'bytes inflated')
+            try:
+                for _, elem in drawio_serialization.iterparse_chunks(chunks):
+                    if elem.tag == 'object' or elem.tag == 'mxCell':
+                        self._add_cell(elem)
+                    elif elem.tag == 'mxGraphModel' and self.root is None:
+                        self.root = elem
+            except (etree.XMLSyntaxError, drawio_serialization.DiagramTooLargeError):
+                raise
+            except Exception as e:
+                # corrupt base64 or deflate data, forget what was parsed before the error
+                logger.debug(f"Could not decode diagram data: {e}")
+                self._reset()
+                self.root = None
+        if self.root is None:
+            # undecodable or empty page, lint it as a diagram without cells
+            self.root = diagram
+
+    def _add_cell(self, elem):
+        if elem.tag == 'object':
+            cell = elem.find('.//mxCell')
+            self.objects.append(elem)
+            c4_type = elem.get('c4Type')
+            self.by_type.setdefault(c4_type.strip() if c4_type is not None else None, []).append(elem)
+        else:
+            parent = elem.getparent()
+            if parent is not None and parent.tag == 'object':
+                # indexed together with its <object> wrapper
+                return
+            cell = elem
+
+        self.cells.append((elem, cell))
+        elem_id = elem.get('id')
+        if elem_id is not None:
+            if elem.tag == 'object':
+                self.objects_by_id[elem_id] = elem
+            if cell is not None:
+                self.cells_by_id[elem_id] = cell
+        if cell is None:
+            return
+        parent_id = cell.get('parent')
+        if elem_id is not None and parent_id is not None:
+            self.parent_map[elem_id] = parent_id
+        source = cell.get('source')
+        target = cell.get('target')
+        if source is not None or target is not None:
+            self.edges.append((elem, source, target))
+
+    def objects_of_type(self, c4_type):
+        return self.by_type.get(c4_type, [])
+
+    def has_c4_objects(self):
+        return any(not C4_ATTRIBUTES.isdisjoint(elem.attrib.keys()) for elem in self.objects)
+
+    def systems_and_connections(self):
+        """Software System names by id and the (source name, target name) pairs connecting them."""
+        systems = {elem.get('id'): elem.get('c4Name') for elem in self.objects_of_type('Software System')}
+        connections = [(systems[source], systems[target]) for _, source, target in self.edges
+                       if source in systems and target in systems]
+        return systems, connections
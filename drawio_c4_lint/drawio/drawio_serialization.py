@@ -1,6 +1,8 @@
 import base64
+import os
+import string
 import zlib
-from urllib.parse import quote, unquote
+from urllib.parse import quote, unquote, unquote_to_bytes
 
 
 # functions courtesy of
@@ -24,8 +26,8 @@ def js_btoa(data):
 def js_atob(data):
     return base64.b64decode(data)
 
-def pako_deflate_raw(data):
-    compress = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15, memLevel=8,strategy=zlib.Z_DEFAULT_STRATEGY)
+def pako_deflate_raw(data, level=zlib.Z_DEFAULT_COMPRESSION, strategy=zlib.Z_DEFAULT_STRATEGY):
+    compress = zlib.compressobj(level, zlib.DEFLATED, -15, memLevel=8, strategy=strategy)
     compressed_data = compress.compress(data)
     compressed_data += compress.flush()
     return compressed_data
@@ -36,26 +38,193 @@ def pako_inflate_raw(data):
     decompressed_data += decompress.flush()
     return decompressed_data
 
-def decode_diagram_data(data):
-    data = js_atob(data)
-    data = pako_inflate_raw(data)
-    data = data.decode()
-    data = unquote(data)
-    return data
 
-def encode_diagram_data(data):
+# characters that encodeURIComponent, and js_encode_uri_component, leave alone
+URI_SAFE_CHARACTERS = frozenset(string.ascii_letters + string.digits + "_.-~()*!'")
+
+
+def encode_uri_component(data):
+    """js_encode_uri_component(data) by one str.replace per distinct unsafe character, not a loop per byte."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    text = data.decode('latin-1')
+    unsafe = set(text) - URI_SAFE_CHARACTERS
+    if '%' in unsafe:
+        # first, so that the escapes added below are left alone
+        unsafe.discard('%')
+        text = text.replace('%', '%25')
+    for char in unsafe:
+        text = text.replace(char, '%%%02X' % ord(char))
+    return text
+
+
+def unquote_bytes(data):
+    """unquote_to_bytes(data), with every %XX turned into \\xXX for the unicode_escape codec to decode in C."""
+    if b'%' not in data:
+        return data
+    try:
+        return data.replace(b'\\', b'\\\\').replace(b'%', b'\\x').decode('unicode_escape').encode('latin-1')
+    except UnicodeDecodeError:
+        # a '%' that starts no escape, which unquote keeps as it is
+        return unquote_to_bytes(data)
+
+
+def decode_diagram_data(data, max_size=None):
+    return b''.join(iter_decoded_chunks(data, max_size)).decode('utf-8', 'replace')
+
+
+# largest inflated diagram accepted by the streaming decoder, a guard against zip bombs
+MAX_DECODED_SIZE = 256 * 1024 * 1024
+# base64 characters decoded at a time, a multiple of 4
+BASE64_CHUNK = 64 * 1024
+INFLATE_CHUNK = 64 * 1024
+
+
+class DiagramTooLargeError(ValueError):
+    pass
+
+
+def iter_inflated_chunks(data, max_size=None):
+    """Base64-decode and inflate diagram data piecewise, yielding at most INFLATE_CHUNK bytes at a time.
+
+    Raises DiagramTooLargeError as soon as the output passes max_size bytes
+    (MAX_DECODED_SIZE by default), so memory stays bounded whatever the input claims.
+    """
+    max_size = MAX_DECODED_SIZE if max_size is None else max_size
+    if isinstance(data, str):
+        data = data.encode('ascii')
+    data = b''.join(data.split())
+    decompress = zlib.decompressobj(-15)
+    total = 0
+    for start in range(0, len(data), BASE64_CHUNK):
+        pending = base64.b64decode(data[start:start + BASE64_CHUNK])
+        while pending:
+            chunk = decompress.decompress(pending, INFLATE_CHUNK)
+            pending = decompress.unconsumed_tail
+            total += len(chunk)
+            if total > max_size:
+                raise DiagramTooLargeError(f"Diagram data inflates to more than {max_size} bytes")
+            if chunk:
+                yield chunk
+            if decompress.eof:
+                return
+    chunk = decompress.flush()
+    total += len(chunk)
+    if total > max_size:
+        raise DiagramTooLargeError(f"Diagram data inflates to more than {max_size} bytes")
+    if chunk:
+        yield chunk
+
+
+def iter_decoded_chunks(data, max_size=None):
+    """UTF-8 XML of compressed diagram data, inflated and percent-decoded chunk by chunk."""
+    carry = b''
+    for chunk in iter_inflated_chunks(data, max_size):
+        chunk = carry + chunk
+        # keep an escape that is cut off at the end of the chunk for the next one
+        cut = chunk.rfind(b'%', max(0, len(chunk) - 2))
+        if cut != -1:
+            chunk, carry = chunk[:cut], chunk[cut:]
+        else:
+            carry = b''
+        yield unquote_bytes(chunk)
+    if carry:
+        yield unquote_bytes(carry)
+
+
+def iterparse_chunks(chunks, events=('end',)):
+    """(event, element) pairs of XML that arrives in byte chunks, e.g. from iter_decoded_chunks."""
+    import lxml.etree as etree
+    parser = etree.XMLPullParser(events=events)
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+def encode_diagram_data(data, level=zlib.Z_DEFAULT_COMPRESSION, strategy=zlib.Z_DEFAULT_STRATEGY):
     # https://stackoverflow.com/questions/33547976/using-python-quote-plus-with-slashes
-    data = quote(data, safe='~()*!.\'')
+    data = encode_uri_component(data)
     data = data.encode()
-    data = pako_deflate_raw(data)
+    data = pako_deflate_raw(data, level, strategy)
     data = js_btoa(data)
     return data
 
-def encode_stencil(data):
+def encode_stencil(data, level=zlib.Z_DEFAULT_COMPRESSION, strategy=zlib.Z_DEFAULT_STRATEGY):
     # https://stackoverflow.com/questions/33547976/using-python-quote-plus-with-slashes
-    data = quote(data, safe='~()*!.\'')
+    data = encode_uri_component(data)
     data = data.encode()
-    data = pako_deflate_raw(data)
+    data = pako_deflate_raw(data, level, strategy)
     data = js_btoa(data)
     data = data.decode("utf-8")
-    return data
\ No newline at end of file
+    return data
+
+
+# payloads submitted ahead per thread, bounds memory when converting long iterables
+BATCH_WINDOW_PER_WORKER = 4
+
+
+class BatchResult:
+    """Outcome of one payload of a batch call: its value, or the exception it raised."""
+    __slots__ = ('index', 'value', 'error')
+
+    def __init__(self, index, value=None, error=None):
+        self.index = index
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return f"BatchResult({self.index!r}, error={self.error!r})" if self.error else f"BatchResult({self.index!r})"
+
+
+def _call(index, function, payload, kwargs):
+    try:
+        return BatchResult(index, function(payload, **kwargs))
+    except Exception as e:
+        return BatchResult(index, error=e)
+
+
+def map_payloads(function, payloads, workers=None, **kwargs):
+    """Yield a BatchResult of function(payload, **kwargs) for every payload, in order.
+
+    The calls run on a pool of workers threads (one per core by default), which
+    overlap where zlib releases the GIL; workers=1 runs them in this thread.
+    A payload that raises gives a result with ``error`` set and does not stop
+    the batch.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for index, payload in enumerate(payloads):
+            yield _call(index, function, payload, kwargs)
+        return
+
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for index, payload in enumerate(payloads):
+            pending.append(executor.submit(_call, index, function, payload, kwargs))
+            if len(pending) >= workers * BATCH_WINDOW_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def decode_many(payloads, workers=None, max_size=None):
+    """decode_diagram_data for many payloads on a thread pool, see map_payloads."""
+    return map_payloads(decode_diagram_data, payloads, workers, max_size=max_size)
+
+
+def encode_many(payloads, workers=None, level=zlib.Z_DEFAULT_COMPRESSION, strategy=zlib.Z_DEFAULT_STRATEGY):
+    """encode_diagram_data for many payloads on a thread pool, see map_payloads."""
+    return map_payloads(encode_diagram_data, payloads, workers, level=level, strategy=strategy)
+
+
+def encode_stencils(payloads, workers=None, level=zlib.Z_DEFAULT_COMPRESSION, strategy=zlib.Z_DEFAULT_STRATEGY):
+    """encode_stencil for many payloads on a thread pool, see map_payloads."""
+    return map_payloads(encode_stencil, payloads, workers, level=level, strategy=strategy)
\ No newline at end of file
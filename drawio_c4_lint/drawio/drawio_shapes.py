@@ -1,5 +1,11 @@
 from lxml import etree
-from drawio_c4_analysis.drawio.drawio_utils import id_generator_2, layer_id_2
+from drawio_c4_lint.drawio.drawio_utils import id_generator_2, layer_id_2
+
+
+def _new_id(kwargs):
+    # an IdAllocator passed as ids=, for ids unique within (and stable across runs of) one diagram
+    ids = kwargs.get('ids')
+    return ids() if ids is not None else id_generator_2()
 
 
 def create_angled_line(parent, x1, y1, x2, y2, width, height, **kwargs):
@@ -15,7 +21,7 @@ def create_angled_line(parent, x1, y1, x2, y2, width, height, **kwargs):
     # print(kwargs['points_array'])
 
     mxcell = etree.Element('mxCell')
-    mxcell.set('id', id_generator_2())
+    mxcell.set('id', _new_id(kwargs))
     if 'value' in kwargs:
         mxcell.set('value', kwargs.get('value', ''))
     mxcell.set('style', kwargs.get('style', ''))
@@ -103,7 +109,7 @@ class AngledLine:
 def create_circle(parent, x, y, width, height, **kwargs):
     try:
         mxcell = etree.Element('mxCell')
-        mxcell.set('id', id_generator_2())
+        mxcell.set('id', _new_id(kwargs))
         mxcell.set('value', kwargs.get('value', ''))
         mxcell.set('style', kwargs.get('style', ''))
         mxcell.set('vertex', '1')
@@ -186,7 +192,7 @@ class Circle:
 def create_line(parent, x1, y1, x2, y2, width, height, **kwargs):
     try:
         mxcell = etree.Element('mxCell')
-        mxcell.set('id', id_generator_2())
+        mxcell.set('id', _new_id(kwargs))
         if 'value' in kwargs:
             mxcell.set('value', kwargs.get('value', ''))
         mxcell.set('style', kwargs.get('style', ''))
@@ -264,7 +270,7 @@ class Line:
 def create_rectangle(parent, x, y, width, height, **kwargs):
     try:
         mxcell = etree.Element('mxCell')
-        mxcell.set('id', id_generator_2())
+        mxcell.set('id', _new_id(kwargs))
         mxcell.set('value', kwargs.get('value', ''))
         mxcell.set('style', kwargs.get('style', ''))
         mxcell.set('parent', parent)
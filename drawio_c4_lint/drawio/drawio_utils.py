@@ -1,10 +1,98 @@
 from lxml import etree
+import os
 import random
 import string
-from drawio_c4_analysis.drawio import drawio_serialization
+from drawio_c4_lint.drawio import drawio_serialization
 import xml.dom.minidom
 
-def id_generator(size=22, chars=string.ascii_uppercase + string.digits + string.ascii_lowercase + '-_'):
+ID_CHARS = string.ascii_uppercase + string.digits + string.ascii_lowercase + '-_'
+ID_SIZE = 22
+# maps every random byte to one of the 64 ID_CHARS, uniformly as 256 = 4 * 64
+_ID_TABLE = bytes.maketrans(bytes(range(256)), (ID_CHARS * 4).encode('ascii'))
+
+
+def random_ids(n, size=ID_SIZE, rng=None):
+    """n random ids of size ID_CHARS, cut from one os.urandom buffer, or one rng.randbytes buffer."""
+    length = n * size
+    data = os.urandom(length) if rng is None else rng.randbytes(length)
+    text = data.translate(_ID_TABLE).decode('ascii')
+    return [text[start:start + size] for start in range(0, length, size)]
+
+
+class IdAllocator:
+    """Unique cell ids for one diagram, cut in bulk from a single random buffer.
+
+    Ids come from os.urandom, or from random.Random(seed) when a seed is
+    given, so that a regenerated diagram gets the same ids and diffs cleanly.
+    Every id handed out or reserved is remembered and never handed out again,
+    so use one allocator per model rather than one per process.
+
+        ids = IdAllocator.for_model(mxGraphModel, seed=42)
+        cell.set('id', ids())
+    """
+
+    def __init__(self, seed=None, size=ID_SIZE, batch=1024, reserved=()):
+        self.size = size
+        self.batch = batch
+        # number of distinct ids of size characters
+        self.capacity = len(ID_CHARS) ** size
+        self._random = None if seed is None else random.Random(seed)
+        self._used = set()
+        # how many of the used ids are of size characters, i.e. taken from the capacity
+        self._allocated = 0
+        self._pending = []
+        self.reserve(reserved)
+
+    @classmethod
+    def for_model(cls, mxGraphModel, seed=None, **kwargs):
+        """Allocator that avoids the ids already in mxGraphModel."""
+        allocator = cls(seed, **kwargs)
+        allocator.reserve(element.get('id') for element in mxGraphModel.iter() if element.get('id') is not None)
+        return allocator
+
+    def reserve(self, ids):
+        for cell_id in ids:
+            if cell_id not in self._used:
+                self._used.add(cell_id)
+                # strip() leaves nothing of an id made of ID_CHARS only
+                if len(cell_id) == self.size and not cell_id.strip(ID_CHARS):
+                    self._allocated += 1
+
+    def __contains__(self, cell_id):
+        return cell_id in self._used
+
+    def __len__(self):
+        return len(self._used)
+
+    def __call__(self):
+        if self._allocated >= self.capacity:
+            raise ValueError(f"All {self.capacity} ids of {self.size} characters are taken")
+        while True:
+            if not self._pending:
+                # popped from the end, reversed so that the ids come out in buffer order
+                self._pending = random_ids(self.batch, self.size, self._random)[::-1]
+            cell_id = self._pending.pop()
+            if cell_id not in self._used:
+                self._used.add(cell_id)
+                self._allocated += 1
+                return cell_id
+
+    def take(self, n):
+        """List of n new ids."""
+        return [self() for _ in range(n)]
+
+
+# drawn in bulk for id_generator and not remembered; ids of 22 characters carry 132 random bits
+_pending_ids = []
+
+
+def id_generator(size=ID_SIZE, chars=ID_CHARS):
+    if size == ID_SIZE and chars == ID_CHARS:
+        try:
+            return _pending_ids.pop()
+        except IndexError:
+            _pending_ids.extend(random_ids(1024))
+            return _pending_ids.pop()
     return ''.join(random.choice(chars) for _ in range(size))
 
 @staticmethod
@@ -52,9 +140,9 @@ def get_diagram_root():
     return mxGraphModel
 
 
-def create_layer(name, locked=0):
+def create_layer(name, locked=0, ids=None):
     mxcell = etree.Element('mxCell')
-    mxcell.set('id', id_generator())
+    mxcell.set('id', ids() if ids is not None else id_generator())
     mxcell.set('value', name)
     mxcell.set('style', 'locked=' + str(locked))
     mxcell.set('parent', '0')
@@ -75,7 +163,11 @@ def write_drawio_output(data, filename='output.drawio'):
     child = etree.Element('diagram')
     child.set('id', 'nMbIOyWw1tff--0FTw4Q')
     child.set('name', 'Page-1')
-    child.text = data
+    if isinstance(data, etree._Element):
+        # uncompressed diagram, the mxGraphModel is stored as is
+        child.append(data)
+    else:
+        child.text = data
     root.append(child)
 
     tree = etree.ElementTree(root)
@@ -88,14 +180,18 @@ def encode_and_save_to_file(mxGraphModel, filename='output.drawio'):
     write_drawio_output(data, filename)
 
 
+def save_to_file(mxGraphModel, filename='output.drawio'):
+    write_drawio_output(mxGraphModel, filename)
+
+
 def pretty_print_to_console(mxGraphModel):
     dom = xml.dom.minidom.parseString(etree.tostring(mxGraphModel))
     pretty_xml_as_string = dom.toprettyxml()
     print(pretty_xml_as_string)
 
 
-def id_generator_2(size=22, chars=string.ascii_uppercase + string.digits + string.ascii_lowercase + '-_'):
-    return ''.join(random.choice(chars) for _ in range(size))
+def id_generator_2(size=ID_SIZE, chars=ID_CHARS):
+    return id_generator(size, chars)
 
 
 def layer_id_2(root, name):
@@ -0,0 +1,22 @@
+import os
+import tempfile
+
+
+def write_atomic(path, data):
+    """Replace path with the bytes data through a temporary file in the same directory.
+
+    Readers see either the old or the new content, never a partial write. An
+    existing file keeps its permissions; a new one is only readable by its owner.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,121 @@
+import csv
+import heapq
+import logging
+import os
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+APPLICATION_NAME_COLUMN = 'Business Application Name'
+
+# (absolute csv path, matcher options) -> ((mtime_ns, size), KnownApplicationsMatcher)
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class KnownApplicationsMatcher:
+    """Prebuilt fuzzy matcher over the known-applications inventory.
+
+    Exact (case-insensitive) hits come from a set. Otherwise candidates are
+    gathered from a character n-gram inverted index, the best
+    ``max_candidates`` of them by n-gram Dice coefficient are scored with difflib's
+    ratio and the top ``limit`` at or above ``cutoff`` are returned.
+    """
+
+    def __init__(self, names, limit=3, cutoff=0.0, ngram_size=2, max_candidates=50):
+        self.limit = limit
+        self.cutoff = cutoff
+        self.ngram_size = ngram_size
+        self.max_candidates = max_candidates
+        # one entry per distinct lowercased name, first spelling wins
+        self.names = []
+        self.names_lower = []
+        self.exact = set()
+        for name in names:
+            lower = name.lower()
+            if lower not in self.exact:
+                self.exact.add(lower)
+                self.names.append(name)
+                self.names_lower.append(lower)
+        self.index = {}
+        self.ngram_counts = []
+        for position, lower in enumerate(self.names_lower):
+            grams = self.ngrams(lower)
+            self.ngram_counts.append(len(grams))
+            for gram in grams:
+                self.index.setdefault(gram, []).append(position)
+
+    def __len__(self):
+        return len(self.names)
+
+    def ngrams(self, text):
+        padded = f" {text} "
+        size = self.ngram_size
+        return {padded[i:i + size] for i in range(max(1, len(padded) - size + 1))}
+
+    def candidates(self, input_lower):
+        grams = self.ngrams(input_lower)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.index.get(gram, ()))
+        if len(shared) < self.limit:
+            # too little in common to fill the suggestions, score the whole inventory
+            return range(len(self.names_lower))
+        counts = self.ngram_counts
+        return heapq.nlargest(self.max_candidates, shared,
+                              key=lambda position: shared[position] / (len(grams) + counts[position]))
+
+    def match(self, input_string, stats=None):
+        """Up to ``limit`` suggestions for input_string; a LintStats passed as stats counts the work done."""
+        input_lower = input_string.lower()
+        if input_lower in self.exact:
+            if stats is not None:
+                stats.count('matcher exact hits')
+            return [input_string]
+
+        from difflib import SequenceMatcher
+        matcher = SequenceMatcher()
+        matcher.set_seq2(input_lower)
+        scored = []
+        candidates = self.candidates(input_lower)
+        if stats is not None:
+            stats.count('matcher candidates scored', len(candidates))
+        for position in candidates:
+            matcher.set_seq1(self.names_lower[position])
+            if matcher.real_quick_ratio() >= self.cutoff and \
+                    matcher.quick_ratio() >= self.cutoff:
+                score = matcher.ratio()
+                if score >= self.cutoff:
+                    scored.append((score, self.names_lower[position]))
+        return [name for _, name in heapq.nlargest(self.limit, scored)]
+
+
+def read_application_names(csv_path, column=APPLICATION_NAME_COLUMN):
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        return [row[column] for row in csv.DictReader(f) if row.get(column)]
+
+
+def get_known_applications(csv_path, **matcher_options):
+    """Return the process-wide matcher for csv_path, loading it on first use.
+
+    Entries are keyed by path and matcher options and reloaded when the
+    file's mtime or size changes. Call this before forking worker processes
+    so they inherit the loaded matcher instead of reading the CSV again.
+    """
+    key = (os.path.abspath(csv_path), tuple(sorted(matcher_options.items())))
+    stat = os.stat(csv_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _registry_lock:
+        entry = _registry.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        logger.debug(f"Loading known applications from {csv_path}")
+        matcher = KnownApplicationsMatcher(read_application_names(csv_path), **matcher_options)
+        _registry[key] = (version, matcher)
+        return matcher
+
+
+def clear_known_applications():
+    with _registry_lock:
+        _registry.clear()
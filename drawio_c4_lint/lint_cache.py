@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+from drawio_c4_lint import __version__
+from drawio_c4_lint.file_utils import write_atomic
+from drawio_c4_lint.known_applications import KnownApplicationsMatcher
+from drawio_c4_lint.rules import DEFAULT_PROFILE, active_rule_names
+
+logger = logging.getLogger(__name__)
+
+STAT_INDEX_FILE = 'stat_index.json'
+RESULTS_DIR = 'results'
+# bumped whenever the layout of a stored LintResult changes
+RESULT_FORMAT = '5'
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def lint_fingerprint(known_applications=None, rules=None, disabled_rules=(), profile=DEFAULT_PROFILE, **lint_options):
+    """Hash of everything besides the file itself that can change a lint result."""
+    digest = hashlib.sha256()
+    digest.update(__version__.encode('utf-8'))
+    digest.update(RESULT_FORMAT.encode('utf-8'))
+    digest.update(profile.encode('utf-8'))
+    digest.update(json.dumps(active_rule_names(rules, disabled_rules, profile)).encode('utf-8'))
+    digest.update(json.dumps(lint_options, sort_keys=True, default=str).encode('utf-8'))
+    if isinstance(known_applications, KnownApplicationsMatcher):
+        digest.update(json.dumps([known_applications.names, known_applications.limit,
+                                  known_applications.cutoff]).encode('utf-8'))
+    elif known_applications:
+        digest.update(file_sha256(known_applications).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class LintCache:
+    """On-disk store of serialized lint results keyed by file content and lint fingerprint.
+
+    A file whose mtime and size match the stat index reuses the recorded
+    content hash, so unchanged files are neither hashed nor parsed. The path
+    is part of the key because the filename check and the report depend on it.
+    The fingerprint is the lint_fingerprint of the lint options; left None,
+    it is taken from the options of the first lint that uses the cache.
+    """
+
+    def __init__(self, cache_dir, fingerprint=None):
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.join(cache_dir, RESULTS_DIR), exist_ok=True)
+        self._stat_index_path = os.path.join(cache_dir, STAT_INDEX_FILE)
+        self._stat_index = self._load_stat_index()
+        self._dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.save()
+
+    def _load_stat_index(self):
+        try:
+            with open(self._stat_index_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def content_hash(self, file_path):
+        stat = os.stat(file_path)
+        key = os.path.abspath(file_path)
+        entry = self._stat_index.get(key)
+        if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+        sha = file_sha256(file_path)
+        self._stat_index[key] = [stat.st_mtime_ns, stat.st_size, sha]
+        self._dirty = True
+        return sha
+
+    def bind(self, **lint_options):
+        """Check that the cache holds results of lint_options, raises ValueError if not."""
+        fingerprint = lint_fingerprint(**lint_options)
+        if self.fingerprint is None:
+            self.fingerprint = fingerprint
+        elif self.fingerprint != fingerprint:
+            raise ValueError(f"Lint cache {self.cache_dir} was opened for other lint options")
+
+    def _entry_path(self, file_path):
+        key = hashlib.sha256(
+            f"{self.fingerprint}\0{file_path}\0{self.content_hash(file_path)}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, RESULTS_DIR, key[:2], key + '.json')
+
+    def __contains__(self, file_path):
+        """True when a result for file_path is stored, without loading it; counts a miss otherwise."""
+        try:
+            stored = os.path.exists(self._entry_path(file_path))
+        except OSError:
+            stored = False
+        if not stored:
+            self.misses += 1
+        return stored
+
+    def get(self, file_path):
+        try:
+            with open(self._entry_path(file_path), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, file_path, data):
+        entry_path = self._entry_path(file_path)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        write_atomic(entry_path, json.dumps(data).encode('utf-8'))
+
+    def save(self):
+        if self._dirty:
+            write_atomic(self._stat_index_path, json.dumps(self._stat_index).encode('utf-8'))
+            self._dirty = False
+        logger.debug(f"Lint cache {self.cache_dir}: {self.hits} hits, {self.misses} misses")
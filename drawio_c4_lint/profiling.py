@@ -0,0 +1,110 @@
+import heapq
+from time import perf_counter
+
+
+class LintStats:
+    """Per-phase and per-rule timers (seconds) and counters for one lint.
+
+    Only created when a lint is asked to collect them; every instrumented
+    code path checks for None first, so a lint without stats pays nothing.
+    """
+
+    def __init__(self, timers=None, counters=None):
+        self.timers = dict(timers or {})
+        self.counters = dict(counters or {})
+
+    def add_time(self, name, seconds):
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        for name, seconds in other.timers.items():
+            self.add_time(name, seconds)
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+    def to_dict(self):
+        return {'timers': dict(self.timers), 'counters': dict(self.counters)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('timers'), data.get('counters'))
+
+
+def timed_call(stats, name, function, *args):
+    """function(*args), timed under name when stats is not None."""
+    if stats is None:
+        return function(*args)
+    start = perf_counter()
+    try:
+        return function(*args)
+    finally:
+        stats.add_time(name, perf_counter() - start)
+
+
+def timed(visit, stats, name):
+    """Wrap a rule callback so every call adds to the timer name."""
+    def timed_visit(*args):
+        start = perf_counter()
+        try:
+            return visit(*args)
+        finally:
+            stats.add_time(name, perf_counter() - start)
+    return timed_visit
+
+
+def timed_iter(iterable, stats, name, counter=None):
+    """Yield from iterable, adding the time spent producing items to name and their len() to counter."""
+    iterator = iter(iterable)
+    while True:
+        start = perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stats.add_time(name, perf_counter() - start)
+            return
+        stats.add_time(name, perf_counter() - start)
+        if counter is not None:
+            stats.count(counter, len(item))
+        yield item
+
+
+class BatchStats:
+    """Totals of the LintStats of many files and the files that took longest."""
+
+    def __init__(self, slowest=5):
+        self.totals = LintStats()
+        self.files = 0
+        self.slowest = slowest
+        # (lint seconds, file path) min-heap of the slowest files seen so far
+        self._slowest = []
+
+    def add(self, result):
+        if result.stats is None:
+            return
+        stats = LintStats.from_dict(result.stats)
+        self.totals.merge(stats)
+        self.files += 1
+        entry = (stats.timers.get('lint', 0.0), result.file_path)
+        if len(self._slowest) < self.slowest:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    def slowest_files(self):
+        """(seconds, file path) pairs, slowest first."""
+        return sorted(self._slowest, reverse=True)
+
+    def format_summary(self):
+        lines = [f"Lint statistics for {self.files} files"]
+        for name, seconds in sorted(self.totals.timers.items(), key=lambda item: -item[1]):
+            lines.append(f"  {seconds * 1000:12.1f} ms  {name}")
+        for name, n in sorted(self.totals.counters.items()):
+            lines.append(f"  {n:15d}  {name}")
+        if self._slowest:
+            lines.append("Slowest files")
+            for seconds, file_path in self.slowest_files():
+                lines.append(f"  {seconds * 1000:12.1f} ms  {file_path}")
+        return '\n'.join(lines)
@@ -0,0 +1,52 @@
+RESOLVED = 'resolved'
+DANGLING = 'dangling'
+NON_C4 = 'non-c4'
+CONTAINER_CHILD = 'container-child'
+
+
+class RelationshipResolver:
+    """Resolves relationship endpoints through the model's id indexes.
+
+    The nearest C4 element at or above a cell is found by following the
+    parent map; every cell on the way is memoized, so resolving all edges of
+    a diagram is linear in the number of cells.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        # cell id -> id of the nearest C4 element at or above it, None if there is none
+        self._owners = {}
+
+    def is_c4_element(self, cell_id):
+        obj = self.model.objects_by_id.get(cell_id)
+        return obj is not None and 'c4Type' in obj.attrib and obj.attrib['c4Type'].strip() != 'Relationship'
+
+    def c4_owner(self, cell_id):
+        owners = self._owners
+        path = []
+        seen = set()
+        current = cell_id
+        owner = None
+        while current is not None and current not in seen:
+            if current in owners:
+                owner = owners[current]
+                break
+            if self.is_c4_element(current):
+                owner = current
+                break
+            path.append(current)
+            seen.add(current)
+            current = self.model.parent_map.get(current)
+        for visited in path:
+            owners[visited] = owner
+        return owner
+
+    def resolve(self, cell_id):
+        """Return (status, C4 element) for one endpoint id, the element is None unless it was found."""
+        if cell_id not in self.model.cells_by_id:
+            return DANGLING, None
+        owner = self.c4_owner(cell_id)
+        if owner is None:
+            return NON_C4, None
+        status = RESOLVED if owner == cell_id else CONTAINER_CHILD
+        return status, self.model.objects_by_id[owner]
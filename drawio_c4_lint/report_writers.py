@@ -0,0 +1,113 @@
+import json
+from drawio_c4_lint import __version__
+from drawio_c4_lint.diagnostics import DIAGNOSTIC_CODES
+
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+
+
+class TextWriter:
+    """The human readable report, one block per C4 diagram."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, result):
+        if result.failure is not None:
+            print(f"Failed to initialize C4Lint for {result.file_path}: {result.failure}", file=self.stream)
+        elif result.is_c4:
+            print(result.report, file=self.stream)
+
+    def close(self):
+        self.stream.flush()
+
+
+class JsonLinesWriter:
+    """One JSON object per linted file, written and flushed as soon as the file is done."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, result):
+        self.stream.write(json.dumps(result_record(result)) + '\n')
+        self.stream.flush()
+
+    def close(self):
+        self.stream.flush()
+
+
+def result_record(result):
+    """JSON-able summary of a LintResult with its rendered diagnostics, as written by JsonLinesWriter."""
+    record = {
+        'file': result.file_path,
+        'is_c4': result.is_c4,
+        'profile': result.profile,
+        'failure': result.failure,
+        'error_count': result.error_count,
+        'warning_count': result.warning_count,
+        'c4_object_count': result.c4_object_count,
+        'non_c4_object_count': result.non_c4_object_count,
+        'diagnostics': [diagnostic.to_dict() for diagnostic in result.diagnostics],
+        'pages': result.pages,
+    }
+    if result.stats is not None:
+        record['stats'] = result.stats
+    return record
+
+
+class SarifWriter:
+    """A SARIF 2.1.0 log with a single run, streamed result by result.
+
+    The tool and rule metadata are written up front and every diagnostic is
+    written as soon as its file is done, so nothing accumulates in memory.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.first_result = True
+        rules = [{'id': code, 'shortDescription': {'text': description}}
+                 for code, description in DIAGNOSTIC_CODES.items()]
+        tool = {'driver': {'name': 'drawio_c4_lint', 'version': __version__, 'rules': rules}}
+        # the log up to the opening bracket of the results array, close() writes the rest
+        self.stream.write(f'{{"version": "2.1.0", "$schema": {json.dumps(SARIF_SCHEMA)}, '
+                          f'"runs": [{{"tool": {json.dumps(tool)}, "results": [')
+
+    def _write_result(self, file_path, code, level, message, element_id=None, category=None, profile=None,
+                      page=None):
+        location = {'physicalLocation': {'artifactLocation': {'uri': file_path.replace('\\', '/')}}}
+        if element_id is not None:
+            location['logicalLocations'] = [{'name': element_id, 'kind': 'element'}]
+        sarif_result = {
+            'ruleId': code,
+            'level': level,
+            'message': {'text': message},
+            'locations': [location],
+            'properties': {'category': category, 'profile': profile},
+        }
+        if page is not None:
+            sarif_result['properties']['page'] = page
+        self.stream.write(('' if self.first_result else ',') + json.dumps(sarif_result))
+        self.first_result = False
+
+    def write(self, result):
+        if result.failure is not None:
+            self._write_result(result.file_path, 'C4000', 'error', result.failure, profile=result.profile)
+        elif result.is_c4:
+            page_names = {page['id']: page['name'] for page in result.pages}
+            for diagnostic in result.diagnostics:
+                page = None
+                if diagnostic.page is not None:
+                    page = {'id': diagnostic.page, 'name': page_names.get(diagnostic.page)}
+                self._write_result(result.file_path, diagnostic.code, diagnostic.severity, diagnostic.message,
+                                   diagnostic.element_id, diagnostic.category, result.profile, page)
+        self.stream.flush()
+
+    def close(self):
+        self.stream.write(']}]}\n')
+        self.stream.flush()
+
+
+WRITERS = {
+    'text': TextWriter,
+    'jsonl': JsonLinesWriter,
+    'sarif': SarifWriter,
+}
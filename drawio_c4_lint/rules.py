@@ -0,0 +1,300 @@
+import os
+import re
+from drawio_c4_lint.diagnostics import Diagnostic, ReadableProperties
+from drawio_c4_lint.diagram_model import C4_ATTRIBUTES
+from drawio_c4_lint.profiling import timed, timed_call
+from drawio_c4_lint.relationships import CONTAINER_CHILD, DANGLING, NON_C4, RelationshipResolver
+
+# file:         once per diagram file, on its first page, visit_file(lint, xml_file)
+# object:       every <object> that is not a Relationship, visit_object(lint, elem)
+# relationship: every <object c4Type="Relationship">, visit_relationship(lint, elem)
+# vertex:       every cell with vertex="1", visit_vertex(lint, elem, cell)
+# edge:         every cell with a source or target, visit_edge(lint, elem, source, target)
+ELEMENT_KINDS = ('file', 'object', 'relationship', 'vertex', 'edge')
+
+# rule name -> Rule subclass, in registration order which is also the default run order
+RULES = {}
+
+# profile name -> rule costs it runs; "fast" is meant for on-save linting, "full" for CI
+PROFILES = {
+    'fast': ('cheap',),
+    'full': ('cheap', 'expensive'),
+}
+DEFAULT_PROFILE = 'full'
+
+
+class Rule:
+    """Base class for lint rules.
+
+    A rule declares the element kinds it wants in ``kinds`` and implements the
+    matching ``visit_<kind>`` methods. The engine creates a fresh instance per
+    lint, calls ``start``, dispatches every element of the diagram to all
+    interested rules in a single pass and then calls ``finish``.
+
+    ``cost`` is "cheap" for rules that do constant work per element and
+    "expensive" for anything heavier; profiles select rules by cost.
+    """
+    name = None
+    kinds = ()
+    cost = 'cheap'
+
+    def start(self, lint):
+        pass
+
+    def finish(self, lint):
+        pass
+
+
+def register_rule(rule_class):
+    if not rule_class.name:
+        raise ValueError(f"Rule {rule_class.__name__} has no name")
+    if rule_class.cost not in PROFILES[DEFAULT_PROFILE]:
+        raise ValueError(f"Rule {rule_class.name} has unknown cost {rule_class.cost!r}")
+    unknown = set(rule_class.kinds) - set(ELEMENT_KINDS)
+    if unknown:
+        raise ValueError(f"Rule {rule_class.name} declares unknown element kinds: {', '.join(sorted(unknown))}")
+    RULES[rule_class.name] = rule_class
+    return rule_class
+
+
+def check_rule_names(names):
+    """Raise ValueError naming the strings in names that are not registered rules."""
+    unknown = [name for name in names if isinstance(name, str) and name not in RULES]
+    if unknown:
+        raise ValueError(f"Unknown lint rule: {', '.join(unknown)}")
+
+
+def rule_classes(rules=None, disabled_rules=(), profile=DEFAULT_PROFILE):
+    """Resolve the rule classes for one lint.
+
+    ``rules`` is an iterable of registered rule names or Rule subclasses. It
+    defaults to every registered rule whose cost is part of ``profile``; an
+    explicit list is taken as is. Names in ``disabled_rules`` are skipped and
+    must be registered as well.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown lint profile: {profile}")
+    check_rule_names(disabled_rules)
+    if rules is None:
+        rules = [rule_class for rule_class in RULES.values() if rule_class.cost in PROFILES[profile]]
+    selected = []
+    for rule in rules:
+        rule_class = RULES.get(rule) if isinstance(rule, str) else rule
+        if rule_class is None:
+            raise ValueError(f"Unknown lint rule: {rule}")
+        if rule_class.name not in disabled_rules:
+            selected.append(rule_class)
+    return selected
+
+
+def active_rule_names(rules=None, disabled_rules=(), profile=DEFAULT_PROFILE):
+    return [rule_class.name for rule_class in rule_classes(rules, disabled_rules, profile)]
+
+
+def select_rules(rules=None, disabled_rules=(), profile=DEFAULT_PROFILE):
+    """Instantiate the rules for one lint, see rule_classes for the arguments."""
+    return [rule_class() for rule_class in rule_classes(rules, disabled_rules, profile)]
+
+
+def run_rules(lint, rules):
+    stats = lint.stats
+    dispatch = {kind: [] for kind in ELEMENT_KINDS}
+    for rule in rules:
+        timed_call(stats, 'rule:' + rule.name, rule.start, lint)
+        for kind in rule.kinds:
+            visit = getattr(rule, 'visit_' + kind)
+            dispatch[kind].append(visit if stats is None else timed(visit, stats, 'rule:' + rule.name))
+
+    object_visits = dispatch['object']
+    relationship_visits = dispatch['relationship']
+    vertex_visits = dispatch['vertex']
+    edge_visits = dispatch['edge']
+    for elem, cell in lint.model.cells:
+        if elem.tag == 'object':
+            c4_type = elem.get('c4Type')
+            if c4_type is not None:
+                lint.c4_object_count += 1
+            elif C4_ATTRIBUTES.isdisjoint(elem.attrib.keys()):
+                lint.non_c4_object_count += 1
+            for visit in relationship_visits if c4_type is not None and c4_type.strip() == 'Relationship' \
+                    else object_visits:
+                visit(lint, elem)
+        if cell is None:
+            continue
+        if vertex_visits and cell.get('vertex') == '1':
+            for visit in vertex_visits:
+                visit(lint, elem, cell)
+        if edge_visits:
+            source = cell.get('source')
+            target = cell.get('target')
+            if source is not None or target is not None:
+                for visit in edge_visits:
+                    visit(lint, elem, source, target)
+
+    if lint.page_index == 0:
+        for visit in dispatch['file']:
+            visit(lint, lint.xml_file)
+    for rule in rules:
+        timed_call(stats, 'rule:' + rule.name, rule.finish, lint)
+    if stats is not None:
+        stats.count('elements visited', len(lint.model.cells))
+
+
+def check_required_attributes(lint, elem, required_attribs, category):
+    missing_attribs = [attrib for attrib in required_attribs if not elem.attrib.get(attrib, '').strip()]
+    if missing_attribs:
+        ids = f" (mxCell id: {elem.attrib.get('id')})" if lint.include_ids else ''
+        lint.report('C4001', category, (', '.join(missing_attribs), ReadableProperties(elem.attrib.items()), ids),
+                    elem.get('id'))
+
+
+def object_category(c4_type):
+    if c4_type == 'Software System':
+        return 'Systems'
+    if c4_type == 'Person':
+        return 'Actors'
+    return 'Other'
+
+
+@register_rule
+class RequiredAttributesRule(Rule):
+    name = 'required-attributes'
+    kinds = ('object', 'relationship')
+
+    def visit_object(self, lint, elem):
+        if 'c4Type' not in elem.attrib:
+            return
+        c4_type = elem.attrib['c4Type'].strip()
+        if c4_type == 'Software System' and not elem.attrib.get('c4Name', '').strip():
+            lint.report('C4001', 'Systems', ('c4Name', ReadableProperties(elem.attrib.items()), ''), elem.get('id'))
+            return
+        check_required_attributes(lint, elem, ('c4Name', 'c4Description', 'c4Type'), object_category(c4_type))
+
+    def visit_relationship(self, lint, elem):
+        check_required_attributes(lint, elem, ('c4Description', 'c4Technology'), 'Relationships')
+
+
+@register_rule
+class NonC4ElementRule(Rule):
+    name = 'non-c4-element'
+    kinds = ('object',)
+
+    def visit_object(self, lint, elem):
+        if 'c4Type' not in elem.attrib and C4_ATTRIBUTES.isdisjoint(elem.attrib.keys()):
+            lint.report('C4002', 'Other', (elem.attrib.get('label', 'No label'),), elem.get('id'))
+
+    def finish(self, lint):
+        if not lint.model.objects:
+            lint.report('C4003', 'Other')
+
+
+@register_rule
+class KnownApplicationRule(Rule):
+    name = 'known-application'
+    kinds = ('object',)
+    cost = 'expensive'
+
+    def visit_object(self, lint, elem):
+        if elem.attrib.get('c4Type', '').strip() != 'Software System':
+            return
+        system_name = elem.attrib.get('c4Name', '').strip()
+        if not system_name:
+            return
+        matches = lint.match_strings(system_name)
+        if not matches:
+            lint.report('C4004', 'Systems', (system_name,), elem.get('id'))
+        if system_name not in matches:
+            lint.report('C4005', 'Systems', (system_name, matches), elem.get('id'), severity='warning')
+
+
+@register_rule
+class SystemConnectedRule(Rule):
+    name = 'system-connected'
+    kinds = ('object', 'edge')
+    cost = 'expensive'
+
+    def start(self, lint):
+        self.systems = {}
+        self.connected = set()
+
+    def visit_object(self, lint, elem):
+        if 'c4Type' in elem.attrib:
+            self.systems[elem.get('id')] = elem
+
+    def visit_edge(self, lint, elem, source, target):
+        if elem.tag != 'object':
+            return
+        # at least one leg is connected
+        if source is not None and target is not None:
+            self.connected.add(source)
+            self.connected.add(target)
+        else:
+            # TODO - include a test case
+            lint.report('C4006', 'Relationships', (elem.attrib.get('c4Description', ''),), elem.get('id'))
+
+    def finish(self, lint):
+        for system_id, system_details in self.systems.items():
+            if system_id not in self.connected:
+                lint.report('C4007', 'Systems',
+                            (system_details.attrib.get('c4Name', ''), system_details.attrib['c4Type'], system_id), system_id)
+
+
+@register_rule
+class RelationshipEndpointsRule(Rule):
+    name = 'relationship-endpoints'
+    kinds = ('edge',)
+
+    def start(self, lint):
+        self.resolver = RelationshipResolver(lint.model)
+
+    def visit_edge(self, lint, elem, source, target):
+        if elem.tag != 'object' or elem.attrib.get('c4Type', '').strip() != 'Relationship':
+            return
+        label = (elem.attrib.get('c4Description', '').strip(), elem.get('id'))
+        resolved = []
+        for end, endpoint in (('source', source), ('target', target)):
+            if endpoint is None:
+                # missing legs are reported by system-connected
+                continue
+            status, c4_element = self.resolver.resolve(endpoint)
+            if status == DANGLING:
+                lint.report('C4008', 'Relationships', (*label, end, endpoint), elem.get('id'))
+            elif status == NON_C4:
+                lint.report('C4010', 'Relationships', (*label, end, endpoint), elem.get('id'))
+            elif status == CONTAINER_CHILD:
+                lint.report('C4011', 'Relationships', (*label, end, endpoint, c4_element.get('c4Name', '')),
+                            elem.get('id'), severity='warning')
+            if c4_element is not None:
+                resolved.append(c4_element)
+        if source is not None and (source == target or len(resolved) == 2 and resolved[0] is resolved[1]):
+            lint.report('C4009', 'Relationships', (*label, resolved[0].get('c4Name', '') if resolved else source),
+                        elem.get('id'))
+
+
+@register_rule
+class FilenameFormatRule(Rule):
+    name = 'filename-format'
+    kinds = ('file',)
+    filename_pattern = r"C4 L[01234] .*?.drawio"
+
+    def visit_file(self, lint, xml_file):
+        if not re.match(self.filename_pattern, os.path.basename(xml_file)):
+            lint.report('C4012', 'Other', (xml_file,))
+
+
+def cross_page_diagnostics(pages):
+    """C4013 for every Software System id that is named differently than on an earlier page.
+
+    Runs once all pages of a file are linted, on (page record, {system id: name})
+    summaries of LintResult instead of on the page trees.
+    """
+    first_seen = {}
+    diagnostics = []
+    for page, systems in pages:
+        for system_id, name in systems.items():
+            seen_name, seen_page = first_seen.setdefault(system_id, (name, page))
+            if name != seen_name:
+                diagnostics.append(Diagnostic('C4013', 'error', 'Systems', system_id,
+                                              (system_id, seen_name, seen_page['name'], name, page['name']),
+                                              page['id']))
+    return diagnostics
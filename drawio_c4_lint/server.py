@@ -0,0 +1,281 @@
+"""Long-running lint server for editors and pre-commit hooks.
+
+    python -m drawio_c4_lint.server --stdio --known-applications applications.csv
+    python -m drawio_c4_lint.server --port 8765 -j 4
+
+The interpreter, the lint machinery and the known-applications index are
+loaded once and results are cached by content, so a request only pays for
+linting the diagrams that actually changed.
+
+Requests are JSON objects; on stdio one per line, answered one per line in
+completion order and matched by ``id``:
+
+    {"id": 1, "method": "lint", "params": {"path": "diagrams/C4 L1 Shop.drawio"}}
+    {"id": 2, "method": "lint", "params": {"name": "C4 L1 Shop.drawio", "content": "<mxfile>...</mxfile>"}}
+
+Over HTTP the params are POSTed to /lint and GET /health returns the
+server counters. ``content`` is the diagram text, or base64 when
+``"encoding": "base64"`` is given. ``profile``, ``rules`` and
+``disabled_rules`` can be set per request.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from drawio_c4_lint.c4_lint import configure_logging
+from drawio_c4_lint.c4_lint_on_directory import lint_file
+from drawio_c4_lint.known_applications import get_known_applications
+from drawio_c4_lint.lint_cache import lint_fingerprint
+from drawio_c4_lint.report_writers import result_record
+from drawio_c4_lint.rules import DEFAULT_PROFILE, PROFILES, check_rule_names
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = 1024
+REQUEST_OPTIONS = ('profile', 'rules', 'disabled_rules')
+
+
+class RequestError(Exception):
+    pass
+
+
+def lint_content(name, content, lint_kwargs):
+    """Worker side of a request: lint the diagram bytes and return the JSON-able record."""
+    return result_record(lint_file(name, content=content, render_report=False, **lint_kwargs))
+
+
+class LintServer:
+    """Answers lint requests on a warm worker pool, with an LRU cache of results.
+
+    workers=1 lints on a single thread of this process, anything else on a
+    process pool whose workers load the known-applications index once.
+    """
+
+    def __init__(self, workers=1, cache_size=CACHE_SIZE, **lint_kwargs):
+        self.lint_kwargs = lint_kwargs
+        known_applications = lint_kwargs.get('known_applications')
+        initializer, initargs = None, ()
+        if isinstance(known_applications, str):
+            get_known_applications(known_applications)
+            initializer, initargs = get_known_applications, (known_applications,)
+        if workers == 1:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            self.executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                                initializer=initializer, initargs=initargs)
+        self.cache_size = cache_size
+        # (fingerprint, name, content sha256) -> record, least recently used first
+        self.cache = OrderedDict()
+        self.fingerprints = {}
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'cache_hits': 0, 'linted': 0, 'errors': 0}
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _lint_kwargs(self, params):
+        lint_kwargs = dict(self.lint_kwargs)
+        for option in REQUEST_OPTIONS:
+            if params.get(option) is not None:
+                lint_kwargs[option] = params[option]
+        if lint_kwargs.get('profile', DEFAULT_PROFILE) not in PROFILES:
+            raise RequestError(f"Unknown lint profile: {lint_kwargs['profile']}")
+        if 'disabled_rules' in lint_kwargs:
+            lint_kwargs['disabled_rules'] = tuple(lint_kwargs['disabled_rules'])
+        try:
+            check_rule_names(lint_kwargs.get('rules') or ())
+            check_rule_names(lint_kwargs.get('disabled_rules', ()))
+        except ValueError as e:
+            raise RequestError(str(e))
+        return lint_kwargs
+
+    def _fingerprint(self, lint_kwargs):
+        key = json.dumps(lint_kwargs, sort_keys=True, default=str)
+        known_applications = lint_kwargs.get('known_applications')
+        if isinstance(known_applications, str):
+            # the CSV is hashed again once it is edited
+            stat = os.stat(known_applications)
+            key += f' {stat.st_mtime_ns} {stat.st_size}'
+        with self.lock:
+            fingerprint = self.fingerprints.get(key)
+        if fingerprint is None:
+            fingerprint = lint_fingerprint(**lint_kwargs)
+            with self.lock:
+                self.fingerprints[key] = fingerprint
+        return fingerprint
+
+    @staticmethod
+    def _diagram(params):
+        """(name, bytes) of the diagram a lint request refers to."""
+        if 'content' in params:
+            content = params['content']
+            if params.get('encoding') == 'base64':
+                content = base64.b64decode(content)
+            elif isinstance(content, str):
+                content = content.encode('utf-8')
+            return params.get('name') or params.get('path') or 'diagram.drawio', content
+        if 'path' in params:
+            try:
+                with open(params['path'], 'rb') as f:
+                    return params['path'], f.read()
+            except OSError as e:
+                raise RequestError(str(e))
+        raise RequestError("lint needs a 'path' or a 'content' parameter")
+
+    def lint(self, params):
+        """The result record for one lint request, from the cache when the diagram did not change."""
+        self._count('requests')
+        name, content = self._diagram(params)
+        lint_kwargs = self._lint_kwargs(params)
+        key = (self._fingerprint(lint_kwargs), name, hashlib.sha256(content).hexdigest())
+        with self.lock:
+            record = self.cache.get(key)
+            if record is not None:
+                self.cache.move_to_end(key)
+                self.counters['cache_hits'] += 1
+                return record
+        record = self.executor.submit(lint_content, name, content, lint_kwargs).result()
+        with self.lock:
+            self.counters['linted'] += 1
+            self.cache[key] = record
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return record
+
+    def health(self):
+        with self.lock:
+            return dict(self.counters, cached=len(self.cache))
+
+    def handle(self, request):
+        """Response object for a request object, errors are reported in the response."""
+        request_id = request.get('id') if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+            method = request.get('method', 'lint')
+            if method == 'lint':
+                result = self.lint(request.get('params') or {})
+            elif method == 'health':
+                result = self.health()
+            else:
+                raise RequestError(f"Unknown method: {method}")
+        except Exception as e:
+            self._count('errors')
+            if not isinstance(e, RequestError):
+                logger.exception("lint request failed")
+            return {'id': request_id, 'error': {'message': str(e)}}
+        return {'id': request_id, 'result': result}
+
+
+def serve_stdio(server, stdin=None, stdout=None, max_concurrent=None):
+    """Answer JSON-lines requests from stdin until it is closed, several at a time."""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    write_lock = threading.Lock()
+
+    def answer(line):
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {'id': None, 'error': {'message': f"invalid JSON: {e}"}}
+        else:
+            response = server.handle(request)
+        with write_lock:
+            stdout.write(json.dumps(response) + '\n')
+            stdout.flush()
+
+    # request threads only wait on the lint pool, a few per worker keeps it busy
+    with ThreadPoolExecutor(max_workers=max_concurrent or 4 * (os.cpu_count() or 1)) as requests:
+        for line in stdin:
+            if line.strip():
+                requests.submit(answer, line)
+
+
+def make_http_server(server, host='127.0.0.1', port=0):
+    """A ThreadingHTTPServer for POST /lint and GET /health, call serve_forever() on it."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def send_json(self, status, data):
+            body = json.dumps(data).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self.send_json(200, server.health())
+            else:
+                self.send_json(404, {'error': {'message': f"Not found: {self.path}"}})
+
+        def do_POST(self):
+            if self.path != '/lint':
+                self.send_json(404, {'error': {'message': f"Not found: {self.path}"}})
+                return
+            try:
+                params = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            except ValueError as e:
+                self.send_json(400, {'error': {'message': f"invalid JSON: {e}"}})
+                return
+            response = server.handle({'method': 'lint', 'params': params})
+            self.send_json(400 if 'error' in response else 200, response.get('result', response))
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stdio', action='store_true', help="serve JSON lines on stdin/stdout instead of HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="worker processes, 0 for one per core (default: 1, lint in this process)")
+    parser.add_argument('--known-applications', default=None,
+                        help="CSV of known business applications to check Software System names against")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="default rule profile, requests can override it (default: full)")
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help="results kept in memory")
+    args = parser.parse_args(argv)
+    configure_logging()
+    lint_kwargs = {'profile': args.profile}
+    if args.known_applications:
+        lint_kwargs['known_applications'] = args.known_applications
+    with LintServer(workers=args.workers or None, cache_size=args.cache_size, **lint_kwargs) as server:
+        if args.stdio:
+            serve_stdio(server)
+            return
+        http_server = make_http_server(server, args.host, args.port)
+        host, port = http_server.server_address[:2]
+        logger.info(f"Serving lint requests on http://{host}:{port}/lint")
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            http_server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import contextlib
+import io
+import unittest
+from unittest import mock
+from drawio_c4_lint.analyze_network import analyze_network, extract_file, extract_systems_and_connections
+
+
+class TestAnalyzeNetwork(unittest.TestCase):
+
+    def test_extract_does_not_lint(self):
+        with mock.patch('drawio_c4_lint.c4_lint.C4Lint.lint') as lint:
+            systems, connections = extract_systems_and_connections('test_files/missing_connection.drawio')
+        lint.assert_not_called()
+        self.assertEqual(len(list(systems)), 4)
+        self.assertEqual(connections, [('System name A', 'External system name B')])
+
+    def analyze(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return analyze_network('test_files', **kwargs)
+
+    def test_parallel_matches_serial(self):
+        graph, system_names, connections = self.analyze()
+        parallel_graph, parallel_names, parallel_connections = self.analyze(workers=2, chunksize=1)
+        self.assertEqual(parallel_connections, connections)
+        self.assertEqual(parallel_names, system_names)
+        self.assertEqual(set(parallel_graph.edges), set(graph.edges))
+        self.assertIn(('System name A', 'External system name B'), connections)
+        self.assertIn('System name C', system_names)
+
+    def test_non_c4_files_are_screened_out(self):
+        path = 'test_files/non_c4_object.drawio'
+        with mock.patch('drawio_c4_lint.analyze_network.read_pages') as extract:
+            self.assertEqual(extract_file(path), (path, False, [], [], None))
+        extract.assert_not_called()
+        self.assertEqual(extract_file(path, prescreen=False), (path, False, [], [], None))
+        self.assertEqual(self.analyze(prescreen=False)[1], self.analyze()[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
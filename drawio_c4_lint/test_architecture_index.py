@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from drawio_c4_lint.architecture_index import ArchitectureIndex
+from drawio_c4_lint.c4_lint_on_directory import map_in_pool
+
+
+class TestArchitectureIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.diagrams = os.path.join(self.tmp, 'diagrams')
+        shutil.copytree('test_files', self.diagrams)
+        self.index = ArchitectureIndex(os.path.join(self.tmp, 'index.sqlite'))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.tmp)
+
+    def test_queries(self):
+        updated, unchanged, removed, failed = self.index.update(self.diagrams)
+        self.assertEqual(len(updated), len(os.listdir('test_files')))
+        self.assertEqual((unchanged, removed, failed), ([], [], []))
+        self.assertIn('System name A', self.index.elements('Software System'))
+        self.assertEqual(self.index.neighbours('system name a'), ['External system name B'])
+        self.assertEqual(self.index.diagrams_mentioning('System name C'),
+                         [os.path.join(self.diagrams, 'missing_connection.drawio')])
+        self.assertEqual(self.index.technologies()[0][0], 'e.g. JSON/HTTP')
+        # pages after the first are indexed too
+        self.assertIn('Renamed external system', self.index.elements('Software System'))
+
+    def test_incremental_update(self):
+        self.index.update(self.diagrams)
+        changed = os.path.join(self.diagrams, 'missing_connection.drawio')
+        touched = os.path.join(self.diagrams, 'c4.drawio')
+        removed = os.path.join(self.diagrams, 'missing_name.drawio')
+        with open(changed, encoding='utf-8') as f:
+            content = f.read()
+        with open(changed, 'w', encoding='utf-8') as f:
+            f.write(content.replace('System name C', 'System name Z'))
+        stat = os.stat(touched)
+        os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        os.remove(removed)
+
+        updated, unchanged, removed_paths, failed = self.index.update(self.diagrams)
+        self.assertEqual(updated, [changed])
+        self.assertIn(touched, unchanged)
+        self.assertEqual(removed_paths, [removed])
+        self.assertEqual(self.index.diagrams_mentioning('System name C'), [])
+        self.assertEqual(self.index.diagrams_mentioning('System name Z'), [changed])
+        self.assertEqual(self.index.update(self.diagrams)[0], [])
+
+    def test_file_that_stops_parsing(self):
+        self.index.update(self.diagrams)
+        broken = os.path.join(self.diagrams, 'missing_connection.drawio')
+        with open(broken, 'w', encoding='utf-8') as f:
+            f.write('<mxfile><diagram>')
+        updated, unchanged, removed, failed = self.index.update(self.diagrams)
+        self.assertEqual((updated, failed), ([], [broken]))
+        self.assertEqual(self.index.diagrams_mentioning('System name C'), [])
+        with mock.patch('drawio_c4_lint.architecture_index.map_in_pool', wraps=map_in_pool) as pool:
+            self.assertEqual(self.index.update(self.diagrams)[3], [broken])
+        self.assertEqual(list(pool.call_args[0][1]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from drawio_c4_lint.benchmarks.suite import compare, run_suite
+from drawio_c4_lint.benchmarks.synthetic import generate_corpus, generate_diagram
+from drawio_c4_lint.c4_lint import C4Lint
+from drawio_c4_lint.diagram_model import DiagramModel
+
+
+class TestSyntheticDiagrams(unittest.TestCase):
+
+    def test_size_and_mix(self):
+        root = generate_diagram(300, relationship_ratio=0.5, error_rate=0.0)
+        objects = root.findall('.//object')
+        self.assertEqual(len(objects), 300)
+        self.assertEqual(sum(obj.get('c4Type') == 'Relationship' for obj in objects), 100)
+
+    def test_compressed_and_plain_parse_alike(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            compressed, = generate_corpus(os.path.join(tmp, 'compressed'), files=1, cells=200)
+            plain, = generate_corpus(os.path.join(tmp, 'plain'), files=1, cells=200, compressed=False)
+            self.assertEqual(DiagramModel.from_file(compressed).systems_and_connections(),
+                             DiagramModel.from_file(plain).systems_and_connections())
+
+    def test_error_rate_and_known_applications(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            clean, = generate_corpus(os.path.join(tmp, 'clean'), files=1, cells=200, error_rate=0.0,
+                                     known_app_rate=1.0, known_applications=['Zeus'])
+            broken, = generate_corpus(os.path.join(tmp, 'broken'), files=1, cells=200, error_rate=1.0)
+            clean_lint = C4Lint(clean, rules=['required-attributes', 'known-application'],
+                                known_applications='applications.csv')
+            broken_lint = C4Lint(broken, rules=['required-attributes'])
+        self.assertEqual(clean_lint.diagnostics, [])
+        self.assertEqual(len(broken_lint.diagnostics), 200)
+
+
+class TestSuite(unittest.TestCase):
+
+    def test_run_suite(self):
+        results = run_suite(cells=(50,), batch_files=2, batch_cells=50, repeat=1, codec_payloads=3, codec_cells=20)
+        self.assertIn('parse[50 cells plain]', results)
+        self.assertIn('rule:relationship-endpoints[50 cells compressed]', results)
+        self.assertIn('batch[2x50 cells, 1 workers]', results)
+        self.assertIn('decode_many[3x20 cells, 1 threads]', results)
+        self.assertTrue(all(seconds > 0 and peak >= 0 for seconds, peak in results.values()))
+
+    def test_compare(self):
+        baseline = {'parse': (0.010, 0), 'tiny': (0.0001, 0)}
+        self.assertEqual(compare({'parse': (0.020, 0), 'tiny': (0.001, 0), 'new': (1.0, 0)}, baseline), ['parse'])
+        self.assertEqual(compare({'parse': (0.011, 0)}, baseline), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
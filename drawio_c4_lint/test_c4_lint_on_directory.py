@@ -0,0 +1,162 @@
+import contextlib
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from drawio_c4_lint.analyze_network import extract_file
+from drawio_c4_lint.c4_lint import C4Lint
+from drawio_c4_lint.c4_lint_on_directory import (find_drawio_files, iter_lint_results, lint_drawio_files, lint_file,
+                                                 map_in_pool)
+from drawio_c4_lint.diagram_model import count_pages, iter_page_xml, may_contain_c4, page_from_xml, read_pages
+from drawio_c4_lint.drawio.drawio_serialization import encode_diagram_data
+
+MULTI_PAGE = os.path.join('test_files', 'multi_page.drawio')
+
+
+class TestLintDrawioFiles(unittest.TestCase):
+
+    def test_find_drawio_files_sorted(self):
+        files = find_drawio_files('test_files')
+        self.assertEqual(files, sorted(files))
+        self.assertIn(os.path.join('test_files', 'c4.drawio'), files)
+
+    def test_parallel_matches_serial(self):
+        files = find_drawio_files('test_files')
+        serial = list(iter_lint_results(files, workers=1))
+        parallel = list(iter_lint_results(files, workers=2, chunksize=2))
+        self.assertEqual([r.file_path for r in parallel], files)
+        self.assertEqual([(r.is_c4, r.errors, r.warnings, r.report) for r in parallel],
+                         [(r.is_c4, r.errors, r.warnings, r.report) for r in serial])
+
+    def test_result_is_picklable(self):
+        result = next(iter_lint_results([os.path.join('test_files', 'missing_connection.drawio')]))
+        copy = pickle.loads(pickle.dumps(result))
+        self.assertEqual(copy.errors, result.errors)
+        self.assertEqual(copy.error_count, result.error_count)
+        self.assertTrue(copy.is_c4)
+
+    def test_lint_drawio_files_prints_reports(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            results = lint_drawio_files('test_files', workers=2)
+        self.assertEqual(len(results), len(find_drawio_files('test_files')))
+        self.assertIn("C4 Linter Input: " + os.path.join('test_files', 'c4.drawio'), output.getvalue())
+
+
+class TestMultiPage(unittest.TestCase):
+
+    def test_every_page_is_linted(self):
+        result = lint_file(MULTI_PAGE)
+        self.assertEqual([(page['index'], page['id'], page['name']) for page in result.pages],
+                         [(0, 'page-context', 'Context'), (1, 'page-containers', 'Containers'),
+                          (2, 'page-notes', 'Notes')])
+        self.assertEqual({d.page for d in result.diagnostics}, {'page-context', 'page-containers', 'page-notes'})
+        self.assertEqual(result.error_count, sum(page['error_count'] for page in result.pages) + 1)
+        self.assertIn("Page: Containers (id page-containers)", result.report)
+        # the filename check runs once per file, not once per page
+        self.assertEqual(sum(d.code == 'C4012' for d in result.diagnostics), 1)
+
+    def test_system_renamed_on_another_page(self):
+        result = lint_file(MULTI_PAGE)
+        renamed = [d for d in result.diagnostics if d.code == 'C4013']
+        self.assertEqual(len(renamed), 1)
+        self.assertEqual((renamed[0].element_id, renamed[0].page), ('X7UBImn1nb6fJPARamSX-2', 'page-containers'))
+        self.assertIn("'External system name' on page 'Context'", renamed[0].message)
+        self.assertIn(renamed[0].message, result.report)
+
+    def test_single_page_is_decoded_alone(self):
+        first = C4Lint(MULTI_PAGE, collect_stats=True)
+        self.assertEqual(first.page_name, 'Context')
+        self.assertNotIn('inflate', first.stats.timers)
+        compressed = C4Lint(MULTI_PAGE, collect_stats=True, page='page-containers')
+        self.assertEqual(compressed.page_index, 1)
+        self.assertIn('inflate', compressed.stats.timers)
+        self.assertEqual(lint_file(MULTI_PAGE, page=2).pages[0]['name'], 'Notes')
+        self.assertIsNotNone(lint_file(MULTI_PAGE, page=3).failure)
+
+    def test_every_page_keeps_its_system_names(self):
+        result = lint_file(MULTI_PAGE)
+        self.assertEqual(set(result.system_names()), {'System name', 'External system name', 'Renamed external system'})
+        self.assertEqual(result.systems['X7UBImn1nb6fJPARamSX-2'], 'External system name')
+        self.assertTrue(all('@' not in system_id for system_id in result.systems))
+        self.assertEqual(result.pages[1]['systems']['X7UBImn1nb6fJPARamSX-2'], 'Renamed external system')
+        self.assertIn(('System name', 'Renamed external system'), result.connections)
+        _, is_c4, systems, connections, failure = extract_file(MULTI_PAGE)
+        self.assertEqual((is_c4, systems, connections, failure),
+                         (True, result.system_names(), result.connections, None))
+
+    def test_page_is_pickled_without_the_file(self):
+        page = pickle.loads(pickle.dumps(read_pages(MULTI_PAGE)[1]))
+        self.assertEqual((page.index, page.id, page.name), (1, 'page-containers', 'Containers'))
+        self.assertTrue(page.model().has_c4_objects())
+        page = page_from_xml(*list(iter_page_xml(MULTI_PAGE))[1])
+        self.assertEqual((page.index, page.id, page.name), (1, 'page-containers', 'Containers'))
+        self.assertTrue(page.model().has_c4_objects())
+
+    def test_pool_takes_items_as_it_needs_them(self):
+        taken = []
+
+        def items():
+            for i in range(200):
+                taken.append(i)
+                yield i
+
+        results = map_in_pool(str, items(), workers=2, chunksize=1)
+        self.assertEqual(next(results), '0')
+        self.assertLess(len(taken), 20)
+        self.assertEqual(list(results), [str(i) for i in range(1, 200)])
+
+    def test_pages_are_linted_in_parallel(self):
+        self.assertEqual(count_pages(MULTI_PAGE), 3)
+        serial = next(iter_lint_results([MULTI_PAGE], workers=1))
+        parallel = next(iter_lint_results([MULTI_PAGE], workers=2))
+        self.assertEqual(parallel.pages, serial.pages)
+        self.assertEqual(parallel.diagnostics, serial.diagnostics)
+        self.assertEqual(parallel.report, serial.report)
+
+
+class TestPrescreen(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_may_contain_c4(self):
+        self.assertTrue(may_contain_c4(os.path.join('test_files', 'c4.drawio')))
+        self.assertFalse(may_contain_c4(os.path.join('test_files', 'non_c4_object.drawio')))
+        self.assertFalse(may_contain_c4(self.write('empty.drawio', b'')))
+        self.assertTrue(may_contain_c4(os.path.join(self.tmp, 'missing.drawio')))
+        graph = '<mxGraphModel><root><object label="{0}" id="2"/></root></mxGraphModel>'
+        plain = graph.format('just a box')
+        c4 = '<mxGraphModel><root><object c4Type="Software System" id="2"/></root></mxGraphModel>'
+        pages = [f'<diagram id="{i}">{encode_diagram_data(xml).decode()}</diagram>'
+                 for i, xml in enumerate([plain, c4])]
+        self.assertFalse(may_contain_c4(self.write('compressed.drawio', f'<mxfile>{pages[0]}</mxfile>'.encode())))
+        self.assertTrue(may_contain_c4(self.write('second.drawio', f'<mxfile>{"".join(pages)}</mxfile>'.encode())))
+        self.assertTrue(may_contain_c4(self.write('corrupt.drawio', b'<mxfile><diagram>not*base64</diagram></mxfile>')))
+
+    def test_screened_out_files_are_not_parsed(self):
+        files = find_drawio_files('test_files')
+        full = list(iter_lint_results(files))
+        with mock.patch('drawio_c4_lint.c4_lint_on_directory.read_pages', wraps=read_pages) as read:
+            screened = list(iter_lint_results(files, prescreen=True))
+        self.assertLess(read.call_count, len(files))
+        self.assertEqual([r.is_c4 for r in screened], [r.is_c4 for r in full])
+        self.assertEqual([r.diagnostics for r in screened if r.is_c4], [r.diagnostics for r in full if r.is_c4])
+        skipped = screened[files.index(os.path.join('test_files', 'non_c4_object.drawio'))]
+        self.assertEqual((skipped.error_count, skipped.report, skipped.failure), (0, '', None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import pickle
+import unittest
+from drawio_c4_lint.c4_lint import C4Lint
+from drawio_c4_lint.c4_lint_on_directory import find_drawio_files
+from drawio_c4_lint.c4_model import C4Element, C4Model, load_c4_models
+from drawio_c4_lint.diagram_model import DiagramModel
+
+
+class TestC4Model(unittest.TestCase):
+
+    def test_matches_diagram_model(self):
+        for file_path in find_drawio_files('test_files'):
+            model = DiagramModel.from_file(file_path)
+            c4_model = C4Model.from_diagram_model(model, file_path)
+            self.assertEqual(c4_model.systems_and_connections(), model.systems_and_connections())
+            self.assertEqual(c4_model.is_c4, model.has_c4_objects())
+
+    def test_fields(self):
+        c4_model = C4Model.from_file(os.path.join('test_files', 'missing_connection.drawio'))
+        systems = c4_model.of_type('Software System')
+        self.assertEqual(len(systems), 4)
+        relationship = c4_model.of_type('Relationship')[0]
+        self.assertTrue(relationship.is_edge)
+        self.assertEqual(c4_model.element(relationship.source).c4_type, 'Software System')
+        self.assertEqual(c4_model.element(systems[0].id), systems[0])
+        for element in c4_model.elements:
+            for value in element.fields():
+                self.assertTrue(value is None or type(value) is str)
+
+    def test_immutable_and_picklable(self):
+        c4_model = C4Model.from_file(os.path.join('test_files', 'c4.drawio'))
+        with self.assertRaises(AttributeError):
+            c4_model.elements[0].name = 'changed'
+        with self.assertRaises(AttributeError):
+            c4_model.is_c4 = False
+        copy = pickle.loads(pickle.dumps(c4_model))
+        self.assertEqual(copy.elements, c4_model.elements)
+        self.assertIs(copy.elements[0].c4_type, c4_model.elements[0].c4_type)
+
+    def test_release_tree(self):
+        lint = C4Lint(os.path.join('test_files', 'missing_connection.drawio'), structurizr=True)
+        report = lint.format_report()
+        systems = lint.c4_model().systems_and_connections()
+        lint.release_tree()
+        self.assertIsNone(lint.root)
+        self.assertEqual(lint.format_report(), report)
+        self.assertEqual(lint.c4_model().systems_and_connections(), systems)
+
+    def test_load_c4_models(self):
+        files = find_drawio_files('test_files')
+        serial = list(load_c4_models(files))
+        parallel = list(load_c4_models(files, workers=2))
+        self.assertEqual([([m.elements for m in models], f) for _, models, f in parallel],
+                         [([m.elements for m in models], f) for _, models, f in serial])
+        self.assertTrue(all(isinstance(element, C4Element)
+                            for _, models, _ in serial for m in models for element in m.elements))
+
+    def test_every_page_is_modelled(self):
+        path = os.path.join('test_files', 'multi_page.drawio')
+        _, models, failure = next(load_c4_models([path]))
+        self.assertIsNone(failure)
+        self.assertEqual(len(models), 3)
+        self.assertEqual([m.page_name for m in models[1:]], ['Containers', 'Notes'])
+        containers = C4Model.from_file(path, page='Containers')
+        self.assertEqual(pickle.loads(pickle.dumps(containers)).page_id, 'page-containers')
+        self.assertEqual(containers.elements, models[1].elements)
+        self.assertEqual(C4Model.from_file(path).elements, models[0].elements)
+
+
+if __name__ == "__main__":
+    unittest.main()
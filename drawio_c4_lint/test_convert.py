@@ -0,0 +1,76 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from drawio_c4_lint.c4_lint_on_directory import lint_file
+from drawio_c4_lint.convert import convert_file, convert_files, main, page_formats
+from drawio_c4_lint.diagram_model import read_pages
+
+MULTI_PAGE = os.path.join('test_files', 'multi_page.drawio')
+
+
+class TestConvert(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'multi_page.drawio')
+        shutil.copy(MULTI_PAGE, self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def test_page_formats(self):
+        self.assertEqual(page_formats(self.read()), ['plain', 'compressed', 'plain'])
+        self.assertEqual(page_formats(b'<mxfile><diagram id="a"/><diagram id="b">\n  </diagram></mxfile>'), [])
+
+    def test_round_trip_keeps_pages_and_diagnostics(self):
+        before = lint_file(self.path)
+        os.chmod(self.path, 0o640)
+        self.assertEqual(convert_file(self.path, 'compressed'), 'converted')
+        self.assertEqual(page_formats(self.read()), ['compressed'] * 3)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+        self.assertEqual(convert_file(self.path, 'compressed'), 'skipped')
+        self.assertEqual(convert_file(self.path, 'plain'), 'converted')
+        self.assertEqual(page_formats(self.read()), ['plain'] * 3)
+        self.assertEqual([(page.id, page.name) for page in read_pages(self.path)],
+                         [('page-context', 'Context'), ('page-containers', 'Containers'), ('page-notes', 'Notes')])
+        after = lint_file(self.path)
+        self.assertEqual(after.diagnostics, before.diagnostics)
+        self.assertEqual(after.pages, before.pages)
+        self.assertIn(b'agent="Mozilla/5.0', self.read())
+
+    def test_prolog_and_other_pages_are_kept(self):
+        data = self.read()
+        first_page = data[data.index(b'<diagram'):data.index(b'</diagram>')]
+        with open(self.path, 'wb') as f:
+            f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<!-- exported -->\n' + data)
+        self.assertEqual(convert_file(self.path, 'plain'), 'converted')
+        converted = self.read()
+        self.assertTrue(converted.startswith(b"<?xml version='1.0' encoding='UTF-8'?>\n<!-- exported --><mxfile"))
+        # the serializer writes empty elements as <a/>, the whitespace of the plain page is untouched
+        self.assertIn(first_page.replace(b' />', b'/>'), converted)
+        self.assertIn(b'id="page-containers">\n    <mxGraphModel', converted)
+
+    def test_dry_run_and_failures(self):
+        broken = os.path.join(self.tmp, 'broken.drawio')
+        with open(broken, 'w') as f:
+            f.write('<mxfile><diagram id="x">not*deflate</diagram></mxfile>')
+        data = self.read()
+        results = {os.path.basename(path): status
+                   for path, status, _ in convert_files([self.tmp], 'plain', workers=2, dry_run=True)}
+        self.assertEqual(results, {'broken.drawio': 'failed', 'multi_page.drawio': 'converted'})
+        self.assertEqual(self.read(), data)
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(main(['--to', 'compressed', self.path]), 0)
+            self.assertEqual(main(['--to', 'compressed', '--dry-run', self.path]), 0)
+        self.assertEqual(set(os.listdir(self.tmp)), {'broken.drawio', 'multi_page.drawio'})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import pickle
+import unittest
+from drawio_c4_lint.c4_lint import C4Lint
+from drawio_c4_lint.c4_lint_on_directory import LintResult, find_drawio_files, iter_lint_results
+from drawio_c4_lint.diagnostics import Diagnostic, ReadableProperties, count_codes
+
+
+class TestDiagnostics(unittest.TestCase):
+
+    def test_message_rendered_from_arguments(self):
+        diagnostic = Diagnostic('C4001', 'error', 'Systems', 'id-1',
+                                ('c4Name', ReadableProperties([('c4Type', 'Software System'), ('id', 'id-1')]), ''))
+        self.assertEqual(diagnostic.message, "ERROR: 'c4Name' property missing ---  c4Type: Software System")
+
+    def test_lint_keeps_diagnostics_unrendered(self):
+        lint = C4Lint(os.path.join('test_files', 'missing_description.drawio'))
+        diagnostic = next(d for d in lint.diagnostics if d.code == 'C4001')
+        self.assertIsInstance(diagnostic.args[1], ReadableProperties)
+        self.assertEqual(diagnostic.element_id, 'esDkObLFpEDxHqnVwX9G-1')
+        self.assertIn(diagnostic.message, lint.errors['Systems'])
+
+    def test_pickle_and_json_round_trip(self):
+        lint = C4Lint(os.path.join('test_files', 'missing_description.drawio'))
+        for diagnostic in lint.diagnostics:
+            self.assertEqual(pickle.loads(pickle.dumps(diagnostic)), diagnostic)
+            self.assertEqual(Diagnostic.from_json(diagnostic.to_json()).message, diagnostic.message)
+        result = LintResult.from_lint(lint)
+        self.assertEqual(LintResult.from_dict(result.to_dict()).errors, lint.errors)
+
+    def test_page_survives_round_trip(self):
+        diagnostic = Diagnostic('C4003', 'error', 'Other').on_page('page-1')
+        self.assertEqual(Diagnostic.from_json(diagnostic.to_json()).page, 'page-1')
+        self.assertEqual(pickle.loads(pickle.dumps(diagnostic)), diagnostic)
+        self.assertNotIn('page', Diagnostic('C4003', 'error', 'Other').to_dict())
+
+    def test_count_codes_across_files(self):
+        counts = None
+        for result in iter_lint_results(find_drawio_files('test_files')):
+            counts = count_codes(result.diagnostics, counts)
+        self.assertEqual(counts['C4012'], len(find_drawio_files('test_files')) - 1)
+        self.assertEqual(counts.most_common(1)[0][1], max(counts.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
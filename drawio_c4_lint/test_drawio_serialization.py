@@ -0,0 +1,118 @@
+import base64
+import io
+import os
+import unittest
+import zlib
+from unittest import mock
+from urllib.parse import unquote_to_bytes
+import lxml.etree as etree
+from drawio_c4_lint.c4_lint import C4Lint, XMLParseException
+from drawio_c4_lint.diagram_model import DiagramModel
+from drawio_c4_lint.drawio import drawio_serialization
+from drawio_c4_lint.drawio.drawio_serialization import (DiagramTooLargeError, decode_diagram_data, decode_many,
+                                                        encode_diagram_data, encode_many, encode_stencil,
+                                                        encode_stencils, encode_uri_component, iter_decoded_chunks,
+                                                        js_decode_uri_component, js_encode_uri_component,
+                                                        pako_deflate_raw, pako_inflate_raw, unquote_bytes)
+from drawio_c4_lint.profiling import LintStats
+
+PATH = os.path.join('test_files', 'missing_connection.drawio')
+
+
+def compressed_file(xml):
+    data = encode_diagram_data(xml).decode('ascii')
+    return f'<mxfile><diagram id="p1" name="Page-1">{data}</diagram></mxfile>'.encode('utf-8')
+
+
+class TestStreamingDecode(unittest.TestCase):
+
+    def test_matches_whole_payload_decode(self):
+        xml = '<mxGraphModel><root>' + ''.join(
+            f'<mxCell id="{i}" value="Säule {i} &amp; 100%"/>' for i in range(2000)) + '</root></mxGraphModel>'
+        data = encode_diagram_data(xml)
+        expected = js_decode_uri_component(pako_inflate_raw(base64.b64decode(data)).decode('utf-8'))
+        self.assertEqual(decode_diagram_data(data), expected)
+        self.assertEqual(decode_diagram_data(data), xml)
+
+    def test_escape_split_across_chunks(self):
+        xml = '<a>' + 'é%ü ' * 500 + '</a>'
+        data = encode_diagram_data(xml)
+        with mock.patch.object(drawio_serialization, 'INFLATE_CHUNK', 7), \
+                mock.patch.object(drawio_serialization, 'BASE64_CHUNK', 8):
+            chunks = list(iter_decoded_chunks(data))
+        self.assertGreater(len(chunks), 100)
+        self.assertEqual(b''.join(chunks).decode('utf-8'), xml)
+
+    def test_zip_bomb_is_rejected(self):
+        # 64 MiB of zeros deflate to about 64 KiB
+        data = base64.b64encode(pako_deflate_raw(bytes(64 * 1024 * 1024)))
+        with self.assertRaises(DiagramTooLargeError):
+            for _ in iter_decoded_chunks(data, max_size=1024 * 1024):
+                pass
+
+
+class TestPercentCoding(unittest.TestCase):
+
+    def test_same_as_urllib(self):
+        for text in ['', 'plain', '<a b="c">100% & more</a>\n', 'Säule \\ 日本 %zz %4', "~()*!.'_-"]:
+            self.assertEqual(encode_uri_component(text), js_encode_uri_component(text))
+            self.assertEqual(unquote_bytes(encode_uri_component(text).encode()), text.encode('utf-8'))
+            self.assertEqual(unquote_bytes(text.encode('utf-8')), unquote_to_bytes(text.encode('utf-8')))
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_results_in_order_with_errors(self):
+        payloads = [f'<mxGraphModel id="{i}"/>' for i in range(50)]
+        encoded = [result.value for result in encode_many(payloads, workers=4)]
+        self.assertEqual(encoded, [encode_diagram_data(payload) for payload in payloads])
+        encoded[7] = b'not=base64'
+        results = list(decode_many(encoded, workers=4))
+        self.assertEqual([result.index for result in results], list(range(50)))
+        self.assertFalse(results[7].ok)
+        self.assertIsNotNone(results[7].error)
+        self.assertEqual([r.value for r in results if r.ok], payloads[:7] + payloads[8:])
+
+    def test_level_and_strategy(self):
+        payload = '<mxGraphModel>' + 'x' * 10000 + '</mxGraphModel>'
+        stored, = encode_many([payload], workers=1, level=0)
+        best, = encode_stencils([payload], level=9, strategy=zlib.Z_FILTERED)
+        self.assertGreater(len(stored.value), len(best.value))
+        self.assertEqual(best.value, encode_stencil(payload, 9, zlib.Z_FILTERED))
+        self.assertEqual(decode_diagram_data(stored.value), payload)
+        self.assertEqual(decode_diagram_data(best.value), payload)
+
+
+class TestCompressedDiagrams(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATH, 'rb') as f:
+            self.plain = f.read()
+        model = DiagramModel.from_file(PATH)
+        self.compressed = compressed_file(etree.tostring(model.root, encoding='unicode'))
+
+    def test_same_diagnostics_as_plain_file(self):
+        plain = C4Lint(PATH, content=self.plain)
+        compressed = C4Lint(PATH, content=self.compressed)
+        self.assertEqual(compressed.lint(), plain.lint())
+
+    def test_stats_count_inflated_bytes(self):
+        stats = LintStats()
+        model = DiagramModel.from_file(io.BytesIO(self.compressed), stats)
+        self.assertIn('inflate', stats.timers)
+        self.assertGreater(stats.counters['bytes inflated'], 1000)
+        self.assertTrue(model.has_c4_objects())
+
+    def test_too_large_diagram_is_reported(self):
+        with self.assertRaises(XMLParseException) as raised:
+            C4Lint(PATH, content=self.compressed, max_decoded_size=100)
+        self.assertIn('more than 100 bytes', str(raised.exception))
+
+    def test_corrupt_data_is_ignored(self):
+        model = DiagramModel.from_file(io.BytesIO(b'<mxfile><diagram>not*base64</diagram></mxfile>'))
+        self.assertEqual(model.root.tag, 'diagram')
+        self.assertFalse(model.has_c4_objects())
+
+
+if __name__ == "__main__":
+    unittest.main()
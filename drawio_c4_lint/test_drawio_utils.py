@@ -0,0 +1,43 @@
+import unittest
+from lxml import etree
+from drawio_c4_lint.benchmarks.synthetic import generate_diagram
+from drawio_c4_lint.drawio.drawio_shapes import create_rectangle
+from drawio_c4_lint.drawio.drawio_utils import (ID_CHARS, IdAllocator, get_diagram_root, id_generator, id_generator_2,
+                                                random_ids)
+
+
+class TestIdAllocator(unittest.TestCase):
+
+    def test_ids_are_unique_and_well_formed(self):
+        ids = IdAllocator(batch=16)
+        taken = ids.take(1000)
+        self.assertEqual(len(set(taken)), 1000)
+        self.assertEqual(len(ids), 1000)
+        self.assertTrue(all(len(cell_id) == 22 and set(cell_id) <= set(ID_CHARS) for cell_id in taken))
+        self.assertNotEqual(id_generator(), id_generator_2())
+        self.assertEqual(len(set(random_ids(1000))), 1000)
+        self.assertEqual(len(id_generator(8, 'ab')), 8)
+
+    def test_seeded_ids_repeat(self):
+        self.assertEqual(IdAllocator(seed=7).take(5), IdAllocator(seed=7).take(5))
+        self.assertNotEqual(IdAllocator(seed=7).take(5), IdAllocator(seed=8).take(5))
+        first, second = generate_diagram(100, seed=3), generate_diagram(100, seed=3)
+        self.assertEqual(etree.tostring(first), etree.tostring(second))
+
+    def test_model_and_reserved_ids_are_skipped(self):
+        expected = IdAllocator(seed=1, size=1, batch=4).take(3)
+        ids = IdAllocator(seed=1, size=1, batch=4, reserved=expected[:2])
+        self.assertEqual(ids(), expected[2])
+        self.assertIn(expected[0], ids)
+        model = get_diagram_root()
+        ids = IdAllocator.for_model(model, seed=1, size=1)
+        self.assertIn('0', ids)
+        self.assertIn('1', ids)
+        cells = [create_rectangle('1', 0, 0, 10, 10, ids=ids) for _ in range(62)]
+        self.assertEqual(len({cell.get('id') for cell in cells} | {'0', '1'}), 64)
+        with self.assertRaises(ValueError):
+            ids()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import os
+import tempfile
+import unittest
+from drawio_c4_lint.file_utils import write_atomic
+
+
+class TestWriteAtomic(unittest.TestCase):
+
+    def test_replaces_and_keeps_permissions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'entry.json')
+            write_atomic(path, b'{}')
+            os.chmod(path, 0o644)
+            write_atomic(path, b'{"a": 1}')
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'{"a": 1}')
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+            self.assertEqual(os.listdir(tmp), ['entry.json'])
+
+
+if __name__ == "__main__":
+    unittest.main()
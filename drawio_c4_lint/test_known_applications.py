@@ -0,0 +1,73 @@
+import difflib
+import os
+import shutil
+import tempfile
+import unittest
+from drawio_c4_lint import known_applications
+from drawio_c4_lint.known_applications import KnownApplicationsMatcher, get_known_applications, read_application_names
+
+
+class TestKnownApplicationsMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.names = read_application_names('applications.csv')
+        self.matcher = KnownApplicationsMatcher(self.names)
+
+    def test_exact_match_is_case_insensitive(self):
+        self.assertEqual(self.matcher.match('Zeus'), ['Zeus'])
+        self.assertEqual(self.matcher.match('ZEUS'), ['ZEUS'])
+
+    def test_fuzzy_match_agrees_with_difflib(self):
+        names_lower = [name.lower() for name in self.names]
+        for name in ['Zues', 'Poseidonn', 'Aphrodit', 'Hermes', 'Morfeus']:
+            expected = difflib.get_close_matches(name.lower(), names_lower, n=3, cutoff=0.0)
+            self.assertEqual(self.matcher.match(name)[0], expected[0], name)
+            self.assertEqual(len(self.matcher.match(name)), 3)
+
+    def test_cutoff_drops_weak_suggestions(self):
+        matcher = KnownApplicationsMatcher(self.names, cutoff=0.6)
+        self.assertEqual(matcher.match('Zues'), ['zeus'])
+        self.assertEqual(matcher.match('Completely unrelated'), [])
+
+    def test_no_shared_ngrams_still_suggests(self):
+        self.assertEqual(len(self.matcher.match('qq')), 3)
+
+    def test_empty_inventory(self):
+        self.assertEqual(KnownApplicationsMatcher([]).match('Zeus'), [])
+
+
+class TestKnownApplicationsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        known_applications.clear_known_applications()
+        self.tmp = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmp, 'applications.csv')
+        shutil.copy('applications.csv', self.csv_path)
+
+    def tearDown(self):
+        known_applications.clear_known_applications()
+        shutil.rmtree(self.tmp)
+
+    def test_read_application_names(self):
+        names = read_application_names(self.csv_path)
+        self.assertEqual(len(names), 24)
+        self.assertEqual(names[0], 'Aphrodite')
+
+    def test_loaded_once_per_process(self):
+        first = get_known_applications(self.csv_path)
+        self.assertIs(get_known_applications(self.csv_path), first)
+        self.assertIsNot(get_known_applications(self.csv_path, cutoff=0.5), first)
+
+    def test_reloaded_when_file_changes(self):
+        first = get_known_applications(self.csv_path)
+        with open(self.csv_path, 'a', encoding='utf-8') as f:
+            f.write('\nHermes,Messenger,Travel\n')
+        stat = os.stat(self.csv_path)
+        os.utime(self.csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        second = get_known_applications(self.csv_path)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.match('hermes'), ['hermes'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,12 @@
 import unittest
 from drawio_c4_lint.c4_lint import C4Lint
+from drawio_c4_lint.diagnostics import MESSAGES, Diagnostic
+from drawio_c4_lint.diagram_model import DiagramModel
+from drawio_c4_lint.drawio import drawio_serialization
 import os
+import json
+import re
+import tempfile
 
 class TestC4Lint(unittest.TestCase):
 
@@ -78,6 +84,90 @@ class TestC4Lint(unittest.TestCase):
             errors['Other'])
 
 
+class CountingList(list):
+    iterations = 0
+
+    def __iter__(self):
+        CountingList.iterations += 1
+        return super().__iter__()
+
+
+class TestDiagramFacts(unittest.TestCase):
+
+    def test_objects_scanned_once(self):
+        lint = C4Lint(os.path.join('test_files', 'missing_connection.drawio'), structurizr=True)
+        lint.model.objects = CountingList(lint.model.objects)
+        CountingList.iterations = 0
+        report = str(lint)
+        self.assertTrue(lint.is_c4())
+        lint.to_structurizr()
+        self.assertEqual(str(lint), report)
+        self.assertTrue(lint.has_errors())
+        self.assertEqual(CountingList.iterations, 1)
+
+    def test_errors_are_rendered_once(self):
+        lint = C4Lint(os.path.join('test_files', 'missing_connection.drawio'))
+        self.assertIs(lint.errors, lint.errors)
+        lint.report('C4012', 'Other', ('extra.drawio',))
+        self.assertEqual(sum(len(messages) for messages in lint.errors.values()), lint.error_count)
+        # a list of the same length is rendered again as well
+        lint.diagnostics = lint.diagnostics[1:] + [Diagnostic('C4012', 'error', 'Other', None, ('other.drawio',))]
+        self.assertIn(MESSAGES['C4012'].format('other.drawio'), lint.errors['Other'])
+
+    def test_structurizr_relationship_endpoints(self):
+        lint = C4Lint(os.path.join('test_files', 'missing_connection.drawio'))
+        relationships = json.loads(lint.to_structurizr())['relationships']
+        self.assertIn({'source': 'BPGl0NE8sRsK6GjBT7sM-1', 'target': 'BPGl0NE8sRsK6GjBT7sM-3',
+                       'description': 'e.g. Makes API calls', 'technology': 'e.g. JSON/HTTP'}, relationships)
+
+    def test_invalidate_after_mutation(self):
+        lint = C4Lint(os.path.join('test_files', 'c4.drawio'))
+        self.assertTrue(lint.is_c4())
+        for elem in list(lint.root.iter('object')):
+            elem.getparent().remove(elem)
+        self.assertTrue(lint.is_c4())
+        report = str(lint)
+        self.assertIn('C4004', [diagnostic.code for diagnostic in lint.diagnostics])
+        lint.invalidate()
+        self.assertFalse(lint.is_c4())
+        self.assertEqual(lint.model.objects, [])
+        self.assertIn("No C4 objects found", str(lint))
+        self.assertNotIn('C4004', [diagnostic.code for diagnostic in lint.diagnostics])
+        self.assertEqual(lint.c4_object_count, 0)
+        self.assertNotEqual(str(lint), report)
+
+
+class TestDiagramModel(unittest.TestCase):
+
+    def test_indexes(self):
+        model = DiagramModel.from_file(os.path.join('test_files', 'missing_connection.drawio'))
+        self.assertEqual(len(model.objects), 6)
+        self.assertEqual(len(model.objects_of_type('Software System')), 4)
+        self.assertEqual(len(model.objects_of_type('Relationship')), 2)
+        self.assertIn('esDkObLFpEDxHqnVwX9G-3', model.objects_by_id)
+        self.assertEqual(model.cells_by_id['BPGl0NE8sRsK6GjBT7sM-2'].tag, 'mxCell')
+        self.assertEqual(model.parent_map['BPGl0NE8sRsK6GjBT7sM-1'], '1')
+        edges = {elem.get('id'): (source, target) for elem, source, target in model.edges}
+        self.assertEqual(edges['BPGl0NE8sRsK6GjBT7sM-2'], ('BPGl0NE8sRsK6GjBT7sM-1', 'BPGl0NE8sRsK6GjBT7sM-3'))
+        self.assertEqual(edges['lmOmmAKjzgPhh1E44Ozs-1'], ('esDkObLFpEDxHqnVwX9G-3', None))
+
+    def test_compressed_matches_plain(self):
+        plain_path = os.path.join('test_files', 'missing_connection.drawio')
+        with open(plain_path, encoding='utf-8') as f:
+            content = f.read()
+        graph_model = re.search(r'<mxGraphModel.*</mxGraphModel>', content, re.S).group(0)
+        encoded = drawio_serialization.encode_diagram_data(graph_model).decode('utf-8')
+        with tempfile.TemporaryDirectory() as tmp:
+            compressed_path = os.path.join(tmp, 'compressed.drawio')
+            with open(compressed_path, 'w', encoding='utf-8') as f:
+                f.write(f'<mxfile><diagram name="Page-1" id="p1">{encoded}</diagram></mxfile>')
+            compressed = DiagramModel.from_file(compressed_path)
+        plain = DiagramModel.from_file(plain_path)
+        self.assertEqual(list(compressed.objects_by_id), list(plain.objects_by_id))
+        self.assertEqual(compressed.parent_map, plain.parent_map)
+        self.assertEqual([e[1:] for e in compressed.edges], [e[1:] for e in plain.edges])
+
+
 def output_full_linter_results():
     test_files_dir = 'test_files'
     test_results_dir = 'test_results'
@@ -92,7 +182,6 @@ def output_full_linter_results():
             with open(output_file, 'w', encoding='utf-8') as f:
                 f.write(result)
 
-output_full_linter_results()
-
 if __name__ == "__main__":
+    output_full_linter_results()
     unittest.main()
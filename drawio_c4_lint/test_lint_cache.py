@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from drawio_c4_lint import lint_cache
+from drawio_c4_lint.analyze_network import iter_extracts
+from drawio_c4_lint.c4_lint_on_directory import iter_lint_results
+from drawio_c4_lint.lint_cache import LintCache, lint_fingerprint
+
+
+class TestLintCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp, 'cache')
+        self.diagram = os.path.join(self.tmp, 'missing_connection.drawio')
+        shutil.copy(os.path.join('test_files', 'missing_connection.drawio'), self.diagram)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def lint_with_cache(self, fingerprint):
+        with LintCache(self.cache_dir, fingerprint) as cache:
+            results = list(iter_lint_results([self.diagram], cache=cache))
+        return cache, results[0]
+
+    def test_unchanged_file_is_served_from_cache(self):
+        cache, first = self.lint_with_cache(lint_fingerprint())
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        with mock.patch('drawio_c4_lint.c4_lint_on_directory.C4Lint') as c4lint, \
+                mock.patch.object(lint_cache, 'file_sha256', wraps=lint_cache.file_sha256) as sha:
+            cache, second = self.lint_with_cache(lint_fingerprint())
+        c4lint.assert_not_called()
+        sha.assert_not_called()
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(second.errors, first.errors)
+        self.assertEqual(second.connections, first.connections)
+        self.assertEqual(second.systems, first.systems)
+
+    def test_changed_content_is_relinted(self):
+        self.lint_with_cache(lint_fingerprint())
+        with open(self.diagram, 'a', encoding='utf-8') as f:
+            f.write('\n')
+        cache, _ = self.lint_with_cache(lint_fingerprint())
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_cache_must_match_lint_options(self):
+        with LintCache(self.cache_dir, lint_fingerprint()) as cache:
+            with self.assertRaises(ValueError):
+                next(iter_lint_results([self.diagram], cache=cache, profile='fast'))
+        with LintCache(self.cache_dir) as cache:
+            next(iter_lint_results([self.diagram], cache=cache, profile='fast'))
+        self.assertEqual(cache.fingerprint, lint_fingerprint(profile='fast'))
+        with LintCache(self.cache_dir) as cache:
+            _, is_c4, _, connections, _ = next(iter_extracts([self.diagram], cache=cache, profile='fast'))
+        self.assertEqual((cache.hits, is_c4), (1, True))
+        self.assertEqual(connections, [('System name A', 'External system name B')])
+
+    def test_fingerprint_covers_known_applications_and_options(self):
+        base = lint_fingerprint()
+        self.assertNotEqual(base, lint_fingerprint(known_applications='applications.csv'))
+        self.assertNotEqual(base, lint_fingerprint(include_ids=True))
+        self.assertNotEqual(base, lint_fingerprint(disabled_rules=('known-application',)))
+        self.assertNotEqual(base, lint_fingerprint(profile='fast'))
+        self.assertEqual(base, lint_fingerprint())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from drawio_c4_lint.benchmarks.synthetic import generate_corpus
+from drawio_c4_lint.c4_lint import C4Lint
+from drawio_c4_lint.c4_lint_on_directory import LintResult, lint_file
+from drawio_c4_lint.profiling import BatchStats
+from drawio_c4_lint.rules import RULES
+
+
+class TestLintStats(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        lint = C4Lint(os.path.join('test_files', 'c4.drawio'))
+        self.assertIsNone(lint.stats)
+        self.assertIsNone(LintResult.from_lint(lint).stats)
+
+    def test_phase_and_rule_timers(self):
+        lint = C4Lint(os.path.join('test_files', 'missing_connection.drawio'), known_applications='applications.csv',
+                      collect_stats=True)
+        str(lint)
+        timers = lint.stats.timers
+        for phase in ('parse', 'rules', 'lint', 'report'):
+            self.assertIn(phase, timers)
+        self.assertEqual({name for name in timers if name.startswith('rule:')}, {'rule:' + name for name in RULES})
+        self.assertEqual(lint.stats.counters['elements visited'], len(lint.model.cells))
+        self.assertGreater(lint.stats.counters['matcher candidates scored'], 0)
+
+    def test_bytes_inflated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path, = generate_corpus(tmp, files=1, cells=50)
+            result = lint_file(path, collect_stats=True)
+        self.assertGreater(result.stats['counters']['bytes inflated'], 0)
+        self.assertIn('inflate', result.stats['timers'])
+        self.assertEqual(LintResult.from_dict(result.to_dict()).stats, result.stats)
+
+    def test_batch_stats(self):
+        batch_stats = BatchStats(slowest=2)
+        for timings in (0.3, 0.1, 0.2):
+            batch_stats.add(LintResult(f'{timings}.drawio', stats={'timers': {'lint': timings},
+                                                                    'counters': {'elements visited': 10}}))
+        batch_stats.add(LintResult('no_stats.drawio'))
+        self.assertEqual(batch_stats.files, 3)
+        self.assertEqual(batch_stats.totals.counters['elements visited'], 30)
+        self.assertEqual(batch_stats.slowest_files(), [(0.3, '0.3.drawio'), (0.2, '0.2.drawio')])
+        self.assertIn('Slowest files', batch_stats.format_summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import io
+import json
+import os
+import unittest
+from drawio_c4_lint.c4_lint_on_directory import find_drawio_files, lint_drawio_files
+from drawio_c4_lint.diagnostics import DIAGNOSTIC_CODES
+
+
+class TestReportWriters(unittest.TestCase):
+
+    def test_jsonl_one_line_per_file(self):
+        output = io.StringIO()
+        lint_drawio_files('test_files', output_format='jsonl', stream=output, keep_results=False)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([record['file'] for record in records], find_drawio_files('test_files'))
+        record = next(r for r in records if r['file'] == os.path.join('test_files', 'missing_connection.drawio'))
+        self.assertTrue(record['is_c4'])
+        self.assertIn('C4007', [diagnostic['code'] for diagnostic in record['diagnostics']])
+        self.assertTrue(all(diagnostic['element_id'] for diagnostic in record['diagnostics']
+                            if diagnostic['code'] == 'C4007'))
+
+    def test_sarif_is_valid_json(self):
+        output = io.StringIO()
+        results = lint_drawio_files('test_files', output_format='sarif', stream=output)
+        log = json.loads(output.getvalue())
+        self.assertEqual(log['version'], '2.1.0')
+        run = log['runs'][0]
+        self.assertEqual({rule['id'] for rule in run['tool']['driver']['rules']}, set(DIAGNOSTIC_CODES))
+        expected = sum(len(result.diagnostics) for result in results if result.is_c4)
+        self.assertEqual(len(run['results']), expected)
+        # only the text writer prints the report, so it is not rendered for SARIF
+        self.assertEqual({result.report for result in results}, {''})
+        for sarif_result in run['results']:
+            self.assertIn(sarif_result['ruleId'], DIAGNOSTIC_CODES)
+            self.assertIn(sarif_result['level'], ('error', 'warning'))
+
+    def test_sarif_without_results(self):
+        output = io.StringIO()
+        lint_drawio_files(os.path.join('test_files', 'no_such_directory'), output_format='sarif', stream=output)
+        self.assertEqual(json.loads(output.getvalue())['runs'][0]['results'], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from drawio_c4_lint.c4_lint import C4Lint
+from drawio_c4_lint.c4_lint_on_directory import lint_file, main
+from drawio_c4_lint.rules import RULES, Rule, active_rule_names, register_rule, select_rules
+
+
+class CountingRule(Rule):
+    name = 'counting'
+    kinds = ('object', 'relationship', 'vertex', 'edge', 'file')
+
+    def start(self, lint):
+        self.visits = {kind: 0 for kind in self.kinds}
+
+    def visit_object(self, lint, elem):
+        self.visits['object'] += 1
+
+    def visit_relationship(self, lint, elem):
+        self.visits['relationship'] += 1
+
+    def visit_vertex(self, lint, elem, cell):
+        self.visits['vertex'] += 1
+
+    def visit_edge(self, lint, elem, source, target):
+        self.visits['edge'] += 1
+
+    def visit_file(self, lint, xml_file):
+        self.visits['file'] += 1
+
+
+RESOLUTION_DIAGRAM = """<mxfile><diagram name="Page-1" id="p1"><mxGraphModel><root>
+<mxCell id="0" /><mxCell id="1" parent="0" />
+<object c4Name="Alpha" c4Type="Software System" c4Description="A" id="alpha"><mxCell vertex="1" parent="1" /></object>
+<object c4Name="Beta" c4Type="Software System" c4Description="B" id="beta"><mxCell vertex="1" parent="1" /></object>
+<mxCell id="beta-label" value="label" vertex="1" parent="beta" />
+<mxCell id="box" value="plain box" vertex="1" parent="1" />
+<object c4Type="Relationship" c4Description="ok" c4Technology="T" id="r-ok"><mxCell edge="1" parent="1" source="alpha" target="beta" /></object>
+<object c4Type="Relationship" c4Description="dangling" c4Technology="T" id="r-dangling"><mxCell edge="1" parent="1" source="alpha" target="gone" /></object>
+<object c4Type="Relationship" c4Description="loop" c4Technology="T" id="r-loop"><mxCell edge="1" parent="1" source="alpha" target="alpha" /></object>
+<object c4Type="Relationship" c4Description="plain" c4Technology="T" id="r-plain"><mxCell edge="1" parent="1" source="alpha" target="box" /></object>
+<object c4Type="Relationship" c4Description="child" c4Technology="T" id="r-child"><mxCell edge="1" parent="1" source="alpha" target="beta-label" /></object>
+</root></mxGraphModel></diagram></mxfile>"""
+
+
+class TestRelationshipEndpointsRule(unittest.TestCase):
+
+    def test_endpoint_resolution(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'C4 L1 Resolution.drawio')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(RESOLUTION_DIAGRAM)
+            lint = C4Lint(path, rules=['relationship-endpoints'])
+        self.assertEqual(lint.errors['Relationships'], [
+            "ERROR: Relationship 'dangling' (id r-dangling) target 'gone' does not exist in the diagram.",
+            "ERROR: Relationship 'loop' (id r-loop) connects 'Alpha' to itself.",
+            "ERROR: Relationship 'plain' (id r-plain) target is attached to a non-C4 shape (id box).",
+        ])
+        self.assertEqual(lint.warnings['Relationships'], [
+            "WARN: Relationship 'child' (id r-child) target is attached to a child (id beta-label) of 'Beta' "
+            "rather than to the element itself.",
+        ])
+
+
+class TestRules(unittest.TestCase):
+
+    def test_default_rules(self):
+        self.assertEqual([rule.name for rule in select_rules()], list(RULES))
+
+    def test_disabled_rule_does_not_report(self):
+        path = os.path.join('test_files', 'missing_connection.drawio')
+        lint = C4Lint(path, disabled_rules=('system-connected', 'filename-format', 'known-application'))
+        self.assertEqual(lint.errors['Systems'], [])
+        self.assertEqual(lint.errors['Other'], [])
+        self.assertEqual(lint.c4_object_count, 6)
+
+    def test_selected_rules_only(self):
+        lint = C4Lint(os.path.join('test_files', 'missing_name.drawio'), rules=['filename-format'])
+        self.assertEqual(lint.errors['Systems'], [])
+        self.assertEqual(len(lint.errors['Other']), 1)
+
+    def test_custom_rule_sees_every_element_kind(self):
+        lint = C4Lint(os.path.join('test_files', 'missing_connection.drawio'), rules=[CountingRule])
+        self.assertEqual(lint.rules[0].visits, {'object': 4, 'relationship': 2, 'vertex': 4, 'edge': 2, 'file': 1})
+
+    def test_fast_profile_skips_expensive_rules(self):
+        self.assertEqual(active_rule_names(profile='fast'), ['required-attributes', 'non-c4-element', 'relationship-endpoints',
+                                                          'filename-format'])
+        lint = C4Lint(os.path.join('test_files', 'missing_connection.drawio'), profile='fast')
+        self.assertEqual(lint.errors['Systems'], [])
+        self.assertEqual(lint.warnings['Systems'], [])
+        self.assertIn("Profile: fast", str(lint))
+
+    def test_profile_recorded_in_result(self):
+        path = os.path.join('test_files', 'missing_connection.drawio')
+        self.assertEqual(lint_file(path, profile='fast').profile, 'fast')
+        self.assertEqual(lint_file(path).profile, 'full')
+
+    def test_unknown_rule(self):
+        with self.assertRaises(ValueError):
+            select_rules(['no-such-rule'])
+        with self.assertRaises(ValueError):
+            register_rule(type('Nameless', (Rule,), {}))
+        with self.assertRaises(ValueError):
+            select_rules(profile='slow')
+        with self.assertRaises(ValueError):
+            select_rules(disabled_rules=('no-such-rule',))
+
+    def test_unknown_rule_on_the_command_line(self):
+        for option in ('--rules', '--disable'):
+            stderr = io.StringIO()
+            with self.assertRaises(SystemExit), contextlib.redirect_stderr(stderr):
+                main(['test_files', option, 'known-application,no-such-rule'])
+            self.assertIn('Unknown lint rule: no-such-rule', stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
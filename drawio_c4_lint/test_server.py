@@ -0,0 +1,100 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from drawio_c4_lint.server import LintServer, make_http_server, serve_stdio
+
+PATH = os.path.join('test_files', 'missing_connection.drawio')
+
+
+class TestLintServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LintServer(known_applications='applications.csv')
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_path_and_content_agree(self):
+        by_path = self.server.handle({'id': 1, 'method': 'lint', 'params': {'path': PATH}})
+        with open(PATH, encoding='utf-8') as f:
+            by_content = self.server.handle({'id': 2, 'params': {'name': PATH, 'content': f.read()}})
+        self.assertEqual(by_path['id'], 1)
+        self.assertEqual(by_path['result'], by_content['result'])
+        self.assertIn('C4007', [diagnostic['code'] for diagnostic in by_path['result']['diagnostics']])
+        self.assertEqual(self.server.health()['cache_hits'], 1)
+
+    def test_request_options_change_the_cache_key(self):
+        full = self.server.lint({'path': PATH})
+        fast = self.server.lint({'path': PATH, 'profile': 'fast'})
+        self.assertEqual(full['profile'], 'full')
+        self.assertEqual(fast['profile'], 'fast')
+        self.assertEqual(self.server.health()['linted'], 2)
+
+    def test_edited_applications_csv_relints(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, 'applications.csv')
+            shutil.copy('applications.csv', csv_path)
+            path = os.path.join('test_files', 'c4.drawio')
+            with LintServer(known_applications=csv_path) as server:
+                before = server.lint({'path': path})
+                with open(csv_path, 'a', encoding='utf-8') as f:
+                    f.write('\nSystem name,Edited,Later\n')
+                after = server.lint({'path': path})
+                self.assertEqual(server.health()['cache_hits'], 0)
+        suggestions = [d for d in before['diagnostics'] if d['code'] == 'C4005']
+        self.assertTrue(suggestions)
+        self.assertNotEqual(suggestions, [d for d in after['diagnostics'] if d['code'] == 'C4005'])
+
+    def test_errors(self):
+        self.assertIn('error', self.server.handle({'id': 3, 'params': {'path': 'no_such_file.drawio'}}))
+        self.assertIn('error', self.server.handle({'id': 4, 'method': 'frobnicate'}))
+        self.assertIn('error', self.server.handle({'params': {'path': PATH, 'profile': 'turbo'}}))
+        broken = self.server.lint({'name': 'broken.drawio', 'content': '<mxfile>'})
+        self.assertIsNotNone(broken['failure'])
+
+    def test_stdio(self):
+        requests = ''.join(json.dumps({'id': i, 'params': {'path': PATH}}) + '\n' for i in range(5)) + 'not json\n'
+        output = io.StringIO()
+        serve_stdio(self.server, io.StringIO(requests), output)
+        responses = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(sorted(r['id'] for r in responses if r['id'] is not None), list(range(5)))
+        self.assertEqual(sum('error' in r for r in responses), 1)
+
+
+class TestHttpServer(unittest.TestCase):
+
+    def test_concurrent_http_requests(self):
+        with LintServer(workers=2) as server:
+            http_server = make_http_server(server)
+            thread = threading.Thread(target=http_server.serve_forever)
+            thread.start()
+            url = 'http://%s:%d' % http_server.server_address[:2]
+            try:
+                def post(path):
+                    request = urllib.request.Request(url + '/lint', json.dumps({'path': path}).encode('utf-8'))
+                    with urllib.request.urlopen(request) as response:
+                        return json.load(response)
+                paths = [os.path.join('test_files', name) for name in sorted(os.listdir('test_files'))]
+                with ThreadPoolExecutor(max_workers=4) as pool:
+                    records = list(pool.map(post, paths))
+                self.assertEqual([record['file'] for record in records], paths)
+                with self.assertRaises(urllib.error.HTTPError) as raised:
+                    post('no_such_file.drawio')
+                self.assertEqual(raised.exception.code, 400)
+                with urllib.request.urlopen(url + '/health') as response:
+                    self.assertEqual(json.load(response)['linted'], len(paths))
+            finally:
+                http_server.shutdown()
+                http_server.server_close()
+                thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import subprocess
+import sys
+import unittest
+from drawio_c4_lint.benchmarks.startup import PROJECT_ROOT, loaded_lazy_modules, measure_import_time
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_cli_start_does_not_load_lazy_modules(self):
+        total, modules = measure_import_time()
+        self.assertIn('drawio_c4_lint.c4_lint', modules)
+        self.assertGreater(total, 0)
+        self.assertEqual(loaded_lazy_modules(modules), [])
+
+    def test_import_does_not_configure_logging(self):
+        code = "import logging, drawio_c4_lint.c4_lint; print(len(logging.getLogger().handlers))"
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=PROJECT_ROOT)
+        self.assertEqual(output.stdout.strip(), '0')
+
+
+if __name__ == "__main__":
+    unittest.main()
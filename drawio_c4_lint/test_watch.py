@@ -0,0 +1,143 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from drawio_c4_lint.watch import (InotifyWatcher, LintSession, PollingWatcher, create_watcher, lint_options,
+                                  wait_debounced)
+
+
+class TestLintSession(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        for name in ('missing_connection.drawio', 'c4.drawio'):
+            shutil.copy(os.path.join('test_files', name), self.tmp)
+        self.path = os.path.join(self.tmp, 'c4.drawio')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def rewrite(self, path, old, new):
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content.replace(old, new))
+
+    def test_update_relints_only_changed_files(self):
+        session = LintSession(self.tmp, known_applications='applications.csv')
+        self.assertEqual(len(session.lint_all()), 2)
+        systems, _ = session.landscape()
+        self.assertIn('System name', systems)
+
+        self.assertEqual(session.update([self.path]), ([], []))
+        self.rewrite(self.path, 'System name', 'Renamed system')
+        linted, removed = session.update([self.path])
+        self.assertEqual([result.file_path for result in linted], [self.path])
+        self.assertIn('Renamed system', session.landscape()[0])
+
+        os.remove(self.path)
+        self.assertEqual(session.update([self.path]), ([], [self.path]))
+        self.assertEqual(session.totals()['files'], 1)
+
+        shutil.copy(os.path.join('test_files', 'missing_name.drawio'), self.tmp)
+        linted, _ = session.update()
+        self.assertEqual([os.path.basename(result.file_path) for result in linted], ['missing_name.drawio'])
+
+    def test_changed_known_applications_relints_everything(self):
+        csv_path = os.path.join(self.tmp, 'applications.csv')
+        shutil.copy('applications.csv', csv_path)
+        session = LintSession(self.tmp, known_applications=csv_path)
+        session.lint_all()
+        with open(csv_path, 'a', encoding='utf-8') as f:
+            f.write('\nSystem name,extra\n')
+        linted, _ = session.update([])
+        self.assertEqual(len(linted), 2)
+        # the CSV itself, as reported by the watcher, is not linted as a diagram
+        with open(csv_path, 'a', encoding='utf-8') as f:
+            f.write('Renamed system,extra\n')
+        linted, _ = session.update([csv_path])
+        self.assertEqual(sorted(os.path.basename(result.file_path) for result in linted),
+                         ['c4.drawio', 'missing_connection.drawio'])
+
+    def test_known_applications_select_their_rule(self):
+        self.assertEqual(lint_options('fast'), {'profile': 'fast'})
+        options = lint_options('fast', 'applications.csv')
+        self.assertIn('known-application', options['rules'])
+        self.assertNotIn('rules', lint_options('full', 'applications.csv'))
+        session = LintSession(self.tmp, **options)
+        codes = {diagnostic.code for result in session.lint_all() for diagnostic in result.diagnostics}
+        self.assertIn('C4005', codes)
+
+
+class TestWatchers(unittest.TestCase):
+
+    def check_watcher(self, watcher_class, **kwargs):
+        with tempfile.TemporaryDirectory() as tmp:
+            watcher = watcher_class(tmp, **kwargs)
+            try:
+                self.assertEqual(wait_debounced(watcher, debounce=0.05, timeout=0.1), set())
+                path = os.path.join(tmp, 'C4 L1 New.drawio')
+                for _ in range(3):
+                    shutil.copy(os.path.join('test_files', 'c4.drawio'), path)
+                self.assertEqual(wait_debounced(watcher, debounce=0.05, timeout=2), {path})
+                os.remove(path)
+                self.assertEqual(wait_debounced(watcher, debounce=0.05, timeout=2), {path})
+            finally:
+                watcher.close()
+
+    def check_extra_path(self, watcher_class, **kwargs):
+        with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as other:
+            csv_path = os.path.join(other, 'applications.csv')
+            shutil.copy('applications.csv', csv_path)
+            watcher = watcher_class(tmp, extra_paths=[csv_path], **kwargs)
+            try:
+                with open(os.path.join(other, 'C4 L1 Elsewhere.drawio'), 'w') as f:
+                    f.write('<mxfile/>')
+                self.assertEqual(wait_debounced(watcher, debounce=0.05, timeout=0.2), set())
+                with open(csv_path, 'a', encoding='utf-8') as f:
+                    f.write('New application,extra\n')
+                self.assertEqual(wait_debounced(watcher, debounce=0.05, timeout=2), {csv_path})
+            finally:
+                watcher.close()
+
+    def check_moved_directory(self, watcher_class, **kwargs):
+        with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as other:
+            os.makedirs(os.path.join(tmp, 'sub', 'deeper'))
+            path = os.path.join(tmp, 'sub', 'deeper', 'c4.drawio')
+            shutil.copy(os.path.join('test_files', 'c4.drawio'), path)
+            session = LintSession(tmp)
+            session.lint_all()
+            watcher = watcher_class(tmp, **kwargs)
+            try:
+                os.rename(os.path.join(tmp, 'sub'), os.path.join(other, 'sub'))
+                self.assertEqual(session.update(wait_debounced(watcher, debounce=0.05, timeout=2)), ([], [path]))
+                self.assertEqual(session.totals()['files'], 0)
+                # the moved directory is no longer followed
+                shutil.copy(os.path.join('test_files', 'c4.drawio'), os.path.join(other, 'sub', 'moved.drawio'))
+                self.assertEqual(wait_debounced(watcher, debounce=0.05, timeout=0.2), set())
+                os.rename(os.path.join(other, 'sub'), os.path.join(tmp, 'back'))
+                linted, _ = session.update(wait_debounced(watcher, debounce=0.05, timeout=2))
+                self.assertEqual(sorted(os.path.basename(result.file_path) for result in linted),
+                                 ['c4.drawio', 'moved.drawio'])
+            finally:
+                watcher.close()
+
+    def test_polling(self):
+        self.check_watcher(PollingWatcher, interval=0.02)
+        self.check_extra_path(PollingWatcher, interval=0.02)
+        self.check_moved_directory(PollingWatcher, interval=0.02)
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), "inotify is Linux only")
+    def test_inotify(self):
+        self.check_watcher(InotifyWatcher)
+        self.check_extra_path(InotifyWatcher)
+        self.check_moved_directory(InotifyWatcher)
+
+    def test_create_watcher_poll(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsInstance(create_watcher(tmp, poll=True), PollingWatcher)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,381 @@
+"""Watch a directory and re-lint diagrams as they are saved.
+
+    python -m drawio_c4_lint.watch diagrams/ --known-applications applications.csv
+
+Changes are picked up with inotify on Linux and by polling elsewhere (or
+with --poll). Bursts of saves are debounced, only the touched files are
+linted again and the known-applications matcher and the results of all
+other files stay in memory between saves. Saving the known-applications
+CSV re-lints everything.
+"""
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from drawio_c4_lint.c4_lint import configure_logging
+from drawio_c4_lint.c4_lint_on_directory import find_drawio_files, iter_lint_results
+from drawio_c4_lint.known_applications import get_known_applications
+from drawio_c4_lint.rules import PROFILES, active_rule_names
+
+logger = logging.getLogger(__name__)
+
+DEBOUNCE_SECONDS = 0.2
+POLL_INTERVAL_SECONDS = 0.5
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _stat_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PollingWatcher:
+    """Finds changed .drawio files, and changes to extra_paths, by comparing mtime and size snapshots."""
+
+    def __init__(self, directory, interval=POLL_INTERVAL_SECONDS, extra_paths=()):
+        self.directory = directory
+        self.interval = interval
+        self.extra_paths = list(extra_paths)
+        self.snapshot = self._snapshot()
+
+    def _snapshot(self):
+        snapshot = {path: _stat_key(path) for path in find_drawio_files(self.directory)}
+        snapshot.update((path, _stat_key(path)) for path in self.extra_paths)
+        return snapshot
+
+    def _changes(self):
+        snapshot = self._snapshot()
+        changed = {path for path, key in snapshot.items() if self.snapshot.get(path) != key}
+        changed.update(path for path in self.snapshot if path not in snapshot)
+        self.snapshot = snapshot
+        return changed
+
+    def wait(self, timeout=None):
+        """Changed paths, or an empty set when nothing changed within timeout seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self._changes()
+            if changed:
+                return changed
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return set()
+            time.sleep(self.interval if remaining is None else min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify watches on every directory of the tree, through libc.
+
+    The directories of extra_paths are watched as well, for changes to those
+    files only. wait() returns None when the kernel queue overflowed and
+    events were lost, or when a directory was moved out or deleted, whose
+    files only the caller knows; the caller has to rescan the tree then.
+    """
+
+    def __init__(self, directory, extra_paths=()):
+        import ctypes
+        import ctypes.util
+        self.directory = directory
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # watch descriptor -> directory
+        self.watches = {}
+        for root, dirs, _ in os.walk(directory):
+            self._add_watch(root)
+        # absolute path -> path as given, and the watches that are only there for them
+        self.extra_paths = {os.path.abspath(path): path for path in extra_paths}
+        tree = set(self.watches)
+        self.outside = {self._add_watch(os.path.dirname(path) or '.') for path in extra_paths} - tree
+
+    def _add_watch(self, path):
+        import ctypes
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.watches[wd] = path
+        return wd
+
+    def _drop_watches(self, path):
+        """Stop watching path and the directories below it, which left the tree."""
+        below = os.path.join(path, '')
+        for wd, directory in list(self.watches.items()):
+            if (directory == path or directory.startswith(below)) and wd not in self.outside:
+                del self.watches[wd]
+                # a moved directory would still be followed to its new place
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    def _read_events(self):
+        changed = set()
+        rescan = False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0'))
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_DELETE_SELF:
+                if wd not in self.outside:
+                    self._drop_watches(directory)
+                    rescan = True
+                continue
+            if not name:
+                continue
+            path = os.path.join(directory, name)
+            extra_path = self.extra_paths.get(os.path.abspath(path))
+            if extra_path is not None:
+                changed.add(extra_path)
+                continue
+            if wd in self.outside:
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # a new subtree, watch it and report what it already contains
+                    for root, _, _ in os.walk(path):
+                        self._add_watch(root)
+                    changed.update(find_drawio_files(path))
+                elif mask & (IN_MOVED_FROM | IN_DELETE):
+                    self._drop_watches(path)
+                    rescan = True
+                continue
+            if name.endswith('.drawio'):
+                changed.add(path)
+        return None if rescan else changed
+
+    def wait(self, timeout=None):
+        """Changed paths, an empty set after timeout seconds without changes, None when the tree has to be rescanned."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        return self._read_events()
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create_watcher(directory, poll=False, interval=POLL_INTERVAL_SECONDS, extra_paths=()):
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory, extra_paths)
+        except (OSError, AttributeError) as e:
+            logger.info(f"inotify not available ({e}), polling every {interval}s")
+    return PollingWatcher(directory, interval, extra_paths)
+
+
+def wait_debounced(watcher, debounce=DEBOUNCE_SECONDS, timeout=None):
+    """Wait for a change, then keep collecting until debounce seconds pass without one.
+
+    Returns the changed paths, None when the whole tree has to be rescanned
+    and an empty set when nothing changed within timeout seconds.
+    """
+    changed = watcher.wait(timeout)
+    if not changed and changed is not None:
+        return changed
+    while True:
+        more = watcher.wait(debounce)
+        if more is not None and not more:
+            return changed
+        changed = None if changed is None or more is None else changed | more
+
+
+class LintSession:
+    """Per-file lint results for a directory, kept up to date one file at a time.
+
+    Corpus totals and the cross-file system landscape are derived from the
+    resident results, so an update only pays for the files that changed.
+    """
+
+    def __init__(self, directory, workers=1, **lint_kwargs):
+        self.directory = directory
+        self.workers = workers
+        self.lint_kwargs = lint_kwargs
+        known_applications = lint_kwargs.get('known_applications')
+        self.known_applications_csv = known_applications if isinstance(known_applications, str) else None
+        self.known_applications_key = None
+        self.results = {}
+        # file path -> (mtime_ns, size) the result was computed for
+        self.stats = {}
+
+    def _load_known_applications(self):
+        """Warm the matcher, returns True when the CSV changed since the last call."""
+        if self.known_applications_csv is None:
+            return False
+        get_known_applications(self.known_applications_csv)
+        key = _stat_key(self.known_applications_csv)
+        changed = self.known_applications_key is not None and key != self.known_applications_key
+        self.known_applications_key = key
+        return changed
+
+    def _lint(self, paths):
+        keys = {path: _stat_key(path) for path in paths}
+        linted = []
+        for result in iter_lint_results(paths, workers=self.workers, **self.lint_kwargs):
+            self.results[result.file_path] = result
+            self.stats[result.file_path] = keys[result.file_path]
+            linted.append(result)
+        return linted
+
+    def lint_all(self):
+        self._load_known_applications()
+        self.results = {}
+        self.stats = {}
+        return self._lint(find_drawio_files(self.directory))
+
+    def update(self, paths=None):
+        """Re-lint the given paths, or rescan the whole tree when paths is None.
+
+        Returns (linted results, removed paths). Files whose mtime and size
+        did not change are skipped; everything is linted again when the
+        known-applications CSV changed.
+        """
+        if self._load_known_applications():
+            paths = None
+            self.stats = {}
+        if paths is not None and self.known_applications_csv is not None:
+            csv_path = os.path.abspath(self.known_applications_csv)
+            paths = [path for path in paths if os.path.abspath(path) != csv_path]
+        if paths is None:
+            paths = set(find_drawio_files(self.directory)) | set(self.results)
+        removed = []
+        stale = []
+        for path in sorted(paths):
+            key = _stat_key(path)
+            if key is None:
+                if self.results.pop(path, None) is not None:
+                    self.stats.pop(path, None)
+                    removed.append(path)
+            elif self.stats.get(path) != key:
+                stale.append(path)
+        return self._lint(stale), removed
+
+    def totals(self):
+        return {
+            'files': len(self.results),
+            'errors': sum(result.error_count for result in self.results.values()),
+            'warnings': sum(result.warning_count for result in self.results.values()),
+            'failures': sum(result.failure is not None for result in self.results.values()),
+        }
+
+    def landscape(self):
+        """(Software System names, distinct (source, target) connections) across all files."""
+        systems = set()
+        connections = set()
+        for result in self.results.values():
+            systems.update(result.system_names())
+            connections.update(result.connections)
+        return systems, connections
+
+
+def format_totals(session):
+    totals = session.totals()
+    systems, connections = session.landscape()
+    return (f"{totals['files']} files, {totals['errors']} errors, {totals['warnings']} warnings, "
+            f"{totals['failures']} failed; {len(systems)} systems, {len(connections)} connections")
+
+
+def watch(directory, output_format='text', stream=None, debounce=DEBOUNCE_SECONDS, poll=False,
+          interval=POLL_INTERVAL_SECONDS, workers=1, **lint_kwargs):
+    """Lint directory, then re-lint changed files until interrupted."""
+    from drawio_c4_lint.report_writers import WRITERS
+    stream = stream or sys.stdout
+    writer = WRITERS[output_format](stream)
+    session = LintSession(directory, workers=workers, render_report=output_format == 'text', **lint_kwargs)
+    for result in session.lint_all():
+        writer.write(result)
+    print(format_totals(session), file=sys.stderr)
+    # later updates are single files, which are linted fastest in-process
+    session.workers = 1
+    csv_path = session.known_applications_csv
+    watcher = create_watcher(directory, poll, interval, extra_paths=[csv_path] if csv_path else [])
+    try:
+        while True:
+            changed = wait_debounced(watcher, debounce)
+            start = time.perf_counter()
+            linted, removed = session.update(changed)
+            for result in linted:
+                writer.write(result)
+            for path in removed:
+                print(f"Removed {path}", file=sys.stderr)
+            if linted or removed:
+                print(f"{format_totals(session)} ({(time.perf_counter() - start) * 1000:.0f} ms)", file=sys.stderr)
+            stream.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        writer.close()
+
+
+def lint_options(profile='fast', known_applications=None):
+    """Lint keyword arguments for profile, with the known-application rule added when a CSV is given."""
+    lint_kwargs = {'profile': profile}
+    if known_applications:
+        lint_kwargs['known_applications'] = known_applications
+        rules = active_rule_names(profile=profile)
+        if 'known-application' not in rules:
+            # the CSV is only read by this rule, which the fast profile leaves out
+            lint_kwargs['rules'] = rules + ['known-application']
+    return lint_kwargs
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory', help="top level directory to watch for .drawio files")
+    parser.add_argument('--known-applications', default=None,
+                        help="CSV of known business applications to check Software System names against; "
+                             "adds the known-application rule to the profile and is watched for changes")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='fast',
+                        help="rule profile (default: fast, meant for on-save linting)")
+    parser.add_argument('--format', choices=('text', 'jsonl'), default='text', help="output format (default: text)")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS,
+                        help="seconds without changes before linting (default: %(default)s)")
+    parser.add_argument('--poll', action='store_true', help="poll for changes instead of using inotify")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL_SECONDS,
+                        help="polling interval in seconds (default: %(default)s)")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="worker processes for the initial lint, 0 for one per core (default: 1)")
+    args = parser.parse_args(argv)
+    configure_logging()
+    lint_kwargs = lint_options(args.profile, args.known_applications)
+    watch(args.directory, args.format, debounce=args.debounce, poll=args.poll, interval=args.interval,
+          workers=args.workers or None, **lint_kwargs)
+
+
+if __name__ == "__main__":
+    main()